@@ -0,0 +1,20 @@
+import importlib
+
+# API backends by the name used in config.main_api: module and class.
+# The modules are imported on demand, so the unused backends do not need their libraries
+API_BACKENDS = {
+    'csv': ('TM.api.csv_api', 'CsvApi'),
+    'google': ('TM.api.google_api', 'GoogleAPI'),
+    'google_async': ('TM.api.google_api_async', 'AsyncGoogleAPI'),
+}
+
+
+def get_api_class(name):
+    """
+    :param name: backend name, see API_BACKENDS
+    :return: the API class
+    """
+    if name not in API_BACKENDS:
+        raise ValueError("Unknown API {}, must be one of: {}".format(name, ', '.join(API_BACKENDS)))
+    module, cls = API_BACKENDS[name]
+    return getattr(importlib.import_module(module), cls)
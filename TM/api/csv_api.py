@@ -1,3 +1,8 @@
+import codecs
+import csv
+import locale
+import mmap
+import os
 from pathlib import Path
 
 def decorate(filename):
@@ -18,32 +23,120 @@ def decorate(filename):
     else:
         return filename
 
+
+# the heading of a round file
+HEADER = ['RED', 'Red HP', 'Red score', 'Blue score', 'Blue HP', 'BLUE']
+# the files larger than this are read through mmap, in bytes
+MMAP_SIZE = 64 * 1024 * 1024
+# buffer size of the round file writer, in bytes
+WRITE_BUFFER = 64 * 1024
+
+
+def mapped_lines(src, encoding='utf-8-sig'):
+    """
+    Generates the decoded lines of a file mapped to memory, so that the pages are read by the OS on demand
+    """
+    with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for line in iter(mapped.readline, b''):
+            yield line.decode(encoding)
+
+
+def parse_row(row):
+    """
+    :param row: csv row [fighter1, hp1, result1, result2, hp2, fighter2]
+    :return: the result in the api standard ((fighter1, result1), (figther2, result2))
+    """
+    if len(row) < len(HEADER):
+        raise ValueError("{} columns instead of {}".format(len(row), len(HEADER)))
+    name1, name2 = row[0].strip(), row[5].strip()
+    if name1 == '' or name2 == '':
+        raise ValueError("fighter name is empty")
+    scores = []
+    for cell in (row[2], row[3]):
+        try:
+            scores.append(int(cell.strip()))
+        except ValueError:
+            raise ValueError("score {!r} is not an integer".format(cell.strip())) from None
+    return (name1, scores[0]), (name2, scores[1])
+
+
 class CsvApi:
+    """
+    Writes the pairs of every round to prefix<round>.csv in the folder and reads the results from it
 
-    def __init__(self, folder, prefix, decorate=False):
+    The files are written and read with the csv module, so the names may contain commas and quotes.
+    The rows are streamed: read() is a generator, and the files over mmap_size bytes are mapped to memory.
+    The malformed rows do not stop the parse: all of them are reported at the end, with the line numbers.
+    """
+    def __init__(self, folder, prefix, decorate=False, mmap_size=MMAP_SIZE, encoding=None):
+        """
+        :param mmap_size: the files of this size or larger are read through mmap, None never to use it
+        :param encoding: encoding of the files, the default one of the system if None.
+        The UTF-8 files are read with or without the BOM
+        """
         self.decorate = decorate
         self.path = Path(folder)
         self.prefix = prefix
+        self.mmap_size = mmap_size
+        self.encoding = encoding if encoding is not None else locale.getpreferredencoding(False)
+        self.read_encoding = 'utf-8-sig' if codecs.lookup(self.encoding).name == 'utf-8' else self.encoding
+
+    def filename(self, round_num):
+        return self.path / (self.prefix + str(round_num) + '.csv')
 
     def write(self, pairs, round_num):
-        filename = self.path/(self.prefix+str(round_num) + '.csv')
-        with open(filename, 'w') as dst:
-            dst.write('RED, Red HP, Red score, Blue score, Blue HP, BLUE\n')
-            for p in pairs:
-                dst.write(p[0].name + ',' + str(p[0].rating) + ', , , ' + str(p[1].rating) + ',' + p[1].name + '\n')
+        filename = self.filename(round_num)
+        with open(filename, 'w', newline='', encoding=self.encoding, buffering=WRITE_BUFFER) as dst:
+            writer = csv.writer(dst)
+            writer.writerow(HEADER)
+            writer.writerows([p[0].name, p[0].rating, '', '', p[1].rating, p[1].name] for p in pairs)
         return str(filename)
 
+    def iter_rows(self, round_num):
+        """
+        Generates the rows of the round file after the heading, with their line numbers. Blank rows are skipped
+        """
+        filename = self.filename(round_num)
+        with open(filename, newline='', encoding=self.read_encoding) as src:
+            size = os.fstat(src.fileno()).st_size
+            if self.mmap_size is not None and 0 < self.mmap_size <= size:
+                lines = mapped_lines(src, self.read_encoding)
+            else:
+                lines = src
+            reader = csv.reader(lines)
+            next(reader, None)
+            for row in reader:
+                if any(cell.strip() for cell in row):
+                    yield reader.line_num, row
+
+    def read_results(self, round_num, errors=None):
+        """
+        Generates the results of the round, skipping the malformed rows
+
+        :param errors: list to add (line number, message) of the malformed rows to.
+        If None, a ValueError with all of them is raised after the last row
+        """
+        bad = [] if errors is None else errors
+        for line, row in self.iter_rows(round_num):
+            try:
+                yield parse_row(row)
+            except ValueError as e:
+                bad.append((line, str(e)))
+        if errors is None and bad:
+            raise ValueError("Malformed rows in {}:\n".format(self.filename(round_num)) +
+                             '\n'.join('Line {}: {}'.format(line, message) for line, message in bad))
+
     def read(self, round_num):
-        filename = self.path / (self.prefix + str(round_num) + '.csv')
-        results = []
-        with open(filename) as src:
-            for p in src.readlines()[1:]:
-                split = p.split(',')
-                results.append(
-                    ((split[0].rstrip().strip('\"'), int(split[2].rstrip().strip('\"'))),
-                               (split[5].rstrip().strip('\"'), int(split[3].rstrip().strip('\"'))))
-                )
-        return results
+        """
+        :return: generator of the results ((fighter1, result1), (figther2, result2)), see read_results
+        """
+        return self.read_results(round_num)
+
+    def read_rows(self, round_num):
+        """
+        :return: the raw rows of the round, including the fights without results yet, see ResultPoller
+        """
+        return [row for _, row in self.iter_rows(round_num)]
 
 
 """
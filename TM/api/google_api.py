@@ -1,48 +1,124 @@
-import time
-import httplib2
-import apiclient.discovery
-from oauth2client.service_account import ServiceAccountCredentials as SAC
-from TM.api.google_formatting import get_data_request, get_format_request, get_pair_position, get_create_sheet_request, get_all_range
+import threading
+from functools import lru_cache
+from TM.api.google_formatting import get_round_request, get_round_data_request, get_read_ranges, \
+    get_delete_sheet_request
+from TM.api.google_requests import RequestExecutor, sheet_exists
+from TM.pairings.scheduler import schedule
 CREDENTIALS_FILE = 'google_token.json'
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets',
+          'https://www.googleapis.com/auth/drive']
+#doc_id ='1pdeBOVo3SFBAXPw6wcPfK3bn_yQfNcuNBFVpwOpdfGg'
 
 
-credentials = SAC.from_json_keyfile_name(CREDENTIALS_FILE, ['https://www.googleapis.com/auth/spreadsheets',
-                                                              'https://www.googleapis.com/auth/drive'])
-httpAuth = credentials.authorize(httplib2.Http())
-service = apiclient.discovery.build('sheets', 'v4', http=httpAuth)
-#doc_id ='1pdeBOVo3SFBAXPw6wcPfK3bn_yQfNcuNBFVpwOpdfGg'
+# The credentials and the service clients are created on the first use and cached,
+# so importing this module needs neither the network nor the Google client libraries
+
+
+def new_http():
+    """
+    A new authorized connection. httplib2.Http is not thread safe, so every thread needs its own one
+    """
+    import httplib2
+    from oauth2client.service_account import ServiceAccountCredentials as SAC
+
+    credentials = SAC.from_json_keyfile_name(CREDENTIALS_FILE, SCOPES)
+    return credentials.authorize(httplib2.Http())
+
+
+@lru_cache(maxsize=None)
+def get_http():
+    return new_http()
+
 
+@lru_cache(maxsize=None)
+def get_service(name='sheets', version='v4'):
+    import apiclient.discovery
 
-def create_new_doc(name, rows=1000, columns=25):
+    return apiclient.discovery.build(name, version, http=get_http())
+
+
+def create_new_doc(name, rows=1000, columns=25, sheets_service=None, executor=None):
+    if sheets_service is None:
+        sheets_service = get_service()
+    if executor is None:
+        executor = RequestExecutor()
     sheets = [(
         {'properties': {'sheetType': 'GRID',
                         'sheetId': 1000,
                         'title': 'Hello',
                         'gridProperties': {'rowCount': rows, 'columnCount': columns}}})]
 
-    try:
-        spreadsheet = service.spreadsheets().create(body={
-            'properties': {'title': name, 'locale': 'ru_RU'},
-            'sheets': sheets
-        }).execute()
-    except Exception as e:
-        print('Creation failed\n' + str(e))
-        return ''
+    # a failure is raised, an api without a document could not do anything
+    spreadsheet = executor.execute(sheets_service.spreadsheets().create(body={
+        'properties': {'title': name, 'locale': 'ru_RU'},
+        'sheets': sheets
+    }))
     return spreadsheet['spreadsheetId']
 
 
+def response_rows(response):
+    """
+    :param response: batchGet response for the areas of a round
+    :return: the rows of all the areas: [[fighter1, hp1, result1, result2, hp2, fighter2],[...]]
+    """
+    rows = []
+    for value_range in response['valueRanges']:
+        # 'values' is omitted if the range is empty, the empty rows are the idle slots of an area
+        rows += [row for row in value_range.get('values', []) if any(str(cell).strip() for cell in row)]
+    return rows
+
+
+def parse_results(response):
+    """
+    :param response: batchGet response for the areas of a round
+    :return: the results in the api standard
+    """
+    # we format it in the api standard ((fighter1, result1), (figther2, result2))
+    return [((fight[0], fight[2]), (fight[5], fight[3])) for fight in response_rows(response)]
+
+
 class GoogleAPI:
     def __init__(self, spreadsheet_id=None, num_areas=2,
-                 name="", collaborators=None, **kwargs):
+                 name="", collaborators=None, sheets_service=None, drive_service=None, executor=None, min_gap=1,
+                 **kwargs):
+        """
+        :param min_gap: minimum number of the time slots between two bouts of a fighter
+        :param sheets_service: Google Sheets service object, created on the first use by default
+        :param drive_service: Google Drive service object, created on the first use by default
+        :param executor: RequestExecutor, all the requests go through it (rate limit and retries)
+
+        The requests are built with the shared service, and every thread executes them with its own Http
+        (see new_http), so one api can be used from several threads, e.g. the write-behind worker and the main one
+        """
         self.num_areas = num_areas
+        self.min_gap = min_gap
+        # number of pairs written to every area, by round number. Lets read only the filled rows
+        self.area_sizes = {}
+        self._service = sheets_service
+        self._drive_service = drive_service
+        self._local = threading.local()
+        # The own connection per thread is only needed for the real Google services
+        self._thread_http = sheets_service is None
+        self.executor = executor if executor is not None else RequestExecutor()
         if spreadsheet_id is not None:
             self._spreadsheet_id = spreadsheet_id
         else:
-            self._spreadsheet_id = create_new_doc(name, **kwargs)
+            self._spreadsheet_id = create_new_doc(name, sheets_service=self.service,
+                                                  executor=self.executor, **kwargs)
         if collaborators:
             self.share(collaborators)
-        #for r in range(rounds):
-        #    self.fill_heading(r)
+
+    @property
+    def service(self):
+        if self._service is None:
+            self._service = get_service('sheets', 'v4')
+        return self._service
+
+    @property
+    def drive_service(self):
+        if self._drive_service is None:
+            self._drive_service = get_service('drive', 'v3')
+        return self._drive_service
 
     @property
     def spreadsheet_id(self):
@@ -52,84 +128,111 @@ class GoogleAPI:
     def SpreadsheetURL(self):
         return 'https://docs.google.com/spreadsheets/d/{}/edit#gid=0'.format(self._spreadsheet_id)
 
+    def _execute(self, request):
+        if not self._thread_http:
+            return self.executor.execute(request)
+        if getattr(self._local, 'http', None) is None:
+            self._local.http = new_http()
+        return self.executor.execute(request, http=self._local.http)
+
     def write(self, pairs, round_num):
-        self.add_sheet(round_num)
-        pairs_in_area = int(len(pairs)/self.num_areas)
-        # it is rounded, so the last area may get more pairs.
-        # 15 pairs, 2 areas = 7+8
-        # problem may be: 15 pairs, 4 areas: 3+3+3+6
-        # todo: fix to make pair numbers more even (not necessary for 2 areas)
-        #pairs_in_areas = [pairs_in_area]*(self.num_areas-1) + [len(pairs) - pairs_in_area*(self.num_areas-1)]
-        area_pairs = [pairs[pairs_in_area*i: pairs_in_area*(i+1)] for i in range(self.num_areas-1)]
-        area_pairs += [pairs[pairs_in_area*(self.num_areas-1):]]
-
-        for i, area in enumerate(area_pairs):
-            position = get_pair_position(round_num, i, len(area))
-            pair_data = [pair[0].to_list() + pair[1].to_list()[::-1] for pair in area]
-            data_request = {
-                    "valueInputOption": "USER_ENTERED",
-                    "data": [
-                        {"range": position,
-                         "majorDimension": "ROWS",
-                         # сначала заполнять ряды, затем столбцы (т.е. самые внутренние списки в values - это ряды)
-                         "values": pair_data}
-            ]}
-            service.spreadsheets().values().batchUpdate(spreadsheetId=self._spreadsheet_id,
-                                                                  body=data_request).execute()
+        """
+        Writes the round with two requests: one batchUpdate for the page creation and formatting,
+        and one values batchUpdate for the header and the pairs of all the areas.
+        If the pairs can not be written, the new page is deleted, so that there is no half-written round,
+        and an existing page keeps the pairs written before
+        """
+        created = self.prepare_sheet(round_num)
+        try:
+            self._execute(self.values_request(pairs, round_num, clear=not created))
+        except Exception:
+            if created:
+                self.rollback_sheet(round_num)
+            raise
         return self.SpreadsheetURL
 
-    def read(self, round_num):
-        data = []
-        for area in range(self.num_areas):
-            read_range = get_pair_position(round_num, area, 1000)
-            response = service.spreadsheets().values().get(spreadsheetId=self._spreadsheet_id,
-                                                           range=read_range).execute()
-            # response['values'] = [[fighter1, hp1, result1, result2, hp2, fighter2],[...]]
-            # we format it in the api standard ((fighter1, result1), (figther2, result2))
-            results = [((fight[0], fight[2]), (fight[5], fight[3])) for fight in response['values']]
-            data += results
-        return data
-
-    def share(self, collaborators):
-        drive_service = apiclient.discovery.build('drive', 'v3', http=httpAuth)
-        for email in collaborators:
-            time.sleep(2)
-            drive_service.permissions().create(
-                fileId=self._spreadsheet_id,
-                body={'type': 'user', 'role': 'writer', 'emailAddress': email},
-                fields='id'
-            ).execute()
-
-    def fill_heading(self, sheet_id):
-        request = get_format_request(sheet_id)
-        # Execute the request
+    def rollback_sheet(self, round_num):
         try:
-            service.spreadsheets().batchUpdate(spreadsheetId=self.spreadsheet_id,
-                                                     body={"requests": request}).execute()
+            self._execute(self.delete_sheet_request(round_num))
         except Exception as e:
-            print('Failed to format the page {}\n'.format(sheet_id) + str(e))
-
+            print('Failed to delete the page for round {}\n'.format(round_num) + str(e))
+
+    def split_areas(self, pairs, round_num):
+        """
+        :return: for every area, the rows with its pairs in the order of the fights, see TM.pairings.scheduler
+        """
+        areas = schedule(pairs, self.num_areas, self.min_gap)
+        # an idle slot is left as an empty row, so that the next fights keep their time
+        area_rows = [[pair[0].to_list() + pair[1].to_list()[::-1] if pair is not None else [''] * 6
+                      for pair in area] for area in areas]
+        self.area_sizes[round_num] = [len(rows) for rows in area_rows]
+        return area_rows
+
+    def sheet_request(self, round_num, create=True):
+        """
+        :return: not executed request to create (if create) and format the page for the round
+        """
+        request = get_round_request(round_num - 1, create, self.num_areas)
+        return self.service.spreadsheets().batchUpdate(spreadsheetId=self.spreadsheet_id, body={"requests": request})
+
+    def values_request(self, pairs, round_num, clear=False):
+        """
+        :param clear: the page exists, so the old pairs are cleared by the same request
+        :return: not executed request to fill the header and the pairs of the round
+        """
+        body = get_round_data_request(round_num - 1, self.split_areas(pairs, round_num), clear)
+        return self.service.spreadsheets().values().batchUpdate(spreadsheetId=self._spreadsheet_id, body=body)
+
+    def read_request(self, round_num):
+        """
+        :return: not executed batchGet request for all the areas. If the round was written by this object,
+        only the rows with the pairs are requested
+        """
+        area_sizes = self.area_sizes.get(round_num, [None] * self.num_areas)
+        return self.service.spreadsheets().values().batchGet(spreadsheetId=self._spreadsheet_id,
+                                                             ranges=get_read_ranges(round_num, area_sizes))
+
+    def delete_sheet_request(self, round_num):
+        return self.service.spreadsheets().batchUpdate(spreadsheetId=self.spreadsheet_id,
+                                                       body={"requests": get_delete_sheet_request(round_num - 1)})
+
+    def share_request(self, email):
+        return self.drive_service.permissions().create(
+            fileId=self._spreadsheet_id,
+            body={'type': 'user', 'role': 'writer', 'emailAddress': email},
+            fields='id'
+        )
+
+    def prepare_sheet(self, round_num):
+        """
+        Creates and formats the page for the round in one batchUpdate.
+        If the page exists already (the round is written again), it is only formatted,
+        and its values are replaced by the values request. The other errors are raised
+        :return: True if the page was created
+        """
         try:
-            service.spreadsheets().values().clear(spreadsheetId=self.spreadsheet_id,
-                                                  range=get_all_range(sheet_id + 1)).execute()
+            self._execute(self.sheet_request(round_num))
+            return True
         except Exception as e:
-            print('Failed to clear the table values in the page {}\n'.format(sheet_id) + str(e))
+            if not sheet_exists(e):
+                raise
+            print('The page for round {} exists, it is written again'.format(round_num))
+            self._execute(self.sheet_request(round_num, create=False))
+            return False
 
-        # Data request - fill the static data
-        data_request = get_data_request(sheet_id)
-        try:
-            service.spreadsheets().values().batchUpdate(spreadsheetId=self._spreadsheet_id,
-                                                              body=data_request).execute()
-        except Exception as e:
-            print('Failed to put the table header {}\n'.format(sheet_id) + str(e))
-        return
+    def read(self, round_num):
+        """
+        Reads all the areas with one batchGet
+        """
+        return parse_results(self._execute(self.read_request(round_num)))
 
-    def add_sheet(self, round_num):
-        request = get_create_sheet_request(sheet_id=round_num-1)
-        try:
-            service.spreadsheets().batchUpdate(spreadsheetId=self.spreadsheet_id,
-                                                     body={"requests": request}).execute()
-        except Exception as e:
-            print('Failed to create the page for round {}\n'.format(round_num) + str(e))
-        self.fill_heading(round_num-1)
+    def read_rows(self, round_num):
+        """
+        :return: the raw rows of the round, including the fights without results yet, see ResultPoller
+        """
+        return response_rows(self._execute(self.read_request(round_num)))
 
+    def share(self, collaborators):
+        # the pace is set by the executor rate limit
+        for email in collaborators:
+            self._execute(self.share_request(email))
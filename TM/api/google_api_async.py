@@ -0,0 +1,95 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from TM.api.google_api import GoogleAPI, parse_results
+from TM.api.google_requests import sheet_exists
+
+
+class AsyncGoogleAPI(GoogleAPI):
+    """
+    GoogleAPI with the independent requests sent concurrently
+
+    The blocking .execute() calls run in a thread pool, at most max_concurrency of them at once.
+    The coroutines write_async, read_async and share_async can be awaited together from one event loop,
+    and write, read and share keep the usual blocking contract for mws.py. The blocking methods run
+    the coroutines in the own event loop thread of the api, so they work in any thread, the ones with
+    a running loop too (e.g. the server mode), though they block that loop: await the coroutines there.
+    A round is written with two requests and read with one (see GoogleAPI), so the areas are not
+    sent separately; the concurrency matters for sharing and for several rounds or documents at once.
+    """
+    def __init__(self, spreadsheet_id=None, num_areas=2, name="", collaborators=None,
+                 max_concurrency=8, **kwargs):
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._semaphore = None
+        self._semaphore_loop = None
+        # the event loop of the blocking methods, started on the first call, see _wait
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        # the thread pool threads execute the requests with their own Http, see GoogleAPI._execute
+        super().__init__(spreadsheet_id, num_areas, name, collaborators, **kwargs)
+
+    async def _run(self, request):
+        # the semaphore must belong to the running loop, so it is created on the first use in that loop
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        async with self._semaphore:
+            return await loop.run_in_executor(self._executor, self._execute, request)
+
+    async def write_async(self, pairs, round_num):
+        # The values need the page to exist, so these two requests are sequential
+        created = True
+        try:
+            await self._run(self.sheet_request(round_num))
+        except Exception as e:
+            # the same as GoogleAPI.prepare_sheet
+            if not sheet_exists(e):
+                raise
+            print('The page for round {} exists, it is written again'.format(round_num))
+            await self._run(self.sheet_request(round_num, create=False))
+            created = False
+        try:
+            await self._run(self.values_request(pairs, round_num, clear=not created))
+        except Exception:
+            if created:
+                await asyncio.get_running_loop().run_in_executor(self._executor, self.rollback_sheet, round_num)
+            raise
+        return self.SpreadsheetURL
+
+    async def read_async(self, round_num):
+        return parse_results(await self._run(self.read_request(round_num)))
+
+    async def share_async(self, collaborators):
+        await asyncio.gather(*[self._run(self.share_request(email)) for email in collaborators])
+
+    def _wait(self, coroutine):
+        """
+        Runs the coroutine in the own event loop thread and waits for the result.
+        Unlike asyncio.run it can be called from a running loop, and all the calls share one semaphore
+        """
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def write(self, pairs, round_num):
+        return self._wait(self.write_async(pairs, round_num))
+
+    def read(self, round_num):
+        return self._wait(self.read_async(round_num))
+
+    def share(self, collaborators):
+        self._wait(self.share_async(collaborators))
+
+    def close(self):
+        """
+        Stops the event loop thread and the thread pool
+        """
+        with self._loop_lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop = None
+        self._executor.shutdown(wait=False)
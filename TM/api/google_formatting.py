@@ -1,11 +1,58 @@
 ROWS = 1000
 COLS = 15
 
+# Every area takes 6 columns: name, HP, score | score, HP, name, and one empty column after it.
+# The first area starts from column B
+AREA_WIDTH = 7
 
-def get_format_request(sheet_id): #, rows=1000):
-    # set column width
+RED = {"red": 1, "green": 0.6, "blue": 0.6, "alpha": 0.6}
+BLUE = {"red": 0.6, "green": 0.6, "blue": 1, "alpha": 0.6}
+
+
+def column_letter(index):
+    """
+    :param index: 0-based column number
+    :return: column name: A, B, ..., Z, AA, AB, ...
+    """
+    name = ''
+    index += 1
+    while index > 0:
+        index, rem = divmod(index - 1, 26)
+        name = chr(ord('A') + rem) + name
+    return name
+
+
+def area_start(area):
+    # 0-based index of the first column of the area
+    return 1 + AREA_WIDTH * area
+
+
+def area_columns(area):
+    """
+    :return: names of the first and the last columns of the area, e.g. ('B', 'G') for the area 0
+    """
+    return column_letter(area_start(area)), column_letter(area_start(area) + 5)
+
+
+def color_request(sheet_id, start, end, color):
+    return {'repeatCell': {'range': {'sheetId': sheet_id,
+                                     'startRowIndex': 1,
+                                     'endRowIndex': ROWS,
+                                     'startColumnIndex': start,
+                                     'endColumnIndex': end},
+                           'cell': {"userEnteredFormat": {"backgroundColor": color}},
+                           'fields': 'userEnteredFormat'}}
+
+
+def get_format_request(sheet_id, num_areas=2): #, rows=1000):
+    # set column width: the HP and score columns of every area, and the columns between the areas
+    columns = []
+    for area in range(num_areas):
+        columns += [area_start(area) + i for i in range(1, 5)]
+        if area < num_areas - 1:
+            columns.append(area_start(area) + 6)
     request = []
-    for col in [2, 3, 4, 5, 7, 9, 10, 11, 12]:
+    for col in columns:
         request.append({
             "updateDimensionProperties": {
                 "range": {
@@ -21,117 +68,48 @@ def get_format_request(sheet_id): #, rows=1000):
                 "fields": "pixelSize"  # нужно задать только pixelSize и не трогать другие параметры столбца
             }
         })
-    # merge cells for the header
-    request += [
-        {'mergeCells': {'range': {'sheetId': sheet_id,
-                                  'startRowIndex': 0,
-                                  'endRowIndex': 1,
-                                  'startColumnIndex': 1,
-                                  'endColumnIndex': 7},
-                        'mergeType': 'MERGE_ALL'}},
-        {'mergeCells': {'range': {'sheetId': sheet_id,
-                                  'startRowIndex': 0,
-                                  'endRowIndex': 1,
-                                  'startColumnIndex': 8,
-                                  'endColumnIndex': 14},
-                        'mergeType': 'MERGE_ALL'}}]
-
-    # color the fighters
-    request += [
-        {'repeatCell': {'range': {'sheetId': sheet_id,
-                                  'startRowIndex': 1,
-                                  'endRowIndex': ROWS,
-                                  'startColumnIndex': 1,
-                                  'endColumnIndex': 4},
-                        'cell': {"userEnteredFormat": {
-                            "backgroundColor": {
-                                "red": 1,
-                                "green": 0.6,
-                                "blue": 0.6,
-                                "alpha": 0.6
-                            }}},
-                        'fields': 'userEnteredFormat'}},
-
-        {'repeatCell': {'range': {'sheetId': sheet_id,
-                                  'startRowIndex': 1,
-                                  'endRowIndex': ROWS,
-                                  'startColumnIndex': 8,
-                                  'endColumnIndex': 11},
-                        'cell': {"userEnteredFormat": {
-                            "backgroundColor": {
-                                "red": 1,
-                                "green": 0.6,
-                                "blue": 0.6,
-                                "alpha": 0.6
-                            }}},
-                        'fields': 'userEnteredFormat'}},
-
-        {'repeatCell': {'range': {'sheetId': sheet_id,
-                                  'startRowIndex': 1,
-                                  'endRowIndex': ROWS,
-                                  'startColumnIndex': 4,
-                                  'endColumnIndex': 7},
-                        'cell': {"userEnteredFormat": {
-                            "backgroundColor": {
-                                "red": 0.6,
-                                "green": 0.6,
-                                "blue": 1,
-                                "alpha": 0.6
-                            }}},
-                        'fields': 'userEnteredFormat'}},
-
-        {'repeatCell': {'range': {'sheetId': sheet_id,
-                                  'startRowIndex': 1,
-                                  'endRowIndex': ROWS,
-                                  'startColumnIndex': 11,
-                                  'endColumnIndex': 14},
-                        'cell': {"userEnteredFormat": {
-                            "backgroundColor": {
-                                "red": 0.6,
-                                "green": 0.6,
-                                "blue": 1,
-                                "alpha": 0.6
-                            }}},
-                        'fields': 'userEnteredFormat'}},
-
-    ]
+    for area in range(num_areas):
+        start = area_start(area)
+        # merge cells for the header
+        request.append({'mergeCells': {'range': {'sheetId': sheet_id,
+                                                 'startRowIndex': 0,
+                                                 'endRowIndex': 1,
+                                                 'startColumnIndex': start,
+                                                 'endColumnIndex': start + 6},
+                                       'mergeType': 'MERGE_ALL'}})
+        # color the fighters
+        request.append(color_request(sheet_id, start, start + 3, RED))
+        request.append(color_request(sheet_id, start + 3, start + 6, BLUE))
 
     # maybe add bold or text size increase to header?
     return request
 
 
-def get_data_request(sheet_id):
-
-    data_request = {
-        "valueInputOption": "USER_ENTERED",
-        "data": [
-            {"range": "Round_{}!B1:B1".format(sheet_id + 1),
-             "majorDimension": "ROWS",
-             # сначала заполнять ряды, затем столбцы (т.е. самые внутренние списки в values - это ряды)
-             "values": [["1 ристалище"]]},
-
-            {"range": "Round_{}!I1:I1".format(sheet_id + 1),
-             "majorDimension": "COLUMNS",
-             # сначала заполнять столбцы, затем ряды (т.е. самые внутренние списки в values - это столбцы)
-             "values": [["2 ристалище"]]},
-
-            {"range": "Round_{}!B2:N2".format(sheet_id + 1),
-             "majorDimension": "ROWS",
-             # сначала заполнять ряды, затем столбцы (т.е. самые внутренние списки в values - это ряды)
-             "values": [
-                 ["Фамилия", "HP", "Бой", "Бой", "HP", "Фамилия", "", "Фамилия", "HP", "Бой", "Бой", "HP", "Фамилия"]]},
-        ]}
-    return data_request
-
-
-def get_create_sheet_request(sheet_id):
+def get_data_request(sheet_id, num_areas=2):
+    sheet = "Round_{}".format(sheet_id + 1)
+    data = []
+    labels = []
+    for area in range(num_areas):
+        begin = area_columns(area)[0]
+        data.append({"range": "{}!{}1:{}1".format(sheet, begin, begin),
+                     "majorDimension": "ROWS",
+                     # сначала заполнять ряды, затем столбцы (т.е. самые внутренние списки в values - это ряды)
+                     "values": [["{} ристалище".format(area + 1)]]})
+        labels += ([""] if area > 0 else []) + ["Фамилия", "HP", "Бой", "Бой", "HP", "Фамилия"]
+    data.append({"range": "{}!B2:{}2".format(sheet, area_columns(num_areas - 1)[1]),
+                 "majorDimension": "ROWS",
+                 "values": [labels]})
+    return {"valueInputOption": "USER_ENTERED", "data": data}
+
+
+def get_create_sheet_request(sheet_id, num_areas=2):
     request = [{'addSheet':
                    {'properties': {
                          "sheetId": sheet_id,
                          "title": 'Round_{}'.format(sheet_id+1),
                           "gridProperties": {
                               "rowCount": ROWS,
-                              "columnCount": COLS
+                              "columnCount": max(COLS, area_start(num_areas))
                           },
                        }
                    }
@@ -139,6 +117,40 @@ def get_create_sheet_request(sheet_id):
     return request
 
 
+def get_delete_sheet_request(sheet_id):
+    return [{'deleteSheet': {'sheetId': sheet_id}}]
+
+
+def get_round_request(sheet_id, create=True, num_areas=2):
+    """
+    All the structural requests for a round page in one list, to be sent with a single batchUpdate.
+    The values of an existing page are not cleared here, see get_round_data_request
+    :param create: add the sheet, or only format the existing one
+    """
+    request = get_create_sheet_request(sheet_id, num_areas) if create else []
+    return request + get_format_request(sheet_id, num_areas)
+
+
+def get_round_data_request(sheet_id, area_rows, clear=False):
+    """
+    Header and the pairs of all the areas in one values batchUpdate body
+    :param area_rows: for every area, list of the rows [name1, hp1, '', '', hp2, name2]
+    :param clear: fill the rest of the areas with empty cells, to rewrite an existing page.
+    The old pairs are replaced in the same request, so they stay if it fails
+    """
+    data_request = get_data_request(sheet_id, len(area_rows))
+    for area, rows in enumerate(area_rows):
+        if clear:
+            # the last row of the range is get_pair_position(..., len(rows)), it must be within the sheet
+            rows = rows + [[''] * 6] * (ROWS - 3 - len(rows))
+        data_request["data"].append(
+            {"range": get_pair_position(sheet_id + 1, area, len(rows)),
+             "majorDimension": "ROWS",
+             # сначала заполнять ряды, затем столбцы (т.е. самые внутренние списки в values - это ряды)
+             "values": rows})
+    return data_request
+
+
 def get_pair_position(round_number, area, pair_num):
     """
     Gets the position in format Round_1!A1:A3
@@ -147,17 +159,20 @@ def get_pair_position(round_number, area, pair_num):
     :param pair_num:
     :return:
     """
-    # 1-based area
-    if area == 0:
-        columns = ('B', 'G')
-    elif area == 1:
-        columns = ('I', 'N')
-    else:
-        raise NotImplementedError('Only 0 and 1 are valid areas')
+    columns = area_columns(area)
     sheet = 'Round_' + str(round_number)
     row = pair_num + 3  # heading
     return '{sheet}!{begin}3:{end}{row}'.format(sheet=sheet, row=row, begin=columns[0], end=columns[1])
 
 
-def get_all_range(round_number):
-    return 'Round_{}!A1:N{}'.format(round_number, ROWS)
\ No newline at end of file
+def get_read_ranges(round_number, area_sizes):
+    """
+    :param area_sizes: number of pairs written to every area, None if unknown (then the whole sheet is read)
+    :return: the ranges to read all the pairs of the round with one batchGet
+    """
+    return [get_pair_position(round_number, area, ROWS if size is None else size)
+            for area, size in enumerate(area_sizes)]
+
+
+def get_all_range(round_number, num_areas=2):
+    return 'Round_{}!A1:{}{}'.format(round_number, area_columns(num_areas - 1)[1], ROWS)
\ No newline at end of file
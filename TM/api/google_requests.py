@@ -0,0 +1,107 @@
+import random
+import threading
+import time
+
+# Google Sheets API quota: requests per minute per user
+QUOTA_PER_MINUTE = 60
+
+# HTTP statuses worth to retry: quota exceeded and temporary server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """
+    Client-side rate limiter: rate tokens per second, at most capacity of them saved up.
+    Thread safe, every acquire() takes one token and waits for it if necessary
+    """
+    def __init__(self, rate=QUOTA_PER_MINUTE / 60, capacity=QUOTA_PER_MINUTE, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = self._clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # The token is reserved right away (the balance may go negative),
+            # so the waiting threads queue up instead of racing for the same token
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+
+def error_status(error):
+    """
+    :return: HTTP status of a googleapiclient HttpError (or anything with the same .resp), None for the others
+    """
+    resp = getattr(error, 'resp', None)
+    try:
+        return int(getattr(resp, 'status', None))
+    except (TypeError, ValueError):
+        return None
+
+
+def sheet_exists(error):
+    """
+    :return: True if the error is the answer to adding a sheet that is already in the document
+    """
+    return error_status(error) == 400 and 'already exists' in str(error)
+
+
+def retry_after(error):
+    """
+    :return: delay in seconds from the Retry-After header of the error response, or None
+    """
+    resp = getattr(error, 'resp', None)
+    if resp is None or not hasattr(resp, 'get'):
+        return None
+    try:
+        return float(resp.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestExecutor:
+    """
+    Executes the Google API requests under the rate limit, retrying the quota and server errors
+    with jittered exponential backoff (or after the delay the server asked for in Retry-After)
+    """
+    def __init__(self, bucket: TokenBucket = None, retries=5, base_delay=1.0, max_delay=64.0,
+                 sleep=time.sleep, jitter=random.random):
+        self.bucket = bucket if bucket is not None else TokenBucket()
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._jitter = jitter
+
+    def delay(self, attempt, error):
+        server_delay = retry_after(error)
+        if server_delay is not None:
+            return server_delay
+        # "full jitter": a random delay up to the exponential one
+        return min(self.max_delay, self.base_delay * 2 ** attempt) * self._jitter()
+
+    def execute(self, request, **kwargs):
+        """
+        :param request: googleapiclient request (anything with .execute())
+        :param kwargs: arguments of request.execute()
+        :return: the response
+        """
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            try:
+                return request.execute(**kwargs)
+            except Exception as e:
+                if error_status(e) not in RETRY_STATUSES or attempt >= self.retries:
+                    raise
+                self._sleep(self.delay(attempt, e))
+                attempt += 1
@@ -0,0 +1,101 @@
+import threading
+
+
+def row_complete(row):
+    # both scores are entered
+    return len(row) >= 6 and str(row[2]).strip() != '' and str(row[3]).strip() != ''
+
+
+class ResultPoller:
+    """
+    Collects the results of a round while the fights go on
+
+    Every poll() reads the raw rows of the round (api.read_rows), and only the rows changed since the previous
+    poll are parsed with parse (Tournament.parse_result). The rows with both scores are staged,
+    the ones which can not be parsed are kept in .errors by row number, so they can be corrected in the sheet.
+    When all the fights are staged, results() gives them at once, without reading the round again.
+    """
+    def __init__(self, api, round_num, parse, interval=10.0):
+        self.api = api
+        self.round_num = round_num
+        self.parse = parse
+        self.interval = interval
+        self.total = None
+        self.staged = {}
+        self.errors = {}
+        self.last_error = None
+        self._hashes = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """
+        :return: number of the rows changed since the previous poll
+        """
+        rows = self.api.read_rows(self.round_num)
+        changed = 0
+        with self._lock:
+            self.total = len(rows)
+            for i, row in enumerate(rows):
+                row_hash = hash(tuple(str(cell) for cell in row))
+                if self._hashes.get(i) == row_hash:
+                    continue
+                self._hashes[i] = row_hash
+                changed += 1
+                self.staged.pop(i, None)
+                self.errors.pop(i, None)
+                if not row_complete(row):
+                    continue
+                try:
+                    self.staged[i] = self.parse(((row[0], row[2]), (row[5], row[3])))
+                except (ValueError, IndexError) as e:
+                    self.errors[i] = str(e)
+            # the rows can disappear if the range is shrunk
+            for i in [i for i in self._hashes if i >= len(rows)]:
+                del self._hashes[i]
+                self.staged.pop(i, None)
+                self.errors.pop(i, None)
+        return changed
+
+    def complete(self):
+        with self._lock:
+            return self.total is not None and len(self.staged) == self.total and not self.errors
+
+    def results(self):
+        """
+        :return: all the parsed results in the order of the rows, or None if some are missing or wrong
+        """
+        with self._lock:
+            if self.total is None or len(self.staged) != self.total or self.errors:
+                return None
+            return [self.staged[i] for i in range(self.total)]
+
+    def status(self):
+        """
+        :return: (staged fights, all fights, {row number: error})
+        """
+        with self._lock:
+            return len(self.staged), self.total, dict(self.errors)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+                self.last_error = None
+            except Exception as e:
+                # the network errors must not stop the polling, the next poll may succeed
+                self.last_error = str(e)
+            # the polling goes on after all the results are in, as they still can be corrected
+            self._stop.wait(self.interval)
@@ -0,0 +1,106 @@
+import json
+import threading
+from pathlib import Path
+from TM.tournament import Fighter
+from TM.tournament.files import atomic_write
+
+
+class WriteBehindApi:
+    """
+    Writes every round to the local api at once, and to the remote one from a background thread
+
+    The rounds waiting for the remote api are kept in a JSON file (queue_file), so they are sent
+    after a restart of the application too. If the remote write fails, it is retried after retry_delay seconds,
+    meanwhile the local copy is ready to use. The results are read from the api named by read_from.
+    Every round in the queue is marked with the key of the remote document (e.g. the spreadsheet id
+    and the category), and the rounds of the other documents found in the file are dropped, not sent.
+    """
+    def __init__(self, local, remote, queue_file, read_from='remote', retry_delay=5.0, key=None):
+        if read_from not in ('local', 'remote'):
+            raise ValueError("read_from must be 'local' or 'remote'")
+        self.local = local
+        self.remote = remote
+        self.read_from = read_from
+        self.retry_delay = retry_delay
+        self.queue_file = Path(queue_file)
+        self.key = key
+        self.last_error = None
+        self._condition = threading.Condition()
+        self._closed = False
+        self._queue = self._load()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def write(self, pairs, round_num):
+        filename = self.local.write(pairs, round_num)
+        entry = {'key': self.key, 'round': round_num, 'pairs': [[[f.name, f.rating] for f in pair] for pair in pairs]}
+        with self._condition:
+            # a round written again replaces the one not sent yet
+            self._queue = [e for e in self._queue if e['round'] != round_num] + [entry]
+            self._save()
+            self._condition.notify_all()
+        return filename
+
+    def read(self, round_num):
+        return (self.remote if self.read_from == 'remote' else self.local).read(round_num)
+
+    def read_rows(self, round_num):
+        return (self.remote if self.read_from == 'remote' else self.local).read_rows(round_num)
+
+    def status(self):
+        """
+        :return: numbers of the rounds waiting to be sent and the last error of the remote api (None if it is OK)
+        """
+        with self._condition:
+            return [e['round'] for e in self._queue], self.last_error
+
+    def flush(self, timeout=None):
+        """
+        Waits until all the rounds are sent
+        :return: True if the queue is empty
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._queue, timeout)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join()
+
+    def _load(self):
+        if not self.queue_file.exists():
+            return []
+        with open(self.queue_file, encoding='utf-8') as src:
+            queue = json.load(src)
+        dropped = [e['round'] for e in queue if e.get('key') != self.key]
+        if dropped:
+            print('Rounds {} in {} belong to another document, they are dropped'.format(dropped, self.queue_file))
+        return [e for e in queue if e.get('key') == self.key]
+
+    def _save(self):
+        with atomic_write(self.queue_file, encoding='utf-8') as dst:
+            json.dump(self._queue, dst, ensure_ascii=False)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._queue or self._closed)
+                if self._closed:
+                    return
+                entry = self._queue[0]
+            pairs = [tuple(Fighter(name, rating) for name, rating in pair) for pair in entry['pairs']]
+            try:
+                self.remote.write(pairs, entry['round'])
+            except Exception as e:
+                with self._condition:
+                    self.last_error = 'Round {}: {}'.format(entry['round'], e)
+                    self._condition.wait(self.retry_delay)
+                continue
+            with self._condition:
+                self.last_error = None
+                # the round may have been written again while it was being sent
+                if self._queue and self._queue[0] is entry:
+                    self._queue.pop(0)
+                    self._save()
+                self._condition.notify_all()
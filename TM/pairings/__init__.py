@@ -1,2 +1,8 @@
 from .swiss_pairings import swiss_pairings_old, swiss_pairings
-from .round_pairings import round_pairings
\ No newline at end of file
+from .matrix_pairings import swiss_pairings_matrix
+from .exact_pairings import swiss_pairings_exact
+from .round_pairings import round_pairings
+from .round_robin import RoundRobin
+from .pool_stage import pool_stage_pairings, snake_pools
+from .pairing_stats import PairingStats
+from .repair import repair_pairings
@@ -0,0 +1,202 @@
+import warnings
+from typing import Callable, List, Tuple
+from TM.tournament import Fighter
+from .matrix_pairings import PairingMatrix
+from .pairing_stats import PairingStats
+
+# The number of the nearest fighters in the standings a fighter may be paired with, see exact_matching
+DEFAULT_WINDOW = 16
+# The size of the parts of the standings paired separately by _segment_matching
+SEGMENT = 64
+
+
+def _perfect_matching(num: int, edges: List[Tuple[int, int, int]]):
+    """
+    Maximum-weight matching among the maximum-cardinality ones (Edmonds' blossom algorithm, O(n^3))
+
+    :param num: number of vertices, they are numbered 0..num-1
+    :param edges: list of (i, j, weight)
+    :return: list of pairs (i, j), i < j, or None if the matching is not perfect
+    """
+    # networkx is only needed for the exact engine, so it is imported on demand
+    import networkx as nx
+
+    graph = nx.Graph()
+    graph.add_nodes_from(range(num))
+    graph.add_weighted_edges_from(edges)
+    matching = nx.max_weight_matching(graph, maxcardinality=True)
+    if len(matching) * 2 != num:
+        return None
+    return sorted(tuple(sorted(pair)) for pair in matching)
+
+
+def _candidate_edges(ratings: List[int], played: Callable[[int, int], bool], max_diff, window):
+    """
+    :return: dict {(i, j): rating difference} of the allowed pairs without a rematch among the window
+    nearest fighters in the standings, and the list of the allowed rematch pairs there
+    """
+    num = len(ratings)
+    diff = {}
+    rematches = []
+    for i in range(num):
+        for j in range(i + 1, min(num, i + window + 1)):
+            d = abs(ratings[i] - ratings[j])
+            if 0 <= max_diff < d:
+                continue
+            if played(i, j):
+                rematches.append((i, j))
+            else:
+                diff[(i, j)] = d
+    return diff, rematches
+
+
+def _segment_matching(ratings: List[int], played: Callable[[int, int], bool], max_diff):
+    """
+    The fast path of exact_matching for the sorted ratings
+
+    Pairing the neighbours (0, 1), (2, 3), ... gives the lower bounds of both the maximum and the total
+    difference of any pairing. The standings are cut into the segments of SEGMENT fighters, and every
+    segment is paired with the minimal total difference not exceeding the maximum bound. If the totals
+    add up to the bound, the pairing is optimal.
+
+    :return: list of pairs of positions, or None if the bounds are not reached
+    """
+    num = len(ratings)
+    if any(ratings[i] < ratings[i + 1] for i in range(num - 1)) and \
+            any(ratings[i] > ratings[i + 1] for i in range(num - 1)):
+        return None
+    gaps = [abs(ratings[i] - ratings[i + 1]) for i in range(0, num - 1, 2)]
+    bottleneck = max(gaps, default=0)
+    if 0 <= max_diff < bottleneck:
+        return None
+
+    pairs = []
+    for start in range(0, num, SEGMENT):
+        stop = min(num, start + SEGMENT)
+        edges = []
+        for i in range(start, stop):
+            for j in range(i + 1, stop):
+                d = abs(ratings[i] - ratings[j])
+                if d <= bottleneck and not played(i, j):
+                    edges.append((i - start, j - start, bottleneck + 1 - d))
+        segment = _perfect_matching(stop - start, edges)
+        if segment is None:
+            return None
+        pairs += [(i + start, j + start) for i, j in segment]
+    if sum(abs(ratings[i] - ratings[j]) for i, j in pairs) > sum(gaps):
+        return None
+    return sorted(pairs)
+
+
+def _bottleneck_matching(num: int, diff):
+    """
+    :param diff: dict {(i, j): rating difference} of the allowed pairs
+    :return: the perfect matching with the minimal maximum difference and then the minimal total one,
+    or None if there is no perfect matching
+    """
+    # The whole graph is checked first, so that a too narrow window is found with one probe
+    thresholds = sorted(set(diff.values()))
+    if not thresholds or _perfect_matching(num, [(i, j, 1) for i, j in diff]) is None:
+        return None
+
+    # Bisection over the possible values of the maximum difference.
+    # Each probe is a maximum cardinality matching on the graph of the allowed pairs
+    low, high = 0, len(thresholds) - 2
+    best = thresholds[-1]
+    while low <= high:
+        mid = (low + high) // 2
+        edges = [(i, j, 1) for (i, j), d in diff.items() if d <= thresholds[mid]]
+        if _perfect_matching(num, edges) is not None:
+            best = thresholds[mid]
+            high = mid - 1
+        else:
+            low = mid + 1
+
+    # Now minimize the total difference for the best maximum difference
+    return _perfect_matching(num, [(i, j, best + 1 - d) for (i, j), d in diff.items() if d <= best])
+
+
+def exact_matching(ratings: List[int], played: Callable[[int, int], bool], max_diff=-1, window=DEFAULT_WINDOW):
+    """
+    Exact pairing of the fighters given by their positions in the standings
+
+    The objective is lexicographic: first the maximum rating difference in a pair is minimized,
+    then the total difference of all the pairs. Rematches are only made if there is no perfect
+    matching without them, and in that case the number of rematches is minimized.
+
+    If the ratings are sorted, the standings are first paired by parts, see _segment_matching,
+    and the result is kept when it reaches the lower bounds of the objective, so it is the true optimum.
+    Otherwise the pairs are looked for among the window nearest fighters in the standings, so the graph
+    is sparse and the result is only optimal among these candidates: a better pairing with a partner
+    further than window places away is not found. The window is doubled while there is no perfect
+    matching in it.
+
+    If there is no pairing without rematches even with all the pairs as candidates, the rematches are
+    allowed on the whole graph: their number is minimized first, and only then the rating differences,
+    still within max_diff. This step is O(n^3) on the full graph and takes tens of seconds for
+    thousands of fighters who have met many others. If max_diff does not let everyone be paired
+    even with rematches, it is relaxed with a warning, and the maximum difference is minimized
+    without the limit.
+
+    :param ratings: ratings of the fighters in standings order
+    :param played: played(i, j) is True if the fighters i and j have already met
+    :param max_diff: maximum allowed rating difference in a pair, negative for no limit
+    :param window: number of the nearest fighters in the standings to be paired with
+    :return: list of pairs of positions (i, j), i < j, and the number of rematches
+    """
+    num = len(ratings)
+    if num % 2 != 0:
+        raise ValueError("Number of fighters is {}, does not suit for pairing".format(num))
+    pairs = _segment_matching(ratings, played, max_diff)
+    if pairs is not None:
+        return pairs, 0
+
+    window = max(1, window)
+    while True:
+        diff, _ = _candidate_edges(ratings, played, max_diff, window)
+        pairs = _bottleneck_matching(num, diff)
+        if pairs is not None:
+            return pairs, 0
+        if window >= num - 1:
+            break
+        window *= 2
+
+    # No perfect matching without rematches. The rematch pairs are allowed then,
+    # but a rematch costs more than any possible gain in the rating difference
+    top = max(ratings) - min(ratings)
+    rematch_cost = (num // 2 + 1) * (top + 1) + 2
+    diff, rematches = _candidate_edges(ratings, played, max_diff, num)
+    pairs = _perfect_matching(num, [(i, j, rematch_cost - d) for (i, j), d in diff.items()] +
+                              [(i, j, 1) for i, j in rematches])
+    if pairs is None:
+        warnings.warn("No pairing with max_diff {}, the limit is relaxed!".format(max_diff))
+        return exact_matching(ratings, played, -1, num)
+    return pairs, sum(1 for p in pairs if p not in diff)
+
+
+def swiss_pairings_exact(fighters: List[Fighter], max_diff=-1, stats: PairingStats = None, window=DEFAULT_WINDOW):
+    """Returns a list of pairs of players for the next round of a match in this tour.
+
+    The same contract as swiss_pairings, but the pairing is a matching instead of a beam search result:
+    the maximum rating difference is minimized, then the total one, without any rematch
+    whenever such a pairing exists. It never falls back to swiss_pairings_old.
+    The result is optimal when the standings can be paired by neighbours; otherwise it is optimal
+    among the pairs of the window nearest fighters in the standings. When the rematches are unavoidable
+    they go first in the objective, and max_diff may be relaxed, see exact_matching for the details and the cost.
+
+    Returns: a list of tuples of fighters
+    """
+    if len(fighters) % 2 != 0 or len(fighters) == 0:
+        raise ValueError("Number of fighters is {}, does not suit for pairing".format(len(fighters)))
+    if stats is not None:
+        stats.start('swiss_pairings_exact')
+
+    matrix = PairingMatrix(fighters)
+    pairs, rematches = exact_matching(matrix.ratings.tolist(), lambda i, j: matrix.played[i, j], max_diff,
+                                      window)
+    if rematches:
+        warnings.warn("Pairings contain {} repeated fights, no other pairing exists!".format(rematches))
+    pairs = matrix.to_fighters(pairs)
+    if stats is not None:
+        stats.finish(pairs)
+    return pairs
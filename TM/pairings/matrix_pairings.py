@@ -0,0 +1,131 @@
+import time
+import warnings
+import numpy as np
+from typing import List
+from TM.tournament import Fighter, get_rating
+from .pairing_stats import PairingStats
+from .swiss_pairings import swiss_pairings_old
+
+
+class PairingMatrix:
+    """ Pairing data for one round
+
+    The fighters are indexed by their position in the standings. .cost is the matrix of
+    the rating differences and .played is the boolean rematch mask, both are built once per round,
+    so the pairing engines do not need to look up the fighters' enemies by name any more
+    """
+    def __init__(self, fighters: List[Fighter]):
+        table = getattr(fighters[0], 'table', None) if fighters else None
+        if table is not None and all(getattr(f, 'table', None) is table for f in fighters):
+            self._from_table(fighters, table)
+            return
+
+        self.standings = sorted(fighters, key=get_rating, reverse=True)
+        self.ratings = np.array([f.rating for f in self.standings])
+        self.cost = np.abs(self.ratings[:, None] - self.ratings[None, :])
+
+        index = {f.name: i for i, f in enumerate(self.standings)}
+        self.played = np.zeros((len(self.standings), len(self.standings)), dtype=bool)
+        for i, f in enumerate(self.standings):
+            for name in f.enemies:
+                # the enemies may be out of the tournament already
+                j = index.get(name)
+                if j is not None and f.played(self.standings[j]):
+                    self.played[i, j] = True
+        # already_played checks both directions, see Fighter.normalize_played
+        self.played |= self.played.T
+
+    def _from_table(self, fighters, table):
+        # The fighters stored in a FighterTable, so the data is taken from its arrays
+        by_id = {f.id: f for f in fighters}
+        ids = table.standings(list(by_id))
+        self.standings = [by_id[i] for i in ids.tolist()]
+        self.ratings = table.ratings[ids]
+        self.cost = np.abs(self.ratings[:, None] - self.ratings[None, :])
+        self.played = table.played_matrix(ids.tolist())
+
+    def __len__(self):
+        return len(self.standings)
+
+    def to_fighters(self, pairs):
+        return [(self.standings[i], self.standings[j]) for i, j in pairs]
+
+
+def matrix_beam(cost: np.ndarray, played: np.ndarray, max_diff=-1, candidates_to_keep=15,
+                stats: PairingStats = None):
+    """
+    The beam search of swiss_pairings with all the candidates of a level expanded at once
+
+    :param cost: matrix of the rating differences
+    :param played: boolean matrix, True for the pairs which have already met
+    :param max_diff: maximum allowed rating difference in a pair, negative for no limit
+    :param candidates_to_keep: beam width
+    :param stats: PairingStats to add the beam levels to, or None
+    :return: array of pairs of standings positions, or None if the search failed
+    """
+    num = cost.shape[0]
+    allowed = ~played
+    if max_diff >= 0:
+        allowed &= cost <= max_diff
+    # nobody fights himself
+    np.fill_diagonal(allowed, False)
+
+    # Every candidate is a row: which fighters are used, the pairs so far and the objective
+    used = np.zeros((1, num), dtype=bool)
+    pairs = np.zeros((1, 0, 2), dtype=int)
+    max_cost = np.zeros(1, dtype=cost.dtype)
+    tot_cost = np.zeros(1, dtype=cost.dtype)
+
+    for _ in range(num // 2):
+        level_start = time.perf_counter()
+        # the first free fighter of every candidate and all his possible opponents
+        first = np.argmin(used, axis=1)
+        options = allowed[first] & ~used
+        parent, second = np.nonzero(options)
+        if len(parent) == 0:
+            if stats is not None:
+                stats.add_level(time.perf_counter() - level_start, 0, 0)
+            return None
+
+        pair_cost = cost[first[parent], second]
+        new_max = np.maximum(max_cost[parent], pair_cost)
+        new_tot = tot_cost[parent] + pair_cost
+        # lexicographic objective: maximum difference, then total difference
+        keep = np.lexsort((new_tot, new_max))[:candidates_to_keep]
+
+        parent, second = parent[keep], second[keep]
+        used = used[parent]
+        used[np.arange(len(keep)), first[parent]] = True
+        used[np.arange(len(keep)), second] = True
+        pairs = np.concatenate([pairs[parent], np.stack([first[parent], second], axis=1)[:, None, :]], axis=1)
+        max_cost, tot_cost = new_max[keep], new_tot[keep]
+        if stats is not None:
+            stats.add_level(time.perf_counter() - level_start, len(new_max), len(keep))
+    return pairs[0]
+
+
+def swiss_pairings_matrix(fighters: List[Fighter], max_diff=-1, candidates_to_keep=15,
+                          stats: PairingStats = None):
+    """Returns a list of pairs of players for the next round of a match in this tour.
+
+    The same as swiss_pairings, but the cost and the rematch matrices are precomputed as NumPy arrays,
+    and the beam levels are expanded with vectorized row operations
+
+    Returns: a list of tuples of fighters
+    """
+    if len(fighters) % 2 != 0 or len(fighters) == 0:
+        raise ValueError("Number of fighters is {}, does not suit for pairing".format(len(fighters)))
+    if stats is not None:
+        stats.start('swiss_pairings_matrix')
+
+    matrix = PairingMatrix(fighters)
+    pairs = matrix_beam(matrix.cost, matrix.played, max_diff, candidates_to_keep, stats)
+    if pairs is None:
+        warnings.warn("Pairings failed to match without repeared fight!")
+        if stats is not None:
+            stats.fallback = True
+        return swiss_pairings_old(fighters, stats)
+    pairs = matrix.to_fighters(pairs)
+    if stats is not None:
+        stats.finish(pairs)
+    return pairs
@@ -0,0 +1,70 @@
+import time
+
+
+class PairingStats:
+    """ What a pairing function did to make one pairing
+
+    A pairing function given stats=PairingStats() fills it: .start() before the search, .add_level()
+    for every level of the beam search (seconds, candidates generated, candidates kept), .fallback if
+    swiss_pairings_old had to be used, and .finish() with the pairs, which computes their
+    max_diff, tot_diff and number of rematches. Tournament.make_pairs marks .cache_hit if the pairs
+    were taken from the PairingCache without a search
+    """
+    def __init__(self):
+        self.engine = None
+        # (seconds, generated, kept) for every beam level
+        self.levels = []
+        self.fallback = False
+        self.cache_hit = False
+        self.time = None
+        self.max_diff = None
+        self.tot_diff = None
+        self.rematches = None
+        self._started = None
+
+    def start(self, engine):
+        self.engine = engine
+        self._started = time.perf_counter()
+
+    def add_level(self, seconds, generated, kept):
+        self.levels.append((seconds, generated, kept))
+
+    def finish(self, pairs):
+        if self._started is not None:
+            self.time = time.perf_counter() - self._started
+        diffs = [abs(f1.rating - f2.rating) for f1, f2 in pairs]
+        self.max_diff = max(diffs, default=0)
+        self.tot_diff = sum(diffs)
+        self.rematches = sum(1 for f1, f2 in pairs if f1.played(f2) > 0 or f2.played(f1) > 0)
+        return pairs
+
+    @property
+    def generated(self):
+        return sum(level[1] for level in self.levels)
+
+    @property
+    def pruned(self):
+        return sum(level[1] - level[2] for level in self.levels)
+
+    @property
+    def slowest_level(self):
+        """
+        :return: number of the slowest beam level (from 0) and its time, None if there were no levels
+        """
+        if not self.levels:
+            return None
+        i = max(range(len(self.levels)), key=lambda k: self.levels[k][0])
+        return i, self.levels[i][0]
+
+    def __str__(self):
+        s = '{}: {:.4f} s, max_diff {}, tot_diff {}, rematches {}'.format(
+            self.engine, self.time or 0.0, self.max_diff, self.tot_diff, self.rematches)
+        if self.levels:
+            level, seconds = self.slowest_level
+            s += ', {} levels, {} candidates generated, {} pruned, slowest level {} ({:.4f} s)'.format(
+                len(self.levels), self.generated, self.pruned, level, seconds)
+        if self.fallback:
+            s += ', FALLBACK to swiss_pairings_old'
+        if self.cache_hit:
+            s += ', taken from the cache'
+        return s
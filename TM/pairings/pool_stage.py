@@ -0,0 +1,54 @@
+from itertools import zip_longest
+from typing import List
+from TM.tournament import Fighter, get_rating
+from .round_pairings import round_pairings
+from .scheduler import schedule
+
+
+def snake_pools(fighters: List[Fighter], num_pools: int) -> List[List[Fighter]]:
+    """
+    Splits the fighters into balanced pools by snake seeding:
+    the best fighter goes to pool 1, the next to pool 2, ..., then back from the last pool to the first one
+
+    :return: list of pools, their sizes differ by one at most
+    """
+    if num_pools < 1:
+        raise ValueError("Number of pools must be positive, got {}".format(num_pools))
+    pools = [[] for _ in range(num_pools)]
+    for i, f in enumerate(sorted(fighters, key=get_rating, reverse=True)):
+        rnd, pos = divmod(i, num_pools)
+        pools[pos if rnd % 2 == 0 else num_pools - 1 - pos].append(f)
+    return pools
+
+
+def pool_schedule(size):
+    """
+    :return: the round_pairings schedule of a pool as the pairs of the positions in the pool
+    """
+    return round_pairings(list(range(size)))
+
+
+def pool_stage_pairings(fighters: List[Fighter], num_pools=4):
+    """
+    All the fights of the pool stage: every fighter meets everyone in his pool
+
+    The schedules of the pools are cheap (round_pairings of the positions), so they are made in this process.
+    The pools take turns
+    in the merged list (a fight of pool 1, of pool 2, ..., then again of pool 1), so that every fighter
+    rests while the other pools fight. The list is a pairing for the usual write(pairs, round_num) of the apis,
+    which spread it over the areas, see TM.pairings.scheduler
+
+    Returns: a list of tuples of fighters
+    """
+    pools = snake_pools(fighters, num_pools)
+    schedules = [pool_schedule(len(pool)) for pool in pools]
+
+    pool_pairs = [[(pool[i], pool[j]) for i, j in pool_pairs] for pool, pool_pairs in zip(pools, schedules)]
+    return [pair for turn in zip_longest(*pool_pairs) for pair in turn if pair is not None]
+
+
+def pool_stage_schedule(fighters: List[Fighter], num_pools=4, num_areas=2, min_gap=1):
+    """
+    :return: the pool stage fights for every area by time slot, see TM.pairings.scheduler.schedule
+    """
+    return schedule(pool_stage_pairings(fighters, num_pools), num_areas, min_gap)
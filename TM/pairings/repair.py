@@ -0,0 +1,112 @@
+from typing import List, Optional, Sequence, Tuple
+from TM.tournament import Fighter, get_rating
+from .exact_pairings import exact_matching
+from .pairing_stats import PairingStats
+from .swiss_pairings import already_played
+
+
+def solve_window(free: List[Fighter], bye_names=None, max_diff=-1):
+    """
+    Exact pairing of the fighters freed by the repair, one of them gets a bye if their number is odd
+
+    :param free: the fighters in standings order
+    :param bye_names: names of the fighters who may get the bye, None for any of them
+    :return: pairs of fighters, the fighter with the bye or None, and the number of rematches
+    """
+    best = None
+    # the bye goes to the lowest in the standings if the choices are equal
+    byes = [None] if len(free) % 2 == 0 else \
+        [i for i in range(len(free) - 1, -1, -1) if bye_names is None or free[i].name in bye_names]
+    for bye in byes:
+        fighters = [f for i, f in enumerate(free) if i != bye]
+        if not fighters:
+            pairs, rematches = [], 0
+        else:
+            pairs, rematches = exact_matching([f.rating for f in fighters],
+                                              lambda i, j: already_played(fighters[i], fighters[j]), max_diff)
+        pairs = [(fighters[i], fighters[j]) for i, j in pairs]
+        diffs = [abs(f1.rating - f2.rating) for f1, f2 in pairs]
+        objective = (rematches, max(diffs, default=0), sum(diffs))
+        if best is None or objective < best[0]:
+            best = (objective, pairs, None if bye is None else free[bye])
+    return best[1], best[2], best[0][0]
+
+
+def repair_pairings(pairs: Sequence[Tuple[Fighter, Fighter]], withdrawn: Sequence[Fighter] = (),
+                    added: Sequence[Fighter] = (), window=2, max_window=16, max_diff=-1,
+                    stats: PairingStats = None,
+                    bye: Fighter = None) -> Tuple[List[Tuple[Fighter, Fighter]], Optional[Fighter]]:
+    """
+    Repairs a published pairing after some fighters withdrew or were added, changing as few fights as possible
+
+    The pairs with the withdrawn fighters are broken, and so are the pairs of the fighters within window places
+    in the standings from every freed (or added) fighter. Only these fighters are paired again,
+    exactly (see exact_matching), the other pairs stay as they are and where they are in the list.
+    If the window can not be paired without a rematch, it is doubled up to max_window.
+
+    Tournament has no byes: it keeps the number of the fighters even (the lucky one, see Tournament.remove).
+    So the bye only appears when a repair makes the number odd, and the caller decides what it means
+    (e.g. the fight is won without the points lost, or the fighter is paired by hand). A bye not settled yet
+    must be passed to the next repair, where that fighter is free, so that there is never a second one.
+
+    :param pairs: the published pairs
+    :param withdrawn: the fighters who left, they may be in the pairs by name
+    :param added: the fighters to add to the round
+    :param bye: the fighter with the bye of the previous repair, if any, not in the pairs
+    :return: the repaired pairs and the fighter with a bye (if the number of the fighters is odd), or None
+    """
+    if stats is not None:
+        stats.start('repair_pairings')
+    gone = set(f.name for f in withdrawn)
+    free = set(f.name for f in added)
+    fighters = list(added)
+    if bye is not None and bye.name not in gone and bye.name not in free:
+        free.add(bye.name)
+        fighters.append(bye)
+    for pair in pairs:
+        if any(f.name in gone for f in pair):
+            free.update(f.name for f in pair if f.name not in gone)
+        fighters += [f for f in pair if f.name not in gone]
+    if not free:
+        pairs = list(pairs) if not gone else [p for p in pairs if not any(f.name in gone for f in p)]
+        if stats is not None:
+            stats.finish(pairs)
+        return pairs, None
+
+    standings = sorted(fighters, key=get_rating, reverse=True)
+    position = {f.name: i for i, f in enumerate(standings)}
+    partner = {}
+    for pair in pairs:
+        if not any(f.name in gone for f in pair):
+            partner[pair[0].name], partner[pair[1].name] = pair[1].name, pair[0].name
+
+    while True:
+        # the pairs in the neighbourhood of the free fighters are broken
+        broken = set(free)
+        for name in free:
+            p = position[name]
+            for f in standings[max(0, p - window):p + window + 1]:
+                broken.add(f.name)
+                if f.name in partner:
+                    broken.add(partner[f.name])
+        window_fighters = [f for f in standings if f.name in broken]
+        # the bye goes to one of the fighters whose fight is lost anyway
+        new_pairs, bye, rematches = solve_window(window_fighters, free, max_diff)
+        if rematches == 0 or window >= max_window or len(broken) == len(standings):
+            break
+        window *= 2
+
+    # the new pairs take the places of the broken ones, the extra ones go to the end
+    new_pairs = iter(new_pairs)
+    repaired = []
+    for pair in pairs:
+        if any(f.name in broken or f.name in gone for f in pair):
+            new_pair = next(new_pairs, None)
+            if new_pair is not None:
+                repaired.append(new_pair)
+        else:
+            repaired.append(pair)
+    repaired += list(new_pairs)
+    if stats is not None:
+        stats.finish(repaired)
+    return repaired, bye
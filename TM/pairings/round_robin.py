@@ -0,0 +1,86 @@
+import numpy as np
+from typing import Iterator, Sequence, Tuple
+from .round_pairings import round_pairings
+
+
+class RoundRobin:
+    """ Round-robin schedule by the circle method
+
+    The fights are not stored: the k-th one is computed in O(1), so the schedule of any size
+    can be iterated lazily or resumed from any fight. The last fighter stays in place and the others
+    rotate by one every round; with an odd number of fighters the fixed place is empty (a bye).
+    The fights of a round go in the order of the circle positions, and then no fighter has two fights
+    in a row for 6 and more fighters. For the smaller groups the fights are taken from round_pairings.
+    """
+    def __init__(self, fighters: Sequence):
+        self.fighters = list(fighters)
+        n = len(self.fighters)
+        # number of places on the circle, the bye takes the last one for an odd number of fighters
+        self._places = n + n % 2
+        # the fight with the fixed place is skipped if it is a bye
+        self._first = n % 2
+        self._per_round = self._places // 2 - self._first
+        self._small = round_pairings(list(range(n))) if n < 6 else None
+
+    @property
+    def rounds(self):
+        return self._places - 1 if len(self.fighters) > 1 else 0
+
+    def __len__(self):
+        n = len(self.fighters)
+        return n * (n - 1) // 2
+
+    def indices(self, k) -> Tuple[int, int]:
+        """
+        :return: positions in .fighters of the k-th fight
+        """
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError("Fight {} is out of the schedule of {} fights".format(k, len(self)))
+        if self._small is not None:
+            return self._small[k]
+        rnd, pos = divmod(k, self._per_round)
+        pos += self._first
+        circle = self._places - 1
+        first = circle if pos == 0 else (pos + rnd) % circle
+        second = (circle - pos + rnd) % circle
+        return first, second
+
+    def __getitem__(self, k):
+        first, second = self.indices(k)
+        return self.fighters[first], self.fighters[second]
+
+    def fights(self, start=0) -> Iterator[Tuple]:
+        """
+        Generates the fights from the start-th one
+        """
+        for k in range(start, len(self)):
+            yield self[k]
+
+    def __iter__(self):
+        return self.fights()
+
+
+def fight_rest_gaps(fights: np.ndarray) -> np.ndarray:
+    """
+    :param fights: array (number of fights, 2) of the fighter numbers in the order of the fights
+    :return: for every two consecutive bouts of a fighter, the number of the fights between them.
+    Unlike TM.pairings.scheduler.rest_gaps, the gaps are counted in fights, not in the time slots of the areas
+    """
+    fights = np.asarray(fights)
+    fighters = fights.ravel()
+    order = np.repeat(np.arange(len(fights)), 2)
+    # group the bouts by fighter, in the order of the fights
+    sort = np.lexsort((order, fighters))
+    fighters, order = fighters[sort], order[sort]
+    same = fighters[1:] == fighters[:-1]
+    return (order[1:] - order[:-1] - 1)[same]
+
+
+def check_rest(fights: np.ndarray, min_gap=1) -> bool:
+    """
+    :return: True if every fighter has at least min_gap other fights between his bouts
+    """
+    gaps = fight_rest_gaps(fights)
+    return len(gaps) == 0 or gaps.min() >= min_gap
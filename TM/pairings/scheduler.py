@@ -0,0 +1,70 @@
+from typing import List, Optional, Sequence, Tuple
+
+
+def fighter_key(fighter):
+    # the fighters may be Fighter objects or plain names/numbers, as in round_pairings
+    return getattr(fighter, 'name', fighter)
+
+
+def schedule(pairs: Sequence[Tuple], num_areas: int, min_gap=1) -> List[List[Optional[Tuple]]]:
+    """
+    Spreads the fights over the areas and the time slots
+
+    The slots are filled one by one, every slot takes up to num_areas fights in the order of pairs,
+    skipping the ones whose fighters had a bout less than min_gap slots ago. If no fight fits,
+    the area stays idle in this slot. When every fighter has one bout (a swiss round), the areas get
+    len(pairs) // num_areas or one more fights, and the round takes ceil(len(pairs) / num_areas) slots,
+    which is the minimum.
+
+    :param pairs: list of fights (tuples of fighters)
+    :param num_areas: number of the fight areas
+    :param min_gap: minimum number of the slots between the bouts of a fighter
+    :return: for every area, the list of its fights by slot, None for an idle slot
+    """
+    if num_areas < 1:
+        raise ValueError("Number of areas must be positive, got {}".format(num_areas))
+    areas = [[] for _ in range(num_areas)]
+    last_slot = {}
+    pending = list(pairs)
+    slot = 0
+    while pending:
+        busy = set()
+        taken = []
+        for i, pair in enumerate(pending):
+            if len(taken) == num_areas:
+                break
+            keys = [fighter_key(f) for f in pair]
+            if any(k in busy or slot - last_slot.get(k, -min_gap - 1) <= min_gap for k in keys):
+                continue
+            busy.update(keys)
+            taken.append(i)
+        for area, i in enumerate(taken):
+            areas[area].append(pending[i])
+            for f in pending[i]:
+                last_slot[fighter_key(f)] = slot
+        for area in range(len(taken), num_areas):
+            areas[area].append(None)
+        for i in reversed(taken):
+            del pending[i]
+        slot += 1
+
+    # the idle slots at the end of the round are not needed
+    for area in areas:
+        while area and area[-1] is None:
+            area.pop()
+    return areas
+
+
+def rest_gaps(areas: List[List[Optional[Tuple]]]):
+    """
+    :param areas: the schedule, see schedule()
+    :return: the minimal number of the slots between two bouts of a fighter, None if nobody fights twice
+    """
+    slots = {}
+    for area in areas:
+        for slot, pair in enumerate(area):
+            if pair is not None:
+                for f in pair:
+                    slots.setdefault(fighter_key(f), []).append(slot)
+    gaps = [b - a - 1 for s in slots.values() for a, b in zip(sorted(s), sorted(s)[1:])]
+    return min(gaps) if gaps else None
@@ -1,7 +1,13 @@
+import heapq
+import itertools
+import pickle
+import threading
+import time
 import warnings
-import numpy as np
-from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
 from TM.tournament import Fighter, get_rating
+from .pairing_stats import PairingStats
 
 
 def already_played(player1: Fighter, player2: Fighter) -> bool:
@@ -12,7 +18,7 @@ def already_played(player1: Fighter, player2: Fighter) -> bool:
     return player1.played(player2) > 0 or player2.played(player1) > 0
 
 
-def swiss_pairings_old(fighters):
+def swiss_pairings_old(fighters, stats: PairingStats = None):
     """Returns a list of pairs of players for the next round of a match in this tour.
 
     Assuming that there are an even number of players registered, each player
@@ -26,6 +32,8 @@ def swiss_pairings_old(fighters):
 
     if len(fighters) % 2 != 0 or len(fighters) == 0:
         raise ValueError("Number of fighters is {}, does not suit for pairing".format(len(fighters)))
+    if stats is not None and stats.engine is None:
+        stats.start('swiss_pairings_old')
 
     standings = sorted(fighters, key=get_rating, reverse=True)
 
@@ -40,6 +48,8 @@ def swiss_pairings_old(fighters):
                     j -= 1
                 break
         pairings.append((standings[i], standings[i + 1]))
+    if stats is not None:
+        stats.finish(pairings)
     return pairings
 
 
@@ -48,29 +58,114 @@ def swiss_pairings_old(fighters):
 class Candidate:
     """ A Candidate pairing
 
-    It represents a pairing under construction, where .pairs are established pairs,
-    and .remaining are the fighters who do not have a pair yet
+    It represents a pairing under construction. Fighters are referred by their position in the standings:
+    .used is a bitmask of the fighters who already have a pair, and the established pairs are
+    a chain of .pair through the .parent candidates, so the candidates of the next level share
+    the structure with their parent instead of copying it
 
     It is necessary for the swiss_pairings to store the pairing variants
 
     """
-    def __init__(self, pairs: List[Tuple[Fighter, Fighter]], fighters: List[Fighter]):
-        self.pairs = pairs
-        self.remaining = [f for f in fighters if not any(f in p for p in pairs)]
-
-        diff = [abs(p[0].rating - p[1].rating) for p in pairs]
-        if not diff:
-            self.max_diff = 0
-            self.tot_diff = 0
-        else:
-            self.max_diff = np.max(diff)
-            self.tot_diff = np.sum(diff)
+    __slots__ = ('parent', 'pair', 'used', 'max_diff', 'tot_diff')
+
+    def __init__(self, parent=None, pair=None, used=0, max_diff=0, tot_diff=0):
+        self.parent = parent
+        self.pair = pair
+        self.used = used
+        self.max_diff = max_diff
+        self.tot_diff = tot_diff
+
+    def add_pair(self, pair, diff):
+        return Candidate(self, pair, self.used | (1 << pair[0]) | (1 << pair[1]),
+                         max(self.max_diff, diff), self.tot_diff + diff)
+
+    def first_free(self):
+        # the lowest zero bit of .used
+        return (~self.used & (self.used + 1)).bit_length() - 1
+
+    @property
+    def pairs(self):
+        pairs = []
+        c = self
+        while c.pair is not None:
+            pairs.append(c.pair)
+            c = c.parent
+        return pairs[::-1]
+
+
+def played_masks(standings) -> List[int]:
+    """
+    :param standings: list of fighters
+    :return: for every fighter, the bitmask of the positions in standings he can not be paired with
+    """
+    index = {f.name: i for i, f in enumerate(standings)}
+    masks = [1 << i for i in range(len(standings))]
+    for i, f in enumerate(standings):
+        for name in f.enemies:
+            j = index.get(name)
+            # the check is mutual, as in already_played
+            if j is not None and f.played(standings[j]):
+                masks[i] |= 1 << j
+                masks[j] |= 1 << i
+    return masks
+
+
+def expand(states, offset, keep, ratings, forbidden, max_diff):
+    """
+    One level of the beam search for a part of the candidates
+
+    :param states: list of (used, max_diff, tot_diff) of the candidates
+    :param offset: index of the first of the states among all the candidates
+    :param keep: number of the best expansions to return
+    :return: number of the expansions generated and
+    sorted list of the best ones (max_diff, tot_diff, candidate index, first, second, diff)
+    """
+    full = (1 << len(ratings)) - 1
+    expansions = []
+    for index, (used, c_max, c_tot) in enumerate(states, offset):
+        # the lowest zero bit, see Candidate.first_free
+        first = (~used & (used + 1)).bit_length() - 1
+        options = ~(used | forbidden[first]) & full
+        while options:
+            low = options & -options
+            options ^= low
+            second = low.bit_length() - 1
+            diff = abs(ratings[first] - ratings[second])
+            if diff <= max_diff or max_diff < 0:
+                expansions.append((max(c_max, diff), c_tot + diff, index, first, second, diff))
+    return len(expansions), heapq.nsmallest(keep, expansions, key=lambda e: (e[0], e[1]))
+
+
+# The pairing data of the last round seen by a worker process, (round key, data), see _expand_in_worker
+_worker_round = (None, None)
+# The unique keys of the pairings sent to the workers
+_round_keys = itertools.count()
+# The shared process pools by the number of workers, see get_pool
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    :return: the process pool of the module for the number of workers, it is created on the first call
+    and reused by all the next pairings, so the processes are started once
+    """
+    with _pools_lock:
+        if workers not in _pools:
+            _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+        return _pools[workers]
 
-    def add_pair(self, pair):
-        return Candidate(self.pairs + [pair], self.remaining)
 
+def _expand_in_worker(round_key, round_data, states, offset, keep):
+    global _worker_round
+    # every task carries the pickled data of its pairing, but a worker unpickles it once per pairing
+    if _worker_round[0] != round_key:
+        _worker_round = (round_key, pickle.loads(round_data))
+    return expand(states, offset, keep, *_worker_round[1])
 
-def swiss_pairings(fighters: List[Fighter], max_diff=-1, candidates_to_keep=15):
+
+def swiss_pairings(fighters: List[Fighter], max_diff=-1, candidates_to_keep=15, workers=None,
+                   stats: PairingStats = None, executor: ProcessPoolExecutor = None):
     """Returns a list of pairs of players for the next round of a match in this tour.
 
     Assuming that there are an even number of players registered, each player
@@ -79,38 +174,67 @@ def swiss_pairings(fighters: List[Fighter], max_diff=-1, candidates_to_keep=15):
     to him or her in the standings.  Rematches are not allowed, so all pairings are new
     (excluding situations when all pairs have matched, see Fighter.normalize_played )
 
+    If workers > 1, the candidates of every level are split between the processes of a pool,
+    which is worth it only for the wide beams (large candidates_to_keep) on several cores,
+    see the 'parallel' engine of benchmarks/bench_pairings.py. The result is the same.
+
+    :param stats: PairingStats to fill with the beam levels and the result, None not to collect them
+    :param executor: the process pool for workers > 1, the shared one of get_pool(workers) by default
+
     Returns: a list of tuples of fighters
     """
     if len(fighters) % 2 != 0 or len(fighters) == 0:
         raise ValueError("Number of fighters is {}, does not suit for pairing".format(len(fighters)))
+    if stats is not None:
+        stats.start('swiss_pairings')
 
     standings = sorted(fighters, key=get_rating, reverse=True)
+    ratings = [f.rating for f in standings]
+    forbidden = played_masks(standings)
+
+    pool = None
+    if workers is not None and workers > 1:
+        pool = executor if executor is not None else get_pool(workers)
+        round_key = next(_round_keys)
+        round_data = pickle.dumps((ratings, forbidden, max_diff), protocol=pickle.HIGHEST_PROTOCOL)
 
     # Dynamic programming method with width-search and cutoff of the bad variants
     # We start from pairing all the players with the first one
     # Then we add the next pair to each first pair until all are paired
     # Keeping these requirements:
     # 1. Without the same pairing twice
-    # 2. Minimizing the maximum point difference between matches
+    # 2. Minimizing the maximum point difference between matches, then the total difference
     # The current version cuts the best candidates at every iteration and thus is sped up very much, but
     # can miss good variants
-
-    candidates = [Candidate([], standings)]
+    candidates = [Candidate()]
     for i in range(len(standings)//2):
-        new_candidates = []
-        for c in candidates:
-            first = c.remaining[0]
-            for second in c.remaining[1:]:
-                if not already_played(first,second) and \
-                        (abs(first.rating - second.rating) <= max_diff or max_diff < 0):
-                    new_candidates.append(c.add_pair((first, second)))
-        candidates = sorted(new_candidates,
-                            key=lambda candidate: candidate.max_diff)[0:min(candidates_to_keep, len(new_candidates))]
+        # Only the objective and the new pair are stored for the expansions,
+        # and the Candidate objects are created for the survivors
+        level_start = time.perf_counter()
+        states = [(c.used, c.max_diff, c.tot_diff) for c in candidates]
+        if pool is not None and len(states) > workers:
+            # Contiguous shards, so that the merged list keeps the candidates order for the ties
+            shard = -(-len(states) // workers)
+            futures = [pool.submit(_expand_in_worker, round_key, round_data, states[k:k + shard], k,
+                                   candidates_to_keep)
+                       for k in range(0, len(states), shard)]
+            shards = [future.result() for future in futures]
+            generated = sum(shard[0] for shard in shards)
+            expansions = [e for shard in shards for e in shard[1]]
+        else:
+            generated, expansions = expand(states, 0, candidates_to_keep, ratings, forbidden, max_diff)
+        best = heapq.nsmallest(candidates_to_keep, expansions, key=lambda e: (e[0], e[1]))
+        candidates = [candidates[e[2]].add_pair((e[3], e[4]), e[5]) for e in best]
+        if stats is not None:
+            stats.add_level(time.perf_counter() - level_start, generated, len(candidates))
         # In some cases the algorithm will fail and give zero candidates for the current standings.
         # It is a rare situation in real parameters, but we must have a solution for it
         if len(candidates) == 0:
             warnings.warn("Pairings failed to match without repeared fight!")
-            return swiss_pairings_old(fighters)
-    # candidates = sorted(candidates, key=lambda candidate: candidate.max_diff*len(standings)*10 + candidate.tot_diff)
-    return candidates[0].pairs
-
+            if stats is not None:
+                stats.fallback = True
+            return swiss_pairings_old(fighters, stats)
+    pairs = [(standings[i], standings[j]) for i, j in candidates[0].pairs]
+    if stats is not None:
+        stats.finish(pairs)
+    return pairs
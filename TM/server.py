@@ -0,0 +1,162 @@
+"""
+Local HTTP/JSON server for several tournaments (weapon categories) in one asyncio process
+
+Every category is an object with the blocking methods (see mws.Category):
+    next_round() -> dict     imports the results of the current round and makes the next one
+    restart(rounds, trusted_rounds) -> dict
+    standings() -> list
+    submit(round_num, results) -> dict   stages the results sent by an operator
+    status() -> dict
+The calls run in a thread pool, so a slow pairing of one category does not stall the others,
+and the calls to the same category are serialized by its lock.
+
+Routes:
+    GET  /categories
+    GET  /<category>            status
+    GET  /<category>/list       standings
+    POST /<category>/round
+    POST /<category>/restart    {"rounds": N, "trusted_rounds": K}, trusted_rounds is optional
+    POST /<category>/results    {"round": N, "results": [[fighter1, score1, fighter2, score2], ...]}
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+
+# the largest request body accepted, in bytes
+MAX_BODY = 1024 * 1024
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class TournamentServer:
+    def __init__(self, categories, executor=None):
+        """
+        :param categories: dict {name: category}
+        :param executor: executor for the blocking calls, a thread pool with a thread per category by default
+        """
+        self.categories = categories
+        self.executor = executor if executor is not None else ThreadPoolExecutor(max_workers=max(1, len(categories)))
+        self._locks = {}
+        self._server = None
+
+    def lock(self, name):
+        # the locks are created in the loop of the server
+        if name not in self._locks:
+            self._locks[name] = asyncio.Lock()
+        return self._locks[name]
+
+    async def call(self, name, method, *args):
+        """
+        Runs the blocking method of the category in the executor, one call per category at a time
+        """
+        category = self.categories[name]
+        async with self.lock(name):
+            return await asyncio.get_running_loop().run_in_executor(self.executor, getattr(category, method), *args)
+
+    async def dispatch(self, method, path, body):
+        """
+        :return: the JSON-serializable answer to the request
+        """
+        parts = [unquote(p) for p in path.split('?')[0].strip('/').split('/') if p]
+        if parts == ['categories']:
+            if method != 'GET':
+                raise HttpError(405, 'Use GET for /categories')
+            return {'categories': sorted(self.categories)}
+        if not parts or len(parts) > 2:
+            raise HttpError(404, 'Unknown path {}'.format(path))
+        name = parts[0]
+        if name not in self.categories:
+            raise HttpError(404, 'Unknown category {}'.format(name))
+        action = parts[1] if len(parts) > 1 else 'status'
+
+        if action in ('status', 'list'):
+            if method != 'GET':
+                raise HttpError(405, 'Use GET for {}'.format(action))
+            return await self.call(name, 'status' if action == 'status' else 'standings')
+        if method != 'POST':
+            raise HttpError(405, 'Use POST for {}'.format(action))
+        if action == 'round':
+            return await self.call(name, 'next_round')
+        if action == 'restart':
+            try:
+                rounds = int(body['rounds'])
+                trusted_rounds = None if body.get('trusted_rounds') is None else int(body['trusted_rounds'])
+            except (KeyError, TypeError, ValueError):
+                raise HttpError(400, 'Send {"rounds": <int>, "trusted_rounds": <int>}') from None
+            return await self.call(name, 'restart', rounds, trusted_rounds)
+        if action == 'results':
+            try:
+                round_num = int(body['round'])
+                results = [((str(r[0]), r[1]), (str(r[2]), r[3])) for r in body['results']]
+            except (KeyError, TypeError, ValueError, IndexError):
+                raise HttpError(400, 'Send {"round": <int>, "results": [[fighter1, score1, fighter2, score2]]}') \
+                    from None
+            return await self.call(name, 'submit', round_num, results)
+        raise HttpError(404, 'Unknown action {}'.format(action))
+
+    async def handle(self, reader, writer):
+        status, answer = 200, None
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                key, _, value = line.partition(':')
+                headers[key.strip().lower()] = value.strip()
+            if len(request_line) < 2:
+                raise HttpError(400, 'Malformed request')
+            length = int(headers.get('content-length', 0) or 0)
+            if length > MAX_BODY:
+                raise HttpError(413, 'The request is too large')
+            body = {}
+            if length:
+                try:
+                    body = json.loads((await reader.readexactly(length)).decode('utf-8'))
+                except ValueError:
+                    raise HttpError(400, 'The body must be JSON') from None
+            answer = await self.dispatch(request_line[0].upper(), request_line[1], body)
+        except HttpError as e:
+            status, answer = e.status, {'error': str(e)}
+        except ValueError as e:
+            # the wrong results and rounds, see Tournament.parse_result
+            status, answer = 400, {'error': str(e)}
+        except Exception as e:
+            status, answer = 500, {'error': '{}: {}'.format(type(e).__name__, e)}
+
+        data = json.dumps(answer, ensure_ascii=False).encode('utf-8')
+        writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json; charset=utf-8\r\n'
+                     'Content-Length: {}\r\nConnection: close\r\n\r\n'.format(status, REASONS[status], len(data))
+                     .encode('latin-1') + data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8080):
+        self._server = await asyncio.start_server(self.handle, host, port)
+        return self._server
+
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1] if self._server is not None else None
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        await self.start(host, port)
+        print('Serving {} on http://{}:{}'.format(', '.join(sorted(self.categories)), host, self.port))
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,265 @@
+"""
+Monte-Carlo simulation of whole tournaments, to choose hp, cap and the pairing engine before an event
+
+The tournaments are simulated in batches: the state of a batch is kept in NumPy arrays
+(hp and alive flags (tournaments, fighters), rematch masks (tournaments, fighters, fighters)),
+and every round of all the batch is paired, fought and cleaned up at once. The results are random
+in the same way as in the integration test: one fighter of a pair loses cap, the other from 0 to cap.
+The fighters are removed by the rules of Tournament.remove.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from TM.pairings.exact_pairings import exact_matching
+
+SIMULATED_PAIRINGS = ('swiss', 'matrix', 'exact')
+# The tournament has its finals when this number of fighters or less is left, see Tournament.remove
+FINALISTS = 6
+# Largest size of the rematch masks of one batch, in elements
+BATCH_ELEMENTS = 2 ** 22
+
+
+def batch_beam(cost: np.ndarray, allowed: np.ndarray, active: np.ndarray, candidates_to_keep=15):
+    """
+    matrix_beam for a batch of the tournaments at once, with the same choice of the pairs
+
+    :param cost: (tournaments, n, n) rating differences in standings order
+    :param allowed: (tournaments, n, n) boolean, True for the pairs that may fight
+    :param active: (tournaments, n) boolean, the fighters to pair, the others are skipped
+    :return: the positions of the opponents (tournaments, n), -1 for the skipped fighters, and
+    the boolean array (tournaments,), False if the search failed for the tournament
+    """
+    num_t, num = active.shape
+    rows = np.arange(num_t)[:, None]
+    # candidates are the second axis, like the rows of matrix_beam
+    used = ~active[:, None, :]
+    mate = np.full((num_t, 1, num), -1)
+    max_cost = np.zeros((num_t, 1))
+    tot_cost = np.zeros((num_t, 1))
+    valid = np.ones((num_t, 1), dtype=bool)
+    # the objective is lexicographic, so it is packed into one number: tot_cost is always less than scale
+    scale = float(cost.max(initial=0)) * num + 1
+
+    for _ in range(num // 2):
+        done = used.all(axis=2)
+        first = np.argmin(used, axis=2)
+        options = allowed[rows, first] & ~used & (valid & ~done)[:, :, None]
+        pair_cost = cost[rows, first]
+        key = np.where(options, np.maximum(max_cost[:, :, None], pair_cost) * scale
+                       + tot_cost[:, :, None] + pair_cost, np.inf)
+        # the complete candidates of the tournaments with less fighters stay as they are
+        stay = np.where(valid & done, max_cost * scale + tot_cost, np.inf)
+        key = np.concatenate([key, stay[:, :, None]], axis=2).reshape(num_t, -1)
+
+        best = np.argsort(key, axis=1, kind='stable')[:, :candidates_to_keep]
+        valid = np.isfinite(key[rows, best])
+        parent, second = np.divmod(best, num + 1)
+        first = first[rows, parent]
+        used, mate = used[rows, parent], mate[rows, parent]
+        max_cost, tot_cost = max_cost[rows, parent], tot_cost[rows, parent]
+
+        t, k = np.nonzero(valid & (second < num))
+        f, s = first[t, k], second[t, k]
+        used[t, k, f] = used[t, k, s] = True
+        mate[t, k, f], mate[t, k, s] = s, f
+        max_cost[t, k] = np.maximum(max_cost[t, k], cost[t, f, s])
+        tot_cost[t, k] += cost[t, f, s]
+    return mate[:, 0], valid[:, 0] & used[:, 0].all(axis=1)
+
+
+def exact_batch(ratings: np.ndarray, played: np.ndarray, active: np.ndarray):
+    """
+    exact_matching for every tournament of a batch, the active fighters must go first in the standings
+
+    :return: the same as batch_beam, but the second array is True if the tournament got a rematch
+    """
+    mate = np.full(active.shape, -1)
+    rematched = np.zeros(len(active), dtype=bool)
+    for t in range(len(active)):
+        num = int(active[t].sum())
+        pairs, rematches = exact_matching(ratings[t, :num].tolist(), lambda i, j: played[t, i, j])
+        for i, j in pairs:
+            mate[t, i], mate[t, j] = j, i
+        rematched[t] = rematches > 0
+    return mate, rematched
+
+
+def pair_batch(hp, alive, played, pairing, candidates_to_keep):
+    """
+    Pairs a round of every tournament of the batch
+
+    :return: the standings order (tournaments, n), the opponents' positions in it (see batch_beam)
+    and the boolean array, True if the tournament got a fallback pairing with rematches
+    """
+    num_t, num = hp.shape
+    rows = np.arange(num_t)[:, None]
+    # the fighters out of the tournament go after all the others
+    order = np.argsort(np.where(alive, -hp, np.iinfo(hp.dtype).max), axis=1, kind='stable')
+    ratings = hp[rows, order]
+    active = alive[rows, order]
+    played = played[rows[:, :, None], order[:, :, None], order[:, None, :]]
+    if pairing == 'exact':
+        mate, fallback = exact_batch(ratings, played, active)
+        return order, mate, fallback
+
+    cost = np.abs(ratings[:, :, None] - ratings[:, None, :])
+    pairable = active[:, :, None] & active[:, None, :] & ~np.eye(num, dtype=bool)
+    mate, ok = batch_beam(cost, pairable & ~played, active, candidates_to_keep)
+    if not ok.all():
+        # swiss_pairings_old: the nearest fighter in the standings without a rematch, if there is one.
+        # The greedy search with a rematch costing more than any difference gives the same pairs
+        failed = np.nonzero(~ok)[0]
+        penalty = cost[failed].max(initial=0) + 1
+        mate[failed], _ = batch_beam(cost[failed] + penalty * played[failed], pairable[failed], active[failed], 1)
+    return order, mate, ~ok
+
+
+def simulate_batch(num_tournaments, num_fighters, hp, cap, pairing='swiss', candidates_to_keep=15,
+                   max_rounds=100, seed=None):
+    """
+    Simulates a batch of the tournaments
+
+    :return: arrays (num_tournaments,) of the rounds to the finals (-1 if there were no finals in max_rounds),
+    number of the fallback pairings, number of the rounds paired and the rating spread of the finalists
+    """
+    if num_fighters % 2 != 0:
+        raise ValueError("Number of fighters is {}, does not suit for pairing".format(num_fighters))
+    if pairing not in SIMULATED_PAIRINGS:
+        raise ValueError("Pairing {} can not be simulated, use one of {}".format(
+            pairing, ', '.join(SIMULATED_PAIRINGS)))
+    rng = np.random.default_rng(seed)
+    ratings = np.full((num_tournaments, num_fighters), hp, dtype=np.int64)
+    alive = np.ones((num_tournaments, num_fighters), dtype=bool)
+    played = np.zeros((num_tournaments, num_fighters, num_fighters), dtype=bool)
+    finished = np.zeros(num_tournaments, dtype=bool)
+    rounds = np.full(num_tournaments, -1)
+    fallbacks = np.zeros(num_tournaments, dtype=int)
+    paired = np.zeros(num_tournaments, dtype=int)
+    spread = np.zeros(num_tournaments)
+
+    for r in range(max_rounds + 1):
+        # Tournament.remove
+        out = alive & (ratings <= 0) & ~finished[:, None]
+        left = alive.sum(axis=1) - out.sum(axis=1)
+        final = ~finished & (left <= FINALISTS)
+        if final.any():
+            finalists = alive[final] & (ratings[final] > 0)
+            top = np.where(finalists, ratings[final], np.iinfo(np.int64).min).max(axis=1)
+            bottom = np.where(finalists, ratings[final], np.iinfo(np.int64).max).min(axis=1)
+            spread[final] = np.where(finalists.any(axis=1), top - bottom, 0)
+            rounds[final] = r
+            finished |= final
+        # one lucky fighter stays for the even number, with the lowest hp of the others (cap at most)
+        lucky = np.nonzero(~finished & (left % 2 == 1))[0]
+        if len(lucky):
+            chosen = np.argmax(np.where(out[lucky], rng.random((len(lucky), num_fighters)), -1), axis=1)
+            stay = alive[lucky] & ~out[lucky]
+            lowest = np.where(stay, ratings[lucky], cap).min(axis=1)
+            ratings[lucky, chosen] = np.minimum(lowest, cap)
+            out[lucky, chosen] = False
+        alive &= ~out
+        if finished.all() or r == max_rounds:
+            break
+
+        # a round for the tournaments going on
+        idx = np.nonzero(~finished)[0]
+        order, mate, fallback = pair_batch(ratings[idx], alive[idx], played[idx], pairing, candidates_to_keep)
+        fallbacks[idx] += fallback
+        paired[idx] += 1
+
+        t, p = np.nonzero(mate > np.arange(num_fighters))
+        first, second = order[t, p], order[t, mate[t, p]]
+        t = idx[t]
+        # as in ProxyApi: one loses cap, the other from 0 to cap, in random order
+        lost = np.stack([np.full(len(t), cap), rng.integers(0, cap + 1, len(t))])
+        swap = rng.integers(0, 2, len(t)) == 0
+        lost[:, swap] = lost[::-1, swap]
+        ratings[t, first] -= lost[0]
+        ratings[t, second] -= lost[1]
+        played[t, first, second] = played[t, second, first] = True
+    return rounds, fallbacks, paired, spread
+
+
+def _run_batch(args):
+    return simulate_batch(*args)
+
+
+class SimulationReport:
+    """ Results of the simulated tournaments
+
+    .rounds: rounds to the finals of every tournament, -1 if the finals were not reached in max_rounds
+    .fallbacks: number of the pairings with rematches of every tournament
+    .paired: number of the rounds paired in every tournament
+    .spread: rating spread (max - min) of the finalists of every tournament
+    """
+    def __init__(self, rounds, fallbacks, paired, spread):
+        self.rounds = rounds
+        self.fallbacks = fallbacks
+        self.paired = paired
+        self.spread = spread
+
+    def __len__(self):
+        return len(self.rounds)
+
+    @property
+    def fallback_rate(self):
+        """
+        :return: share of the pairings with rematches among all the pairings
+        """
+        total = self.paired.sum()
+        return self.fallbacks.sum() / total if total else 0.0
+
+    def summary(self):
+        finished = self.rounds[self.rounds >= 0]
+        percentiles = [5, 50, 95]
+        return {'tournaments': len(self),
+                'unfinished': len(self) - len(finished),
+                'rounds_mean': finished.mean() if len(finished) else None,
+                'rounds_percentiles': dict(zip(percentiles, np.percentile(finished, percentiles)))
+                if len(finished) else None,
+                'rounds_histogram': dict(zip(*np.unique(finished, return_counts=True))),
+                'fallback_rate': self.fallback_rate,
+                'tournaments_with_fallback': (self.fallbacks > 0).mean() if len(self) else 0.0,
+                'spread_mean': self.spread.mean() if len(self) else None,
+                'spread_percentiles': dict(zip(percentiles, np.percentile(self.spread, percentiles)))
+                if len(self) else None}
+
+    def __str__(self):
+        s = self.summary()
+        lines = ['{} tournaments simulated, {} without the finals'.format(s['tournaments'], s['unfinished'])]
+        if s['rounds_mean'] is not None:
+            lines.append('Rounds to the finals: mean {:.2f}, 5%/50%/95%: {}'.format(
+                s['rounds_mean'], '/'.join('{:g}'.format(v) for v in s['rounds_percentiles'].values())))
+            lines.append('  ' + ', '.join('{} rounds: {}'.format(k, v) for k, v in s['rounds_histogram'].items()))
+        lines.append('Fallback pairings: {:.2%} of the rounds, {:.2%} of the tournaments'.format(
+            s['fallback_rate'], s['tournaments_with_fallback']))
+        if s['spread_mean'] is not None:
+            lines.append('Rating spread of the finalists: mean {:.2f}, 5%/50%/95%: {}'.format(
+                s['spread_mean'], '/'.join('{:g}'.format(v) for v in s['spread_percentiles'].values())))
+        return '\n'.join(lines)
+
+
+def simulate(num_tournaments, num_fighters, hp, cap, pairing='swiss', candidates_to_keep=15, workers=None,
+             seed=0, max_rounds=100, batch_size=None):
+    """
+    Simulates num_tournaments tournaments of num_fighters fighters
+
+    The tournaments are split into batches of batch_size (by default, as many as fit BATCH_ELEMENTS),
+    and the batches are run in a process pool if workers > 1. Every batch has its own seed derived from seed,
+    so the result does not depend on the number of workers.
+
+    :param pairing: 'swiss' or 'matrix' (the same beam search) or 'exact', as config.pairing_function
+    :return: SimulationReport
+    """
+    if batch_size is None:
+        batch_size = max(1, min(num_tournaments, BATCH_ELEMENTS // max(1, num_fighters * num_fighters)))
+    sizes = [min(batch_size, num_tournaments - start) for start in range(0, num_tournaments, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(size, num_fighters, hp, cap, pairing, candidates_to_keep, max_rounds, s) for size, s in zip(sizes, seeds)]
+    if workers is not None and workers > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            batches = list(executor.map(_run_batch, args))
+    else:
+        batches = [_run_batch(a) for a in args]
+    if not batches:
+        return SimulationReport(*(np.zeros(0, dtype=int) for _ in range(3)), np.zeros(0))
+    return SimulationReport(*(np.concatenate(arrays) for arrays in zip(*batches)))
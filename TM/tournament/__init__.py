@@ -1,2 +1,6 @@
 from .tournament import Tournament
-from .fighter import Fighter, fighter_from_str, get_rating
\ No newline at end of file
+from .fighter import Fighter, fighter_from_str, fighter_from_dict, get_rating
+from .fighter_table import FighterTable, TableFighter
+from .snapshot import save_snapshot, find_snapshot, load_snapshot, read_snapshot, roster_fingerprint, results_key
+from .state import save_state, load_table, load_fighters
+from .pairing_cache import PairingCache
@@ -1,4 +1,5 @@
 class Fighter:
+    __slots__ = ('name', 'rating', 'enemies')
 
     def __init__(self, name, rating=12):
         self.name = name
@@ -18,6 +19,13 @@ class Fighter:
     def to_list(self):
         return [self.name, str(self.rating), '']
 
+    def to_dict(self):
+        """
+        All the fighter data as a JSON object, unlike to_str it keeps any name
+        """
+        return {'name': self.name, 'rating': int(self.rating),
+                'enemies': {name: int(count) for name, count in self.enemies.items()}}
+
     def fight(self, other, hp_lost):
         if other.name in self.enemies.keys():
             self.enemies[other.name] += 1
@@ -80,6 +88,15 @@ def fighter_from_str(line: str, start_rating: int = 0) -> Fighter:
     return f
 
 
+def fighter_from_dict(data) -> Fighter:
+    """
+    :param data: dict made by Fighter.to_dict
+    """
+    f = Fighter(data['name'], data['rating'])
+    f.enemies.update(data['enemies'])
+    return f
+
+
 def get_rating(fighter: Fighter) -> int:
     # Function to sort fighters
     return fighter.rating
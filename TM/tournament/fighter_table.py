@@ -0,0 +1,242 @@
+import numpy as np
+from typing import Iterable, List
+from .fighter import Fighter
+
+
+class FighterTable:
+    """ Struct-of-arrays storage of the fighters
+
+    Every fighter gets an integer id, which is the index in the arrays:
+    .names, .ratings and .alive (False for the fighters who are out of the tournament).
+    The number of fights is a sparse matrix shared by all the fighters, .played[id] is a row {other id: count}.
+    The Fighter objects are TableFighter views over these arrays, so they do not keep any data themselves.
+    """
+    def __init__(self, capacity=16):
+        self.names = []
+        self.ids = {}
+        self.ratings = np.zeros(capacity, dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.played = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name, rating=12, alive=True):
+        if name in self.ids:
+            raise ValueError("Fighter named {} is listed twice".format(name))
+        fighter_id = len(self.names)
+        if fighter_id == len(self.ratings):
+            self.ratings = np.concatenate([self.ratings, np.zeros(len(self.ratings), dtype=self.ratings.dtype)])
+            self.alive = np.concatenate([self.alive, np.zeros(len(self.alive), dtype=bool)])
+        self.names.append(name)
+        self.ids[name] = fighter_id
+        self.ratings[fighter_id] = rating
+        self.alive[fighter_id] = alive
+        self.played.append({})
+        return TableFighter(self, fighter_id)
+
+    def id_of(self, name):
+        """
+        Id of the fighter, the unknown ones (e.g. the enemies from the previous tournament state)
+        are added as not alive
+        """
+        fighter_id = self.ids.get(name)
+        if fighter_id is None:
+            fighter_id = self.add(name, 0, alive=False).id
+        return fighter_id
+
+    def fighter(self, fighter_id):
+        return TableFighter(self, fighter_id)
+
+    def fighters(self) -> List['TableFighter']:
+        """
+        :return: views of the alive fighters
+        """
+        return [TableFighter(self, i) for i in np.nonzero(self.alive[:len(self.names)])[0].tolist()]
+
+    def standings(self, ids) -> np.ndarray:
+        """
+        :param ids: ids of the fighters
+        :return: the ids sorted by rating, the best first. The sort is stable, as sorted(fighters, key=get_rating)
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        return ids[np.argsort(-self.ratings[ids], kind='stable')]
+
+    def played_matrix(self, ids) -> np.ndarray:
+        """
+        :param ids: ids of the fighters
+        :return: boolean matrix, True where the fighters have fought (in either direction, as already_played)
+        """
+        position = {fighter_id: i for i, fighter_id in enumerate(ids)}
+        played = np.zeros((len(position), len(position)), dtype=bool)
+        for i, fighter_id in enumerate(ids):
+            for other, count in self.played[fighter_id].items():
+                j = position.get(other)
+                if j is not None and count > 0:
+                    played[i, j] = True
+        return played | played.T
+
+    @staticmethod
+    def from_fighters(fighters: Iterable[Fighter]) -> 'FighterTable':
+        """
+        Moves the data of the plain Fighter objects into a new table
+        """
+        fighters = list(fighters)
+        table = FighterTable(capacity=max(16, len(fighters)))
+        for f in fighters:
+            table.add(f.name, f.rating)
+        for f in fighters:
+            row = table.played[table.ids[f.name]]
+            for name, count in f.enemies.items():
+                row[table.id_of(name)] = count
+        return table
+
+    @staticmethod
+    def from_arrays(names, ratings, alive, rows, cols, counts) -> 'FighterTable':
+        """
+        Builds the table at once from the columns, see TM.tournament.state
+
+        :param names: names of the fighters, their positions are the ids
+        :param ratings: ratings by id
+        :param alive: alive flags by id
+        :param rows: ids of the fighters, cols: ids of their enemies, counts: numbers of their fights (COO format)
+        """
+        names = list(names)
+        table = FighterTable(capacity=max(16, len(names)))
+        table.names = names
+        table.ids = dict(zip(names, range(len(names))))
+        if len(table.ids) != len(names):
+            raise ValueError("Fighter names are not unique")
+        table.ratings[:len(names)] = ratings
+        table.alive[:len(names)] = alive
+
+        rows, cols, counts = np.asarray(rows), np.asarray(cols), np.asarray(counts)
+        if np.any(rows[1:] < rows[:-1]):
+            order = np.argsort(rows, kind='stable')
+            rows, cols, counts = rows[order], cols[order], counts[order]
+        table.played = PlayedRows(np.searchsorted(rows, np.arange(len(names) + 1)).tolist(), cols, counts)
+        return table
+
+    def to_arrays(self):
+        """
+        :return: the columns of the table, as the arguments of from_arrays
+        """
+        num = len(self.names)
+        played = self.played
+        if isinstance(played, PlayedRows) and len(played) == num and all(row is None for row in played.rows):
+            # nothing has been changed since the table was built from the arrays
+            rows = np.repeat(np.arange(num, dtype=np.int32), np.diff(played.bounds))
+            return list(self.names), self.ratings[:num].copy(), self.alive[:num].copy(), \
+                rows, played.cols.astype(np.int32), played.counts.astype(np.int32)
+        lengths = [len(row) for row in self.played]
+        rows = np.repeat(np.arange(num, dtype=np.int32), lengths)
+        cols = np.fromiter((i for row in self.played for i in row), dtype=np.int32, count=len(rows))
+        counts = np.fromiter((c for row in self.played for c in row.values()), dtype=np.int32, count=len(rows))
+        return list(self.names), self.ratings[:num].copy(), self.alive[:num].copy(), rows, cols, counts
+
+
+class PlayedRows:
+    """
+    FighterTable.played of a table built from the arrays: the row dicts are made from the sorted COO arrays
+    on the first access, so that a large table is loaded without creating a dict for every fighter
+    """
+    def __init__(self, bounds, cols, counts):
+        # the row of the fighter i is cols[bounds[i]:bounds[i + 1]]
+        self.bounds = bounds
+        self.cols = cols
+        self.counts = counts
+        self.rows = [None] * (len(bounds) - 1)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, fighter_id):
+        row = self.rows[fighter_id]
+        if row is None:
+            a, b = self.bounds[fighter_id], self.bounds[fighter_id + 1]
+            row = self.rows[fighter_id] = dict(zip(self.cols[a:b].tolist(), self.counts[a:b].tolist()))
+        return row
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def append(self, row):
+        self.rows.append(row)
+
+
+class EnemiesView:
+    """
+    A dict-like view of one row of FighterTable.played, keyed by the enemy names as Fighter.enemies
+    """
+    __slots__ = ('table', 'row')
+
+    def __init__(self, table: FighterTable, fighter_id: int):
+        self.table = table
+        self.row = table.played[fighter_id]
+
+    def __getitem__(self, name):
+        fighter_id = self.table.ids.get(name)
+        if fighter_id is None or fighter_id not in self.row:
+            raise KeyError(name)
+        return self.row[fighter_id]
+
+    def __setitem__(self, name, count):
+        self.row[self.table.id_of(name)] = count
+
+    def __contains__(self, name):
+        return self.table.ids.get(name) in self.row
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.row)
+
+    def keys(self):
+        return [self.table.names[i] for i in self.row]
+
+    def items(self):
+        return [(self.table.names[i], count) for i, count in self.row.items()]
+
+
+class TableFighter(Fighter):
+    """
+    Fighter stored in a FighterTable. It has the same interface as Fighter, and all the methods
+    of Fighter work through the name, rating and enemies properties
+    """
+    __slots__ = ('table', 'id')
+
+    def __init__(self, table: FighterTable, fighter_id: int):
+        self.table = table
+        self.id = fighter_id
+
+    @property
+    def name(self):
+        return self.table.names[self.id]
+
+    @property
+    def rating(self):
+        return int(self.table.ratings[self.id])
+
+    @rating.setter
+    def rating(self, value):
+        self.table.ratings[self.id] = value
+
+    @property
+    def enemies(self):
+        return EnemiesView(self.table, self.id)
+
+    def fight(self, other, hp_lost):
+        row = self.table.played[self.id]
+        other_id = self.table.id_of(other.name)
+        row[other_id] = row.get(other_id, 0) + 1
+        self.table.ratings[self.id] -= hp_lost
+
+    def played(self, other):
+        return self.table.played[self.id].get(self.table.ids.get(other.name), 0)
+
+    def __eq__(self, other):
+        return isinstance(other, TableFighter) and other.table is self.table and other.id == self.id
+
+    def __hash__(self):
+        return hash((id(self.table), self.id))
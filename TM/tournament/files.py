@@ -0,0 +1,22 @@
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+
+@contextmanager
+def atomic_write(filename, mode='w', encoding=None):
+    """
+    Opens a temporary file next to filename for writing, and replaces filename with it when the block ends,
+    so that an interrupted save never leaves a broken file. If the block fails, the old file is kept
+
+    The temporary file is filename + '.tmp', so the files with the same stem (x.json, x.npz) do not collide
+    """
+    filename = Path(filename)
+    tmp = filename.with_name(filename.name + '.tmp')
+    try:
+        with open(tmp, mode, encoding=encoding) as dst:
+            yield dst
+        os.replace(tmp, filename)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
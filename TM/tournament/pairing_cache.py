@@ -0,0 +1,99 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import partial
+from pathlib import Path
+from .files import atomic_write
+
+
+def function_key(pairing_function) -> str:
+    """
+    :return: the name of the pairing function with the arguments bound by partial, to tell the engines apart
+    """
+    args = ()
+    keywords = {}
+    while isinstance(pairing_function, partial):
+        args = pairing_function.args + args
+        keywords = dict(pairing_function.keywords, **keywords)
+        pairing_function = pairing_function.func
+    name = '{}.{}'.format(getattr(pairing_function, '__module__', ''),
+                          getattr(pairing_function, '__qualname__', repr(pairing_function)))
+    return repr((name, args, sorted(keywords.items())))
+
+
+class PairingCache:
+    """ Pairings of the tournament states seen before
+
+    The key is a fingerprint of the fighters in their order (so the order of the standings for the equal ratings),
+    their ratings, the set of the pairs who have already fought, and the pairing function. The pairs are kept
+    by names, at most maxsize of the states, the least recently used are dropped first. If filename is given,
+    the cache is saved to that JSON file after every new pairing and loaded from it on start.
+    """
+    def __init__(self, maxsize=128, filename=None):
+        self.maxsize = maxsize
+        self.filename = None if filename is None else Path(filename)
+        self.hits = 0
+        self.misses = 0
+        self._pairs = OrderedDict()
+        # the categories of the server mode may share the cache
+        self._lock = threading.Lock()
+        if self.filename is not None and self.filename.exists():
+            with open(self.filename, encoding='utf-8') as src:
+                for key, pairs in json.load(src):
+                    self._pairs[key] = [tuple(p) for p in pairs]
+
+    @staticmethod
+    def fingerprint(fighters, pairing_function=None) -> str:
+        names = set(f.name for f in fighters)
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(function_key(pairing_function).encode('utf-8'))
+        for f in fighters:
+            digest.update(repr((f.name, f.rating)).encode('utf-8'))
+        # the same as already_played: a fight in either direction, with the fighters still in the tournament
+        played = sorted(set(tuple(sorted((f.name, name))) for f in fighters
+                            for name, count in f.enemies.items() if count > 0 and name in names))
+        digest.update(repr(played).encode('utf-8'))
+        return digest.hexdigest()
+
+    def __len__(self):
+        return len(self._pairs)
+
+    def __contains__(self, key):
+        return key in self._pairs
+
+    def get(self, key):
+        """
+        :return: the pairs of names for the state, or None if it is not cached
+        """
+        with self._lock:
+            pairs = self._pairs.get(key)
+            if pairs is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._pairs.move_to_end(key)
+            return list(pairs)
+
+    def put(self, key, pairs):
+        """
+        :param pairs: the pairs of fighters
+        """
+        with self._lock:
+            self._pairs[key] = [tuple(f.name for f in pair) for pair in pairs]
+            self._pairs.move_to_end(key)
+            while len(self._pairs) > self.maxsize:
+                self._pairs.popitem(last=False)
+            if self.filename is not None:
+                self._save()
+
+    def clear(self):
+        with self._lock:
+            self._pairs.clear()
+            if self.filename is not None:
+                self._save()
+
+    def _save(self):
+        with atomic_write(self.filename, encoding='utf-8') as dst:
+            json.dump([[key, [list(p) for p in pairs]] for key, pairs in self._pairs.items()], dst,
+                      ensure_ascii=False)
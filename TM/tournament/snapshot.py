@@ -0,0 +1,82 @@
+import hashlib
+import json
+from pathlib import Path
+from .files import atomic_write
+from .tournament import Tournament
+
+SNAPSHOT_PREFIX = 'snapshot_'
+
+
+def snapshot_path(folder, round_num) -> Path:
+    return Path(folder) / '{}{}.json'.format(SNAPSHOT_PREFIX, round_num)
+
+
+def roster_fingerprint(fighters) -> str:
+    """
+    :return: the hash of the names, ratings and enemies of the fighters, it does not depend on their order
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for f in sorted(fighters, key=lambda f: f.name):
+        data = f.to_dict()
+        digest.update(json.dumps([data['name'], data['rating'], sorted(data['enemies'].items())],
+                                 ensure_ascii=False).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def results_key(results):
+    """
+    :param results: the results of a round checked by Tournament.parse_result
+    :return: the results in the order that does not depend on the order of the fights and of the fighters in them
+    """
+    key = []
+    for name1, name2, score in results:
+        fight = [name1, name2, int(score[0]), int(score[1])]
+        if name2 < name1:
+            fight = [name2, name1, int(score[1]), int(score[0])]
+        key.append(fight)
+    return sorted(key)
+
+
+def save_snapshot(tournament: Tournament, folder, round_num, results=None) -> str:
+    """
+    Saves the tournament state after the round, so that the restart does not need to replay it
+    :param round_num: number of the last round applied to the tournament
+    :param results: the results of the round, checked by Tournament.parse_result, to find the corrections later
+    :return: name of the snapshot file
+    """
+    filename = snapshot_path(folder, round_num)
+    state = tournament.snapshot(round_num, None if results is None else results_key(results))
+    with atomic_write(filename, encoding='utf-8') as dst:
+        json.dump(state, dst, ensure_ascii=False)
+    return str(filename)
+
+
+def find_snapshot(folder, max_round):
+    """
+    :return: the latest snapshot file taken not after max_round, or None
+    """
+    best = None
+    for path in Path(folder).glob(SNAPSHOT_PREFIX + '*.json'):
+        try:
+            round_num = int(path.stem[len(SNAPSHOT_PREFIX):])
+        except ValueError:
+            continue
+        if round_num <= max_round and (best is None or round_num > best[0]):
+            best = (round_num, path)
+    return None if best is None else best[1]
+
+
+def read_snapshot(filename) -> dict:
+    """
+    :return: the tournament state saved by save_snapshot, see Tournament.snapshot
+    """
+    with open(filename, encoding='utf-8') as src:
+        return json.load(src)
+
+
+def load_snapshot(tournament: Tournament, filename) -> int:
+    """
+    Restores the tournament from the snapshot file
+    :return: number of the last round applied to the tournament
+    """
+    return tournament.restore(read_snapshot(filename))
@@ -0,0 +1,72 @@
+import numpy as np
+from pathlib import Path
+from typing import List, Tuple
+from .fighter import Fighter
+from .fighter_table import FighterTable
+from .files import atomic_write
+
+# version of the binary state format, it is stored in every file
+STATE_VERSION = 1
+STATE_SUFFIX = '.npz'
+
+
+def save_state(filename, fighters: List[Fighter], outs: List[Fighter] = (), round_num=0) -> str:
+    """
+    Saves the fighters to a binary NumPy .npz file, a columnar alternative to the Fighter.to_str text
+
+    The file keeps the names, the ratings, the fights as COO arrays (fighter id, enemy id, count)
+    and the ids of the fighters and the outs in their order. The enemies which are neither of them
+    are kept by name only. The fighters stored in one FighterTable are saved from its arrays.
+
+    :param round_num: number of the last round applied to the fighters
+    :return: name of the file
+    """
+    fighters, outs = list(fighters), list(outs)
+    everyone = fighters + outs
+    table = getattr(everyone[0], 'table', None) if everyone else None
+    if table is None or any(getattr(f, 'table', None) is not table for f in everyone):
+        table = FighterTable.from_fighters(everyone)
+    names, ratings, _, rows, cols, counts = table.to_arrays()
+
+    filename = Path(filename)
+    with atomic_write(filename, 'wb') as dst:
+        np.savez(dst, version=STATE_VERSION, round=round_num,
+                 names=np.array(names, dtype=str), ratings=ratings, rows=rows, cols=cols, counts=counts,
+                 fighters=np.array([table.ids[f.name] for f in fighters], dtype=np.int32),
+                 outs=np.array([table.ids[f.name] for f in outs], dtype=np.int32))
+    return str(filename)
+
+
+def load_table(filename) -> Tuple[FighterTable, np.ndarray, np.ndarray, int]:
+    """
+    Loads the state saved by save_state into a new FighterTable, without any per-fighter parsing
+
+    :return: the table, ids of the fighters, ids of the outs and the round number
+    """
+    with np.load(filename, allow_pickle=False) as data:
+        if int(data['version']) != STATE_VERSION:
+            raise ValueError("State file {} has version {}, {} expected".format(
+                filename, int(data['version']), STATE_VERSION))
+        fighters, outs = data['fighters'], data['outs']
+        alive = np.zeros(len(data['names']), dtype=bool)
+        alive[fighters] = True
+        table = FighterTable.from_arrays(data['names'].tolist(), data['ratings'], alive,
+                                         data['rows'], data['cols'], data['counts'])
+        return table, fighters, outs, int(data['round'])
+
+
+def load_fighters(filename) -> Tuple[List[Fighter], List[Fighter], int]:
+    """
+    Loads the state saved by save_state as the plain Fighter objects
+
+    :return: the fighters, the outs and the round number
+    """
+    table, fighters, outs, round_num = load_table(filename)
+    names, ratings = table.names, table.ratings.tolist()
+
+    def plain(fighter_id):
+        f = Fighter(names[fighter_id], ratings[fighter_id])
+        f.enemies = {names[i]: count for i, count in table.played[fighter_id].items()}
+        return f
+
+    return [plain(i) for i in fighters.tolist()], [plain(i) for i in outs.tolist()], round_num
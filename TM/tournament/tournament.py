@@ -1,5 +1,9 @@
+import inspect
 import random
-from .fighter import Fighter, fighter_from_str, get_rating
+from pathlib import Path
+from .fighter import Fighter, fighter_from_str, fighter_from_dict, get_rating
+from .fighter_table import FighterTable
+from .state import STATE_SUFFIX, save_state, load_table, load_fighters
 from typing import Tuple, List
 
 
@@ -17,21 +21,88 @@ def fight(f1: Fighter, f2: Fighter, result: Tuple[int, int]):
 
 class Tournament:
 
-    def __init__(self, pairing_function, fighters: List[Fighter] = None, start_rating=0, fight_cap=None):
+    def __init__(self, pairing_function, fighters: List[Fighter] = None, start_rating=0, fight_cap=None,
+                 storage='objects', pairing_cache=None):
+        """
+        :param storage: 'objects' to keep every fighter in a Fighter object,
+        'table' to keep them in a FighterTable (compact, for the large simulations)
+        :param pairing_cache: PairingCache to take the pairings of the states seen before from, None not to cache
+        """
+        if storage not in ('objects', 'table'):
+            raise ValueError("Unknown storage {}".format(storage))
+        self.storage = storage
+        self.table = None
+        if fighters is not None and storage == 'table':
+            self.table = FighterTable.from_fighters(fighters)
+            fighters = self.table.fighters()
 
         if fighters is not None:
             self.fighters = fighters
         else:
             self.fighters = []
+        # fighters in the tournament by name, see index_fighters
+        self.index = {}
+        self.index_fighters()
         # fighters casted out of a tournament
         self.outs = []
         self.startRating = start_rating
         self.fightCap = fight_cap
         self.pairings = []
         self.pairing_function = pairing_function
+        # PairingStats of every round by its number, see make_pairs
+        self.pairing_stats = {}
+        self.pairing_cache = pairing_cache
+        # fingerprint of the fighters as they were read, kept in the snapshots, see snapshot.roster_fingerprint
+        self.roster = None
+
+    def index_fighters(self):
+        """
+        Rebuilds the name index of the fighters. The names must be unique,
+        otherwise we can not tell which fighter the result belongs to
+        :return:
+        """
+        self.index = {}
+        for f in self.fighters:
+            if f.name in self.index:
+                raise ValueError("Fighter named {} is listed twice".format(f.name))
+            self.index[f.name] = f
+
+    def make_pairs(self, round_num=None):
+        """
+        :param round_num: number of the round to keep the pairing stats for, the next one if None.
+        The stats are collected only if the pairing function has the stats parameter
+        :return:
+        """
+        # TM.pairings imports the tournament package, so it is imported here
+        from TM.pairings.pairing_stats import PairingStats
+
+        if round_num is None:
+            round_num = max(self.pairing_stats, default=0) + 1
+        with_stats = 'stats' in inspect.signature(self.pairing_function).parameters
 
-    def make_pairs(self):
-        self.pairings = self.pairing_function(self.fighters)
+        key = None
+        if self.pairing_cache is not None:
+            # the same state (e.g. after a restart or a failed write) gets the same pairs without the search
+            key = self.pairing_cache.fingerprint(self.fighters, self.pairing_function)
+            pairs = self.pairing_cache.get(key)
+            if pairs is not None:
+                self.pairings = [(self.index[name1], self.index[name2]) for name1, name2 in pairs]
+                if with_stats:
+                    stats = PairingStats()
+                    stats.start('pairing cache')
+                    stats.cache_hit = True
+                    stats.finish(self.pairings)
+                    self.pairing_stats[round_num] = stats
+                return
+
+        if with_stats:
+            stats = PairingStats()
+            self.pairings = self.pairing_function(self.fighters, stats=stats)
+            self.pairing_stats[round_num] = stats
+        else:
+            self.pairings = self.pairing_function(self.fighters)
+        if key is not None:
+            self.pairing_cache.put(key, self.pairings)
 
     def list_fighters(self):
         """
@@ -46,32 +117,29 @@ class Tournament:
         :param score: difference in score. If negative, HP will diminish, if positive - increase.
         :return:
         """
-        f1 = None
-        f2 = None
-
-        for f in self.fighters:
-            if f.name == name1:
-                f1 = f
-            elif f.name == name2:
-                f2 = f
-        if f1 is None or f2 is None:
+        f1 = self.index.get(name1)
+        f2 = self.index.get(name2)
+        if f1 is None or f2 is None or f1 is f2:
             raise ValueError("One of the fighters named {}, {} not found".format(name1, name2))
         fight(f1, f2, score)
 
-    def parse_result(self, result):
+    def parse_result(self, result, verbose=True):
         """
 
         :param result:
+        :param verbose: print the reason of a wrong result, off for the background threads (see ResultPoller)
         :return:
         """
         try:
             sc1 = int(result[0][1])
             sc2 = int(result[1][1])
         except ValueError as e:
-            print("Results of the fight must be integer!")
+            if verbose:
+                print("Results of the fight must be integer!")
             raise e
         except IndexError as e:
-            print("Results of the fight must be ((name1, res1),(name2, res2))!")
+            if verbose:
+                print("Results of the fight must be ((name1, res1),(name2, res2))!")
             raise e
 
             # Convert score to positive, because we only substract points in fights
@@ -85,10 +153,74 @@ class Tournament:
         return result[0][0], result[1][0], (sc1, sc2)
 
     def read_fighters(self, filename: str, shuffle=False):
+        """
+        :param filename: text file with a fighter in every line (see fighter_from_str),
+        or a binary state file (.npz, see save_state)
+        """
+        if Path(filename).suffix == STATE_SUFFIX:
+            self.load_state(filename)
+            if shuffle:
+                random.shuffle(self.fighters)
+            return
         with open(filename, encoding='utf-8') as src:
             self.fighters = [fighter_from_str(s, self.startRating) for s in src.readlines()]
+            if self.storage == 'table':
+                self.table = FighterTable.from_fighters(self.fighters)
+                self.fighters = self.table.fighters()
             if shuffle:
                 random.shuffle(self.fighters)
+        self.index_fighters()
+
+    def snapshot(self, round_num, results=None):
+        """
+        :param round_num: number of the last round applied to the tournament
+        :param results: the results of that round, to tell later whether they were corrected, see results_key
+        :return: the full tournament state, see restore
+        """
+        return {'round': round_num,
+                'roster': self.roster,
+                'results': results,
+                'fighters': [f.to_dict() for f in self.fighters],
+                'outs': [f.to_dict() for f in self.outs]}
+
+    def restore(self, state):
+        """
+        Replaces the tournament state with the one from snapshot
+        :return: number of the last round applied to the tournament
+        """
+        self.fighters = [fighter_from_dict(data) for data in state['fighters']]
+        self.outs = [fighter_from_dict(data) for data in state['outs']]
+        self.roster = state['roster']
+        if self.storage == 'table':
+            self.table = FighterTable.from_fighters(self.fighters + self.outs)
+            self.fighters = [self.table.fighter(self.table.ids[f.name]) for f in self.fighters]
+            self.outs = [self.table.fighter(self.table.ids[f.name]) for f in self.outs]
+            self.table.alive[[f.id for f in self.outs]] = False
+        self.index_fighters()
+        self.pairings = []
+        return state['round']
+
+    def save_state(self, filename, round_num=0):
+        """
+        Saves the fighters and the outs to a binary state file, see TM.tournament.state
+        :return: name of the file
+        """
+        return save_state(filename, self.fighters, self.outs, round_num)
+
+    def load_state(self, filename):
+        """
+        Replaces the fighters and the outs with the ones from a binary state file
+        :return: number of the last round applied to the tournament
+        """
+        if self.storage == 'table':
+            self.table, fighters, outs, round_num = load_table(filename)
+            self.fighters = [self.table.fighter(i) for i in fighters.tolist()]
+            self.outs = [self.table.fighter(i) for i in outs.tolist()]
+        else:
+            self.fighters, self.outs, round_num = load_fighters(filename)
+        self.index_fighters()
+        self.pairings = []
+        return round_num
 
     def write_standings(self, api, round_num):
         """
@@ -113,13 +245,21 @@ class Tournament:
 
         :param api: API that complies with the format
         :param round_num:  Number of the round from which we should read the pairings results
-        :return: list of fight results to apply to the fighters.
-        Format: tuple of tuples ((fighter1, result1), (figther2, result2)), each is a string
+        :return: list of the applied fight results, see parse_result.
+        The api gives them as tuples of tuples ((fighter1, result1), (figther2, result2)), each is a string
         """
 
         # we parse and check the results before the tournament update in order to maintain sort of consistency
         data = api.read(round_num)
         results = [self.parse_result(res) for res in data]
+        self.apply_results(results)
+        return results
+
+    def apply_results(self, results):
+        """
+        :param results: list of the results already checked by parse_result
+        :return:
+        """
         for res in results:
             self.update_fighters(*res)
 
@@ -164,8 +304,12 @@ class Tournament:
             lucky.rating = minHP
             new_outs.remove(lucky)
 
-        for f in new_outs:
-            self.fighters.remove(f)
+        out_names = set(f.name for f in new_outs)
+        self.fighters[:] = [f for f in self.fighters if f.name not in out_names]
+        for name in out_names:
+            del self.index[name]
+        if self.table is not None:
+            self.table.alive[[f.id for f in new_outs]] = False
         self.outs += new_outs
 
 
@@ -0,0 +1,267 @@
+"""
+Benchmark of the pairing functions on the seeded synthetic tournaments
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pairings --save baseline.json
+    python -m benchmarks.bench_pairings --compare baseline.json
+
+Every tournament is driven the same way as in tests/test_integration_swiss_tournament.py: the pairs are written
+to its ProxyApi and the seeded random results are read back. Nobody is removed, so the roster size stays the same
+and the rounds played only add the history. The pairing is measured at the listed rounds: wall time,
+peak memory of the python allocations, max_diff and tot_diff of the rating differences, rematches and
+the fallback rate (share of the pairings where swiss_pairings gave up and called swiss_pairings_old).
+"""
+import argparse
+import inspect
+import json
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+from functools import partial
+from random import Random
+
+from TM.tournament import Tournament, Fighter
+from TM.pairings import swiss_pairings, swiss_pairings_old, swiss_pairings_matrix, swiss_pairings_exact, \
+    round_pairings, PairingStats
+from tests.test_integration_swiss_tournament import ProxyApi
+
+# Default hp of a fighter
+MAX_HP = 20
+# Fight cap - maximum lost HP in a fight
+CAP = 5
+
+SIZES = [8, 16, 32, 64, 128, 256, 512, 1000, 2000, 5000]
+ROUNDS = [1, 4, 8]
+KEEPS = [5, 15, 50]
+
+# The processes of the 'parallel' engine, swiss_pairings with the beam expanded in a process pool
+WORKERS = max(2, os.cpu_count() or 1)
+
+# name: (pairing function for candidates_to_keep, does it use candidates_to_keep, does it use the history)
+# round_pairings gives all the fights of the tournament at once, so it is measured for the first round only
+ENGINES = {
+    'swiss': (lambda keep: partial(swiss_pairings, candidates_to_keep=keep), True, True),
+    'parallel': (lambda keep: partial(swiss_pairings, candidates_to_keep=keep, workers=WORKERS), True, True),
+    'old': (lambda keep: swiss_pairings_old, False, True),
+    'round': (lambda keep: round_pairings, False, False),
+    'matrix': (lambda keep: partial(swiss_pairings_matrix, candidates_to_keep=keep), True, True),
+    'exact': (lambda keep: swiss_pairings_exact, False, True),
+}
+DEFAULT_ENGINES = ['swiss', 'old', 'round']
+
+# The timings below this are too noisy to compare, seconds
+MIN_TIME = 0.005
+
+
+def pairing_quality(pairs):
+    """
+    :return: max_diff, tot_diff of the rating differences and the number of rematches
+    """
+    diffs = [abs(f1.rating - f2.rating) for f1, f2 in pairs]
+    rematches = sum(1 for f1, f2 in pairs if f1.played(f2) or f2.played(f1))
+    return max(diffs, default=0), sum(diffs), rematches
+
+
+def measure(pairing_function, fighters, memory=True):
+    """
+    Pairs the fighters twice: for the time, and under tracemalloc for the peak memory,
+    as tracemalloc slows the allocations down. The fallback is taken from the PairingStats
+    of the pairing functions which collect them
+
+    :return: pairs and the dict of the measurements
+    """
+    stats = PairingStats() if 'stats' in inspect.signature(pairing_function).parameters else None
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        start = time.perf_counter()
+        pairs = pairing_function(fighters) if stats is None else pairing_function(fighters, stats=stats)
+        elapsed = time.perf_counter() - start
+    peak = None
+    if memory:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            tracemalloc.start()
+            try:
+                pairing_function(fighters)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    max_diff, tot_diff, rematches = pairing_quality(pairs)
+    return pairs, {'time': elapsed, 'peak_kib': None if peak is None else peak / 1024,
+                   'max_diff': max_diff, 'tot_diff': tot_diff, 'rematches': rematches,
+                   'fallback': stats is not None and stats.fallback}
+
+
+def run_tournament(pairing_function, fighters_num, rounds, seed, history=True, memory=True):
+    """
+    Plays max(rounds) rounds of a seeded tournament and measures the pairings of the listed rounds
+
+    :return: dict {round: measurements}
+    """
+    random = Random(seed)
+    fighters = [Fighter(name=str(i), rating=MAX_HP) for i in range(fighters_num)]
+    random.shuffle(fighters)
+    tour = Tournament(pairing_function, fighters=fighters, start_rating=MAX_HP, fight_cap=CAP)
+    api = ProxyApi(CAP, Random(seed))
+    measured = {}
+    for r in range(1, (max(rounds) if history else 1) + 1):
+        if r in rounds or not history:
+            tour.pairings, measured[r] = measure(pairing_function, tour.fighters, memory)
+        else:
+            with warnings.catch_warnings():
+                # the warnings of the pairing are not shown, as in the measured rounds
+                warnings.simplefilter('ignore')
+                tour.make_pairs()
+        if r < max(rounds) and history:
+            tour.write_pairs(api, r)
+            tour.read_results(api, r)
+    return measured
+
+
+def summarize(runs):
+    """
+    :param runs: measurements of the same pairing over the seeds
+    :return: mean time, max_diff, tot_diff and rematches, the largest peak memory and the fallback rate
+    """
+    peaks = [m['peak_kib'] for m in runs if m['peak_kib'] is not None]
+    return {'time': sum(m['time'] for m in runs) / len(runs),
+            'peak_kib': max(peaks) if peaks else None,
+            'max_diff': sum(m['max_diff'] for m in runs) / len(runs),
+            'tot_diff': sum(m['tot_diff'] for m in runs) / len(runs),
+            'rematches': sum(m['rematches'] for m in runs) / len(runs),
+            'fallback_rate': sum(m['fallback'] for m in runs) / len(runs)}
+
+
+def run_benchmark(engines=None, sizes=None, rounds=None, keeps=None, seeds=3, memory=True, time_limit=10.0,
+                  report=print):
+    """
+    Sweeps the engines, roster sizes, rounds and candidates_to_keep
+
+    The sizes go up, and an engine is not run for the larger sizes once one pairing takes more than time_limit seconds
+
+    :param report: called with every result, None to keep silent
+    :return: list of the result dicts, see summarize, with the engine, fighters, keep and round keys
+    """
+    engines = DEFAULT_ENGINES if engines is None else engines
+    sizes = sorted(SIZES if sizes is None else sizes)
+    rounds = ROUNDS if rounds is None else rounds
+    keeps = KEEPS if keeps is None else keeps
+    for size in sizes:
+        if size % 2 != 0:
+            raise ValueError("Number of fighters is {}, does not suit for pairing".format(size))
+
+    results = []
+    for name in engines:
+        if name not in ENGINES:
+            raise ValueError("Unknown engine {}, use one of {}".format(name, ', '.join(ENGINES)))
+        make, uses_keep, history = ENGINES[name]
+        for keep in (keeps if uses_keep else [None]):
+            pairing_function = make(keep)
+            for size in sizes:
+                runs = {}
+                for seed in range(seeds):
+                    for r, m in run_tournament(pairing_function, size, rounds, seed, history, memory).items():
+                        runs.setdefault(r, []).append(m)
+                slowest = 0
+                for r, measured in sorted(runs.items()):
+                    result = dict(engine=name, fighters=size, keep=keep, round=r, **summarize(measured))
+                    results.append(result)
+                    slowest = max(slowest, result['time'])
+                    if report is not None:
+                        report(format_result(result))
+                if slowest > time_limit:
+                    if report is not None:
+                        report('{} is slower than {} s at {} fighters, the larger sizes are skipped'.format(
+                            engine_label(name, keep), time_limit, size))
+                    break
+    return results
+
+
+def engine_label(engine, keep):
+    return engine if keep is None else '{}(keep={})'.format(engine, keep)
+
+
+def result_key(result):
+    return result['engine'], result['fighters'], result['keep'], result['round']
+
+
+def format_result(result):
+    peak = '-' if result['peak_kib'] is None else '{:.0f}'.format(result['peak_kib'])
+    return '{:<18} {:>5} fighters round {:>2}: {:>9.4f} s {:>9} KiB max_diff {:>6.2f} tot_diff {:>9.1f} ' \
+           'rematches {:>5.2f} fallback {:.0%}'.format(engine_label(result['engine'], result['keep']),
+                                                        result['fighters'], result['round'], result['time'], peak,
+                                                        result['max_diff'], result['tot_diff'], result['rematches'],
+                                                        result['fallback_rate'])
+
+
+def save_baseline(results, filename):
+    with open(filename, 'w', encoding='utf-8') as dst:
+        json.dump(results, dst, indent=1)
+
+
+def load_baseline(filename):
+    with open(filename, encoding='utf-8') as src:
+        return json.load(src)
+
+
+def compare(results, baseline, time_tolerance=1.5):
+    """
+    Finds the regressions against the baseline: the pairing is slower by time_tolerance times
+    (the ones faster than MIN_TIME are not compared), its max_diff or the fallback rate is worse.
+    The results missing from the baseline are not compared
+
+    :return: list of the messages, empty if there is no regression
+    """
+    old = {result_key(r): r for r in baseline}
+    regressions = []
+    for new in results:
+        base = old.get(result_key(new))
+        if base is None:
+            continue
+        label = '{} {} fighters round {}'.format(engine_label(new['engine'], new['keep']),
+                                                 new['fighters'], new['round'])
+        if new['time'] > max(base['time'], MIN_TIME) * time_tolerance:
+            regressions.append('{}: time {:.4f} s, was {:.4f} s'.format(label, new['time'], base['time']))
+        if new['max_diff'] > base['max_diff']:
+            regressions.append('{}: max_diff {:.2f}, was {:.2f}'.format(label, new['max_diff'], base['max_diff']))
+        if new['fallback_rate'] > base['fallback_rate']:
+            regressions.append('{}: fallback rate {:.0%}, was {:.0%}'.format(label, new['fallback_rate'],
+                                                                            base['fallback_rate']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark of the pairing functions')
+    parser.add_argument('--engines', nargs='+', default=DEFAULT_ENGINES, choices=list(ENGINES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES, help='numbers of fighters')
+    parser.add_argument('--rounds', nargs='+', type=int, default=ROUNDS, help='rounds to measure the pairing at')
+    parser.add_argument('--keeps', nargs='+', type=int, default=KEEPS, help='values of candidates_to_keep')
+    parser.add_argument('--seeds', type=int, default=3, help='number of the tournaments for every setting')
+    parser.add_argument('--time-limit', type=float, default=10.0,
+                        help='seconds per pairing, after which the larger sizes are skipped')
+    parser.add_argument('--no-memory', action='store_true', help='do not measure the peak memory')
+    parser.add_argument('--save', help='file to save the results as a baseline')
+    parser.add_argument('--compare', help='baseline file to compare the results with')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed slowdown against the baseline')
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.engines, args.sizes, args.rounds, args.keeps, args.seeds,
+                            not args.no_memory, args.time_limit)
+    if args.save is not None:
+        save_baseline(results, args.save)
+        print('Baseline saved to ' + args.save)
+    if args.compare is not None:
+        regressions = compare(results, load_baseline(args.compare), args.tolerance)
+        for message in regressions:
+            print('Regression: ' + message)
+        if regressions:
+            return 1
+        print('No regressions against ' + args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,21 +10,86 @@ csv_name = 'mws'
 # Folder for csv files
 csv_folder = '/home/trekin/Data/test'
 
-# main api - google or csv
+# Encoding of the csv files, None for the default one of the system (e.g. 'utf-8', or 'cp1251' for Excel on Windows)
+csv_encoding = None
+
+# Folder for the tournament snapshots taken after every round, None to use csv_folder
+snapshot_folder = None
+
+# main api - google, google_async (concurrent requests) or csv
 main_api = 'google'
 
+# the api to write a copy of the pairs to - google, csv, None for no copy, or 'auto' for the other one
+# of csv and google (csv for main_api = 'google', google for main_api = 'csv').
+# With main_api = 'csv' and mirror_api = None neither network nor Google libraries are needed
+mirror_api = 'auto'
+
+# write the rounds to the csv one of main_api and mirror_api at once, and to the other one in background
+# (see 'sync' command). It needs mirror_api
+write_behind = False
+
+# file for the rounds waiting to be written in background, kept in csv_folder (with the category prefix
+# in the server mode). The rounds of another document found there (e.g. after google_doc is changed) are dropped
+write_behind_queue = 'write_behind_queue.json'
+
+# seconds between the reads of the results of the current round while the fights go on, None to read them
+# only on 'round' command (see 'poll' command)
+poll_interval = None
+
 # randomize the pairs in the first round or not
 random_pairs = False
 
 # number of the fight areas to spread the fights to
 num_areas = 1
 
+# minimum number of the time slots (fights on all the areas at once) between two bouts of a fighter
+min_gap = 1
+
 # default HP for a fighter
 hp = 20
 
 # the cap is maximum allowed amount of points given
 cap = 6
 
-#
+# pairing engine: 'swiss' (beam search), 'matrix' (the same on NumPy arrays), 'round' or 'pools' (round-robin
+# in num_pools seeded pools), or 'exact' (matching, needs networkx). 'exact' is optimal among the pairs of
+# the 16 nearest fighters in the standings. If the rematches can not be avoided, it minimizes their number
+# first and relaxes the rating limit if needed, which takes tens of seconds for thousands of fighters
 pairing_function = 'swiss'
-#pairing_function = 'round'
\ No newline at end of file
+#pairing_function = 'matrix'
+#pairing_function = 'exact'
+#pairing_function = 'round'
+#pairing_function = 'pools'
+
+# number of pools for the 'pools' pairing
+num_pools = 4
+
+# beam width of the 'swiss' and 'matrix' engines
+candidates_to_keep = 15
+
+# number of the tournament states to keep the pairings for, so that the same state (after a restart
+# or a failed write) is paired at once and the same way. 0 to turn the cache off
+pairing_cache_size = 128
+
+# JSON file to keep the pairing cache between the runs, None to keep it in memory only
+pairing_cache_file = None
+
+# number of tournaments to simulate by simulate.py, if not given in the command line
+simulated_tournaments = 1000
+
+# number of processes to expand the beam of the 'swiss' pairing engine (or to run simulate.py),
+# None to use one process. It makes sense only for large candidates_to_keep on several cores,
+# compare the 'swiss' and 'parallel' engines of benchmarks/bench_pairings.py on the machine first
+pairing_workers = None
+
+# server mode (python mws.py --server): the categories by name and their fighters files
+categories = {}
+#categories = {'longsword': 'longsword.txt', 'sabre': 'sabre.txt'}
+
+# Google documents of the categories by name, None to create a new one. Every category must be listed
+# if main_api or mirror_api is google, put the id of the created document here before the next start
+category_docs = {}
+
+# address of the server mode, keep it local unless the operators use other machines
+server_host = '127.0.0.1'
+server_port = 8080
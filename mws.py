@@ -1,22 +1,64 @@
+import asyncio
 import sys
+from functools import lru_cache, partial
+from pathlib import Path
 
-from TM.tournament import Tournament
-from TM.api.csv_api import CsvApi
-from TM.api.google_api import GoogleAPI
+from TM.tournament import Tournament, PairingCache, save_snapshot, find_snapshot, read_snapshot, \
+    roster_fingerprint, results_key
+from TM.api import get_api_class
+from TM.api.google_requests import RequestExecutor
+from TM.api.write_behind import WriteBehindApi
+from TM.api.result_poller import ResultPoller
+from TM.server import TournamentServer
 import config
-from TM.pairings import swiss_pairings, round_pairings
+from TM.pairings import swiss_pairings, swiss_pairings_matrix, swiss_pairings_exact, round_pairings, \
+    pool_stage_pairings
 
 
-def update(t, api, round_num):
-    t.read_results(api, round_num)
+def snapshot_folder(category=None):
+    folder = config.snapshot_folder if config.snapshot_folder is not None else config.csv_folder
+    if category is None:
+        return folder
+    # every category of the server mode has its own snapshots
+    folder = Path(folder) / category
+    folder.mkdir(parents=True, exist_ok=True)
+    return str(folder)
+
+
+def update(t, api, round_num, poller=None, results=None, category=None):
+    """
+    :param poller: ResultPoller of the round, it must be stopped, so that its reads do not overlap the ones here
+    :param results: the parsed results of the round, if they are already known (e.g. sent to the server)
+    """
+    # the results sent to the server are not in the api, so they can not be checked on restart, see restart
+    from_api = results is None
+    # the results collected by the poller are used if they are complete, otherwise the round is read
+    if results is None and poller is not None and poller.round_num == round_num:
+        # one more poll for the results entered since the last one in background
+        try:
+            poller.poll()
+            results = poller.results()
+        except Exception as e:
+            print('Failed to poll round {}, it is read again\n'.format(round_num) + str(e))
+    if results is not None:
+        t.apply_results(results)
+    else:
+        results = t.read_results(api, round_num)
     res = t.remove()
     print("Results for round {} imported\n".format(round_num))
+    try:
+        save_snapshot(t, snapshot_folder(category), round_num, results if from_api else None)
+    except OSError as e:
+        print("Failed to save the snapshot for round {}\n".format(round_num) + str(e))
     return res
 
 
 def set_round(t, apis, round_num):
+    """
+    :return: the file (or the sheet link) the pairs are written to, None if the write failed
+    """
     # Automatic file name
-    t.make_pairs()
+    t.make_pairs(round_num)
     try:
         for api in apis:
             filename = t.write_pairs(api, round_num)
@@ -24,25 +66,198 @@ def set_round(t, apis, round_num):
         # t.standings_to_txt(filename + '_standings.txt')
         print("New pairs calculated, saved to file " + filename)
         # os.system('libreoffice ' + filename + '_pairs.csv')
+        return filename
     except Exception as e:
         print("Failed to write to file")
 
 
+@lru_cache(maxsize=None)
+def request_executor():
+    """
+    One RequestExecutor for all the Google apis, so that the categories of the server mode share
+    the rate limit of the account instead of getting it each
+    """
+    return RequestExecutor()
+
+
+def make_api(name, category=None):
+    """
+    :param category: name of the server mode category, it gets its own document (config.category_docs)
+    and its own csv files
+    """
+    api_class = get_api_class(name)
+    if name in ('google', 'google_async'):
+        if category is None:
+            return api_class(config.google_doc, config.num_areas, "MwSabres", collaborators=config.collaborators,
+                             min_gap=config.min_gap, executor=request_executor())
+        if category not in config.category_docs:
+            # otherwise every start of the server would create one more document
+            raise ValueError("No Google document for category {} in config.category_docs, "
+                             "set it to None to create a new one".format(category))
+        return api_class(config.category_docs[category], config.num_areas, "MwSabres " + category,
+                         collaborators=config.collaborators, min_gap=config.min_gap, executor=request_executor())
+    prefix = config.csv_name if category is None else '{}_{}'.format(category, config.csv_name)
+    return api_class(config.csv_folder, prefix, decorate=False, encoding=config.csv_encoding)
+
+
+def mirror_api_name():
+    """
+    :return: config.mirror_api, for 'auto' the other one of csv and google
+    """
+    if config.mirror_api == 'auto':
+        return 'google' if config.main_api == 'csv' else 'csv'
+    return config.mirror_api
+
+
+def api_key(api, category=None):
+    """
+    :return: the key of the document an api writes to: the spreadsheet id or the csv prefix, and the category
+    """
+    document = getattr(api, 'spreadsheet_id', None)
+    if document is None:
+        document = str(api.path / api.prefix)
+    return '{}:{}'.format(category or '', document)
+
+
+def make_write_behind(local, remote, category=None, read_from='remote'):
+    """
+    :return: WriteBehindApi with its queue file in csv_folder, one for every category
+    """
+    name = config.write_behind_queue if category is None else '{}_{}'.format(category, config.write_behind_queue)
+    return WriteBehindApi(local, remote, Path(config.csv_folder) / name, read_from=read_from,
+                          key=api_key(remote, category))
+
+
+def make_apis(category=None, write_behind=False):
+    """
+    :return: the main api, the results are read from it, and the list of the apis to write the pairs to
+    """
+    api_1 = make_api(config.main_api, category)
+    mirror = mirror_api_name()
+    if mirror is None:
+        return api_1, [api_1]
+    api_2 = make_api(mirror, category)
+    if write_behind:
+        # the csv one gets the round at once, and the other one in background
+        if config.main_api == 'csv':
+            api_1 = make_write_behind(api_1, api_2, category, read_from='local')
+        else:
+            api_1 = make_write_behind(api_2, api_1, category)
+        return api_1, [api_1]
+    return api_1, [api_2, api_1]
+
+
+def make_pairing_function():
+    if config.pairing_function == 'round':
+        return round_pairings
+    elif config.pairing_function == 'pools':
+        return partial(pool_stage_pairings, num_pools=config.num_pools)
+    elif config.pairing_function == 'matrix':
+        return partial(swiss_pairings_matrix, candidates_to_keep=config.candidates_to_keep)
+    elif config.pairing_function == 'exact':
+        return swiss_pairings_exact
+    return partial(swiss_pairings, candidates_to_keep=config.candidates_to_keep, workers=config.pairing_workers)
+
+
+def start_polling(t, api, round_num):
+    """
+    Starts polling the results of round_num, if it is configured. The poller of the previous round must be stopped
+    """
+    if config.poll_interval is None:
+        return None
+    if not hasattr(api, 'read_rows'):
+        print('The main api does not support polling')
+        return None
+    # the poller thread must not print into the console, its errors are shown by the 'poll' command
+    poller = ResultPoller(api, round_num, partial(t.parse_result, verbose=False), config.poll_interval)
+    poller.start()
+    return poller
+
+
 def set_final(finalists, candidates, api):
     pass
 
 
+# shared by all the tournaments of the process, see get_pairing_cache
+_pairing_cache = None
+
+
+def get_pairing_cache():
+    """
+    :return: the PairingCache set up in config.py, None if it is off
+    """
+    global _pairing_cache
+    if _pairing_cache is None and config.pairing_cache_size:
+        _pairing_cache = PairingCache(config.pairing_cache_size, config.pairing_cache_file)
+    return _pairing_cache
+
+
 def start(fighters_file, pairing_function=swiss_pairings):
-    t = Tournament(pairing_function=pairing_function, start_rating=config.hp, fight_cap=config.cap)
+    t = Tournament(pairing_function=pairing_function, start_rating=config.hp, fight_cap=config.cap,
+                   pairing_cache=get_pairing_cache())
     t.read_fighters(fighters_file, shuffle=config.random_pairs)
+    t.roster = roster_fingerprint(t.fighters)
     return t
 
 
-def restart(fighters_file, api, rounds_passed, pairing_function=swiss_pairings):
+def snapshot_problem(t, state, roster, names, api):
+    """
+    :param t: the tournament restored from the snapshot state
+    :param roster: roster_fingerprint of the fighters file, names: the sorted names in it
+    :return: why the snapshot can not be used, None if it can
+    """
+    if state.get('roster') is not None:
+        if state['roster'] != roster:
+            return 'the fighters list has changed since it was taken'
+    elif sorted(f.name for f in t.fighters + t.outs) != names:
+        # a snapshot of some other tournament in the same folder
+        return 'it does not match the fighters list'
+    if state.get('results') is not None:
+        # the results of the snapshot round may have been corrected in the api after it was taken
+        try:
+            results = [t.parse_result(res) for res in api.read(state['round'])]
+        except Exception as e:
+            return 'round {} can not be read to check it: {}'.format(state['round'], e)
+        if results_key(results) != state['results']:
+            return 'the results of round {} in the api differ from it'.format(state['round'])
+    return None
+
+
+def restart(fighters_file, api, rounds_passed, pairing_function=swiss_pairings, trusted_rounds=None,
+            category=None):
+    """
+    :param trusted_rounds: the snapshots after this round are not used, so the results are read again from the api.
+    None to trust all the snapshots up to rounds_passed
+    :param category: name of the server mode category, to take its snapshots
+    """
     t = start(fighters_file, pairing_function)
-    for round_num in range(rounds_passed):
+    roster = t.roster
+    names = sorted(f.name for f in t.fighters)
+    # Only the rounds after the latest snapshot are read from the api
+    snapshot_round = 0
+    if trusted_rounds is None:
+        trusted_rounds = rounds_passed
+    max_round = min(rounds_passed, trusted_rounds)
+    while max_round > 0:
+        snapshot = find_snapshot(snapshot_folder(category), max_round)
+        if snapshot is None:
+            break
+        state = read_snapshot(snapshot)
+        snapshot_round = t.restore(state)
+        problem = snapshot_problem(t, state, roster, names, api)
+        if problem is None:
+            print('Restored round {} from {}'.format(snapshot_round, snapshot))
+            if snapshot_round > 1:
+                print('The corrections of the rounds before {} are not read, use restart {} <trusted rounds> '
+                      'to read them'.format(snapshot_round, rounds_passed))
+            break
+        # an earlier snapshot is tried then
+        print('Snapshot {} is not used: {}'.format(snapshot, problem))
+        t = start(fighters_file, pairing_function)
+        max_round, snapshot_round = snapshot_round - 1, 0
+    for round_num in range(snapshot_round, rounds_passed):
         try:
-            update(t, api, round_num+1)
+            update(t, api, round_num+1, category=category)
             #print(t.fighters)
         except Exception as e:
             print('Failed to update round {}. Format round results correctly and try again'.format(round_num+1))
@@ -51,10 +266,114 @@ def restart(fighters_file, api, rounds_passed, pairing_function=swiss_pairings):
     return t
 
 
+class Category:
+    """
+    One tournament of the server mode, its methods are called by TM.server.TournamentServer.
+    It does the same as the 'round', 'restart' and 'list' commands of the console, and the results of a round
+    can be sent to it instead of being read from the main api
+    """
+    def __init__(self, name, fighters_file, pairing_function):
+        self.name = name
+        self.fighters_file = fighters_file
+        self.pairing_function = pairing_function
+        self.t = start(fighters_file, pairing_function)
+        self.api, self.apis = make_apis(name)
+        self.round_num = 0
+        self.finals = None
+        # the results sent for the current round, by the pair of names
+        self.submitted = {}
+
+    def pairs(self):
+        return [[p[0].name, p[1].name] for p in self.t.pairings]
+
+    def submit(self, round_num, results):
+        if round_num != self.round_num or self.round_num == 0:
+            raise ValueError("Round {} is going on, results for round {} can not be accepted".format(
+                self.round_num, round_num))
+        pairs = set(frozenset(p) for p in self.pairs())
+        parsed = [self.t.parse_result(res) for res in results]
+        for name1, name2, score in parsed:
+            if frozenset((name1, name2)) not in pairs:
+                raise ValueError("{} and {} do not fight in round {}".format(name1, name2, round_num))
+        for name1, name2, score in parsed:
+            self.submitted[frozenset((name1, name2))] = (name1, name2, score)
+        return {'round': self.round_num, 'submitted': len(self.submitted), 'fights': len(pairs)}
+
+    def results(self):
+        """
+        :return: the sent results of the current round, None if nothing is sent, so they are read from the api
+        """
+        if not self.submitted:
+            return None
+        if len(self.submitted) != len(self.t.pairings):
+            raise ValueError("Only {} of {} results of round {} are sent".format(
+                len(self.submitted), len(self.t.pairings), self.round_num))
+        return list(self.submitted.values())
+
+    def next_round(self):
+        res = None
+        if self.round_num > 0:
+            res = update(self.t, self.api, self.round_num, results=self.results(), category=self.name)
+        self.submitted = {}
+        if res is not None:
+            self.finals = res
+            set_final(res[0], res[1], self.api)
+            return self.status()
+        return self.set_round()
+
+    def set_round(self):
+        filename = set_round(self.t, self.apis, self.round_num + 1)
+        self.round_num += 1
+        if filename is None:
+            raise RuntimeError("Round {} is paired, but failed to write it".format(self.round_num))
+        return dict(self.status(), file=filename, pairs=self.pairs())
+
+    def restart(self, rounds_passed, trusted_rounds=None):
+        t = restart(self.fighters_file, self.api, rounds_passed, self.pairing_function, trusted_rounds, self.name)
+        if t is None:
+            raise ValueError("The restart of {} did not complete. "
+                             "You can correct the results and restart once again".format(self.name))
+        self.t = t
+        self.round_num = rounds_passed
+        self.submitted = {}
+        self.finals = None
+        # all the rounds are imported, so a new one is set up
+        return self.set_round()
+
+    def standings(self):
+        return [{'name': f.name, 'rating': f.rating} for f in self.t.list_fighters()]
+
+    def status(self):
+        status = {'category': self.name, 'round': self.round_num, 'fighters': len(self.t.fighters),
+                  'outs': len(self.t.outs), 'submitted': len(self.submitted)}
+        if self.finals is not None:
+            status['finalists'] = [f.name for f in self.finals[0]]
+            status['candidates'] = [f.name for f in self.finals[1]]
+        return status
+
+
+def serve():
+    """
+    Server mode: all the categories of config.categories in one process, see TM.server
+    """
+    pairing_function = make_pairing_function()
+    categories = {name: Category(name, fighters_file, pairing_function)
+                  for name, fighters_file in config.categories.items()}
+    server = TournamentServer(categories)
+    try:
+        asyncio.run(server.serve(config.server_host, config.server_port))
+    except KeyboardInterrupt:
+        pass
+
+
 def main():
     #Input check. Too simple to use click or others
     if len(sys.argv) < 2:
-        print('There must be parameter - filename')
+        print('There must be parameter - filename, or --server')
+        return
+    if sys.argv[1] == '--server':
+        serve()
+        return
     fighters_file = sys.argv[1]
     if len(sys.argv) >= 3 and sys.argv[2] == '-v':
         v = True
@@ -62,23 +381,15 @@ def main():
         v = False
 
     #Tournament setup
-    if config.pairing_function == 'round':
-        pairing_function = round_pairings
-    else:
-        pairing_function = swiss_pairings
+    pairing_function = make_pairing_function()
     t = start(fighters_file, pairing_function)
     # API setup
 
-    if config.main_api == 'google':
-        api_1 = GoogleAPI(config.google_doc, config.num_areas,
-                          "MwSabres", collaborators=config.collaborators)
-        api_2 = CsvApi(config.csv_folder, config.csv_name, decorate=False)
-    else:
-        api_2 = GoogleAPI(config.google_doc, config.num_areas,
-                          "MwSabres", collaborators=config.collaborators)
-        api_1 = CsvApi(config.csv_folder, config.csv_name, decorate=False)
+    # api_1 is the main one, the results are read from it. The pairs are written to both
+    api_1, apis = make_apis(write_behind=config.write_behind)
 
     round_num = 0
+    poller = None
     print("Tournament ready")
 
     while True:
@@ -86,41 +397,60 @@ def main():
         split = command.split(' ')
 
         if command == 'exit':
+            if isinstance(api_1, WriteBehindApi) and api_1.status()[0]:
+                # they stay in the queue file and will be sent on the next start
+                print('Rounds not sent yet: {}'.format(api_1.status()[0]))
             return
         # ignore accidental 'enter' without warnings
         elif command == '':
             continue
 
         elif split[0] == 'round':
+            # the poller reads the main api, so it is stopped while the round is read and the next one written
+            if poller is not None:
+                poller.stop()
             try:
                 res = None
                 if round_num > 0:
-                    res = update(t, api_1, round_num)
+                    res = update(t, api_1, round_num, poller)
                 if res is not None:
+                    # no more rounds to poll
+                    poller = None
                     set_final(res[0], res[1], api_1)
                 else:
-                    set_round(t, [api_2, api_1], round_num+1)
+                    set_round(t, apis, round_num+1)
+                    poller = start_polling(t, api_1, round_num+1)
             except Exception as e:
                 print('Failed to update round {}. Format round results correctly and try again'.format(round_num))
                 print(str(e))
+                if poller is not None:
+                    # the round goes on, so do its results
+                    poller.start()
                 continue
             round_num += 1
 
         elif split[0] == 'restart':
+            trusted_rounds = None
             if len(split) > 1:
                 try:
                     round_num = int(split[1])
+                    if len(split) > 2:
+                        trusted_rounds = int(split[2])
                 except ValueError:
                     print('Enter integer number of correctly passed rounds')
                     continue
+            if poller is not None:
+                poller.stop()
+                poller = None
             # restart the tournament and update it with the specified number of rounds
-            t_tmp = restart(fighters_file, api_1, round_num, pairing_function)
+            t_tmp = restart(fighters_file, api_1, round_num, pairing_function, trusted_rounds)
             if t_tmp is not None:
                 # it means that all the rounds were imported
                 # So we can setup a new round
                 t = t_tmp
                 round_num += 1
-                set_round(t, [api_2, api_1], round_num)
+                set_round(t, apis, round_num)
+                poller = start_polling(t, api_1, round_num)
             else:
                 # Some rounds were not imported correctly, so we can proceed manually,
                 # but we do not want to lose the data due to overwriting,
@@ -132,8 +462,35 @@ def main():
         elif split[0] == 'list':
             print(t.list_fighters())
 
+        elif split[0] == 'stats':
+            if not t.pairing_stats:
+                print('No pairing stats yet, the pairing function may not collect them')
+            for num, stats in sorted(t.pairing_stats.items()):
+                print('Round {}: {}'.format(num, stats))
+
+        elif split[0] == 'poll':
+            if poller is None:
+                print('Polling is off, set poll_interval in config.py')
+            else:
+                staged, total, errors = poller.status()
+                print('Round {}: {} of {} results are in'.format(poller.round_num, staged,
+                                                                '?' if total is None else total))
+                for row, error in sorted(errors.items()):
+                    print('Fight {}: {}'.format(row + 1, error))
+                if poller.last_error is not None:
+                    print('Last read failed: ' + poller.last_error)
+
+        elif split[0] == 'sync':
+            if isinstance(api_1, WriteBehindApi):
+                pending, error = api_1.status()
+                print('Rounds waiting to be sent: {}'.format(pending if pending else 'none'))
+                if error is not None:
+                    print('Last error: ' + error)
+            else:
+                print('Write-behind is off, all the rounds are written at once')
+
         else:
-            print('Unknown command, only \'list\', \'round\' and \'restart <int>\' can be used')
+            print('Unknown command, only \'list\', \'round\', \'poll\', \'sync\', \'stats\' and \'restart <int> [<int>]\' can be used')
 
 
 if __name__ == '__main__':
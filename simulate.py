@@ -0,0 +1,30 @@
+import sys
+import config
+from TM.simulation import simulate, SIMULATED_PAIRINGS
+
+
+def main():
+    # Input check, the same as in mws.py
+    if len(sys.argv) < 2:
+        print('There must be parameter - number of fighters')
+        return
+    try:
+        num_fighters = int(sys.argv[1])
+        num_tournaments = int(sys.argv[2]) if len(sys.argv) >= 3 else config.simulated_tournaments
+    except ValueError:
+        print('Enter integer numbers of fighters and tournaments')
+        return
+    if config.pairing_function not in SIMULATED_PAIRINGS:
+        print('Pairing {} can not be simulated, set pairing_function to one of {} in config.py'.format(
+            config.pairing_function, ', '.join(SIMULATED_PAIRINGS)))
+        return
+
+    print('Simulating {} tournaments of {} fighters: hp {}, cap {}, {} pairing'.format(
+        num_tournaments, num_fighters, config.hp, config.cap, config.pairing_function))
+    report = simulate(num_tournaments, num_fighters, config.hp, config.cap, config.pairing_function,
+                      candidates_to_keep=config.candidates_to_keep, workers=config.pairing_workers)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
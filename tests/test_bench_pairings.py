@@ -0,0 +1,41 @@
+from benchmarks.bench_pairings import run_benchmark, compare, run_tournament, measure, MAX_HP
+from TM.pairings import swiss_pairings, swiss_pairings_old
+from TM.tournament import Fighter
+
+
+class TestBenchPairings:
+
+    def test_same_seed_same_tournament(self):
+        first = run_tournament(swiss_pairings, 16, [1, 3], seed=5, memory=False)
+        second = run_tournament(swiss_pairings, 16, [1, 3], seed=5, memory=False)
+        assert sorted(first) == [1, 3]
+        for r in first:
+            assert first[r]['max_diff'] == second[r]['max_diff']
+            assert first[r]['tot_diff'] == second[r]['tot_diff']
+        # everybody starts with the same hp
+        assert first[1]['max_diff'] == 0
+
+    def test_sweep(self):
+        results = run_benchmark(['swiss', 'old', 'round'], sizes=[8, 16], rounds=[1, 2], keeps=[3, 5], seeds=2,
+                                report=None)
+        # swiss for every keep, old for every round, round only once
+        assert len(results) == 2 * 2 * 2 + 2 * 2 + 2
+        assert all(r['peak_kib'] is not None and 0 <= r['fallback_rate'] <= 1 for r in results)
+        assert all(r['max_diff'] <= MAX_HP for r in results if r['engine'] != 'round')
+
+    def test_compare(self):
+        base = run_benchmark(['old'], sizes=[8], rounds=[2], seeds=1, memory=False, report=None)
+        assert compare(base, base) == []
+        worse = [dict(r, max_diff=r['max_diff'] + 1, fallback_rate=1.0, time=r['time'] + 1) for r in base]
+        assert len(compare(worse, base)) == 3
+        # the results not in the baseline are skipped
+        assert compare(worse, []) == []
+
+    def test_fallback_from_stats(self):
+        # everybody has fought everybody, so swiss_pairings falls back to swiss_pairings_old
+        fighters = [Fighter(name=str(i), rating=10) for i in range(6)]
+        for f in fighters:
+            f.enemies.update({o.name: 1 for o in fighters if o is not f})
+        assert measure(swiss_pairings, fighters, memory=False)[1]['fallback']
+        # swiss_pairings_old warns about the rematches too, but it is not a fallback
+        assert not measure(swiss_pairings_old, fighters, memory=False)[1]['fallback']
@@ -0,0 +1,71 @@
+import locale
+import pytest
+from TM.api.csv_api import CsvApi
+from TM.tournament import Fighter
+
+
+def fill_scores(filename, scores):
+    """
+    Puts the scores into the written round file, as the secretary does
+    """
+    lines = filename.read_text(encoding='utf-8').splitlines()
+    for i, (s1, s2) in enumerate(scores, 1):
+        cells = lines[i].split(',')
+        cells[2], cells[3] = str(s1), str(s2)
+        lines[i] = ','.join(cells)
+    filename.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+
+class TestCsvApi:
+
+    def test_write_read(self, tmp_path):
+        api = CsvApi(tmp_path, 'round_')
+        pairs = [(Fighter('Ivanov, Ivan', 10), Fighter('"The" Petrov', 9)), (Fighter('C', 8), Fighter('D', 8))]
+        filename = api.write(pairs, 1)
+        assert filename == str(tmp_path / 'round_1.csv')
+        # the names with commas and quotes are kept in the quoted cells
+        rows = api.read_rows(1)
+        assert [rows[0][0], rows[0][5]] == ['Ivanov, Ivan', '"The" Petrov']
+        assert rows[1] == ['C', '8', '', '', '8', 'D']
+
+        text = (tmp_path / 'round_1.csv').read_text(encoding='utf-8').replace(',,,', ',-3,-1,', 1)
+        (tmp_path / 'round_1.csv').write_text(text.replace('C,8,,,8,D', 'C,8,0,-5,8,D'), encoding='utf-8')
+        results = api.read(1)
+        # the results are generated on demand
+        assert not isinstance(results, list)
+        assert list(results) == [(('Ivanov, Ivan', -3), ('"The" Petrov', -1)), (('C', 0), ('D', -5))]
+
+    def test_malformed_rows_reported_together(self, tmp_path):
+        (tmp_path / 'r1.csv').write_text('RED,Red HP,Red score,Blue score,Blue HP,BLUE\n'
+                                         'A,10,-1,-2,10,B\n'
+                                         'C,10,x,-2,10,D\n'
+                                         '\n'
+                                         'E,10,-1\n'
+                                         'F,10,-1,-2,10,G\n', encoding='utf-8')
+        api = CsvApi(tmp_path, 'r')
+        errors = []
+        assert list(api.read_results(1, errors)) == [(('A', -1), ('B', -2)), (('F', -1), ('G', -2))]
+        assert [line for line, _ in errors] == [3, 5]
+
+        with pytest.raises(ValueError) as e:
+            list(api.read(1))
+        assert 'Line 3' in str(e.value) and 'Line 5' in str(e.value)
+
+    def test_mmap_same_as_stream(self, tmp_path):
+        pairs = [(Fighter('Name {}'.format(i), 10), Fighter('Имя, {}'.format(i), 10)) for i in range(200)]
+        CsvApi(tmp_path, 'r', encoding='utf-8').write(pairs, 2)
+        fill_scores(tmp_path / 'r2.csv', [(-1, -2)] * 200)
+        streamed = list(CsvApi(tmp_path, 'r', mmap_size=None, encoding='utf-8').read(2))
+        mapped = list(CsvApi(tmp_path, 'r', mmap_size=1, encoding='utf-8').read(2))
+        assert streamed == mapped
+        assert len(mapped) == 200 and mapped[5] == (('Name 5', -1), ('Имя, 5', -2))
+
+    def test_encoding(self, tmp_path):
+        pairs = [(Fighter('Иванов', 10), Fighter('Петров', 9))]
+        for mmap_size in (None, 1):
+            api = CsvApi(tmp_path, 'r', mmap_size=mmap_size, encoding='cp1251')
+            api.write(pairs, 1)
+            assert 'Иванов'.encode('cp1251') in (tmp_path / 'r1.csv').read_bytes()
+            assert [api.read_rows(1)[0][i] for i in (0, 5)] == ['Иванов', 'Петров']
+        # the default one of the system, as before the parameter
+        assert CsvApi(tmp_path, 'r').encoding == locale.getpreferredencoding(False)
@@ -0,0 +1,87 @@
+import pytest
+from random import randint, seed, shuffle
+from TM.pairings import swiss_pairings_exact
+from TM.tournament import Fighter
+
+MAX_FIGHTERS = 100
+MAX_HP = 20
+
+
+def make_fighters(ratings, enemies=None):
+    fighters = [Fighter(name=str(i + 1), rating=r) for i, r in enumerate(ratings)]
+    if enemies:
+        for f1, f2 in enemies:
+            fighters[f1].enemies[fighters[f2].name] = 1
+            fighters[f2].enemies[fighters[f1].name] = 1
+    return fighters
+
+
+class TestExactPairings:
+
+    def test_everyone_paired_once(self):
+        seed(1)
+        fighters = make_fighters([randint(1, MAX_HP) for _ in range(MAX_FIGHTERS)])
+        pairings = swiss_pairings_exact(fighters)
+        assert len(pairings) == MAX_FIGHTERS / 2
+        names = sorted(f.name for p in pairings for f in p)
+        assert names == sorted(f.name for f in fighters)
+
+    def test_no_repeated_fight(self):
+        # The case from our first tournament, where the greedy method failed
+        fighters = [Fighter('Zakharov', 6), Fighter('Kashitsyn', 7), Fighter('Danilov', 7),
+                    Fighter('Nekrylov', 7), Fighter('Volodkov', 7), Fighter('Ryabov', 10)]
+        played = [('Zakharov', 'Danilov'), ('Kashitsyn', 'Nekrylov'), ('Danilov', 'Volodkov'),
+                  ('Nekrylov', 'Ryabov'), ('Volodkov', 'Ryabov')]
+        by_name = {f.name: f for f in fighters}
+        for n1, n2 in played:
+            by_name[n1].enemies[n2] = 1
+            by_name[n2].enemies[n1] = 1
+        for p in swiss_pairings_exact(fighters):
+            assert p[1].name not in p[0].enemies
+
+    def test_minimal_max_diff(self):
+        # 10-9 is a rematch, so we choose between (10-5, 9-1) with max 8 and (10-1, 9-5) with max 9
+        fighters = make_fighters([10, 9, 5, 1], enemies=[(0, 1)])
+        pairings = swiss_pairings_exact(fighters)
+        assert max(abs(p[0].rating - p[1].rating) for p in pairings) == 8
+
+    def test_rematch_only_if_unavoidable(self):
+        # All of the pairs have met except one, so only one rematch is allowed
+        fighters = make_fighters([4, 3, 2, 1], enemies=[(0, 1), (0, 2), (0, 3), (1, 2), (1, 3)])
+        with pytest.warns(UserWarning):
+            pairings = swiss_pairings_exact(fighters)
+        rematches = [p for p in pairings if p[1].name in p[0].enemies]
+        assert len(rematches) == 1
+
+    def test_error_on_odd_number(self):
+        fighters = [Fighter(name=str(i + 1)) for i in range(11)]
+        with pytest.raises(ValueError):
+            swiss_pairings_exact(fighters)
+
+    def test_max_diff_kept_with_rematches(self):
+        # Without the rematch 10-9 the pairs would be 10-2 and 9-1, over max_diff
+        fighters = make_fighters([10, 9, 2, 1], enemies=[(0, 1)])
+        with pytest.warns(UserWarning):
+            pairings = swiss_pairings_exact(fighters, max_diff=2)
+        assert max(abs(p[0].rating - p[1].rating) for p in pairings) <= 2
+
+    def test_max_diff_relaxed_with_warning(self):
+        fighters = make_fighters([10, 1])
+        with pytest.warns(UserWarning, match='relaxed'):
+            pairings = swiss_pairings_exact(fighters, max_diff=2)
+        assert len(pairings) == 1
+
+    def test_large_roster(self):
+        seed(2)
+        fighters = make_fighters([randint(1, MAX_HP) for _ in range(2000)])
+        for _ in range(4):
+            order = fighters[:]
+            shuffle(order)
+            for f1, f2 in zip(order[::2], order[1::2]):
+                f1.enemies[f2.name] = 1
+                f2.enemies[f1.name] = 1
+        pairings = swiss_pairings_exact(fighters)
+        assert len(pairings) == 1000
+        assert all(p[1].name not in p[0].enemies for p in pairings)
+        # the neighbours in the standings differ by 1 at most
+        assert max(abs(p[0].rating - p[1].rating) for p in pairings) <= 1
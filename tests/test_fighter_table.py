@@ -0,0 +1,79 @@
+import pytest
+from random import randint, seed
+from TM.tournament import Tournament, Fighter, FighterTable
+from TM.pairings import swiss_pairings, swiss_pairings_matrix
+from TM.pairings.matrix_pairings import PairingMatrix
+
+MAX_HP = 20
+CAP = 5
+
+
+def random_fighters(fighters_num):
+    fighters = [Fighter(name=str(i + 1), rating=randint(1, MAX_HP)) for i in range(fighters_num)]
+    for f in fighters:
+        for _ in range(3):
+            other = fighters[randint(0, fighters_num - 1)]
+            if other is not f:
+                f.fight(other, 0)
+                other.fight(f, 0)
+    return fighters
+
+
+class RandomApi:
+    def __init__(self):
+        self.pairs = []
+
+    def write(self, pairs, round_num):
+        self.pairs = [(p[0].name, p[1].name) for p in pairs]
+
+    def read(self, round_num):
+        return [((p[0], -CAP), (p[1], randint(-CAP, 0))) for p in self.pairs]
+
+
+class TestFighterTable:
+
+    def test_views_keep_fighter_interface(self):
+        seed(4)
+        fighters = random_fighters(20)
+        table = FighterTable.from_fighters(fighters)
+        views = table.fighters()
+        assert [f.to_str() for f in views] == [f.to_str() for f in fighters]
+        for f, v in zip(fighters, views):
+            for other, other_view in zip(fighters, views):
+                assert f.played(other) == v.played(other_view)
+        assert not hasattr(views[0], '__dict__')
+
+    def test_fight_updates_arrays(self):
+        table = FighterTable()
+        f1 = table.add('A', 10)
+        f2 = table.add('B', 10)
+        f1.fight(f2, 3)
+        assert table.ratings[f1.id] == 7
+        assert f1.played(f2) == 1 and f2.played(f1) == 0
+        assert 'B' in f1.enemies
+        with pytest.raises(ValueError):
+            table.add('A')
+
+    def test_pairing_matrix_same_as_objects(self):
+        seed(5)
+        fighters = random_fighters(30)
+        from_objects = PairingMatrix(fighters)
+        from_table = PairingMatrix(FighterTable.from_fighters(fighters).fighters())
+        assert [f.name for f in from_objects.standings] == [f.name for f in from_table.standings]
+        assert (from_objects.played == from_table.played).all()
+        assert (from_objects.cost == from_table.cost).all()
+
+    def test_tournament_in_table_storage(self):
+        seed(6)
+        for pairing_function in (swiss_pairings, swiss_pairings_matrix):
+            fighters = [Fighter(name=str(i), rating=MAX_HP) for i in range(40)]
+            t = Tournament(pairing_function, fighters=fighters, fight_cap=CAP, storage='table')
+            api = RandomApi()
+            r = 0
+            while t.remove(v=False) is None:
+                t.make_pairs()
+                t.write_pairs(api, r)
+                t.read_results(api, r)
+                r += 1
+            assert t.table.alive.sum() == len(t.fighters)
+            assert len(t.outs) + len(t.fighters) == 40
@@ -0,0 +1,268 @@
+import asyncio
+import pytest
+import subprocess
+import sys
+import threading
+import time
+from TM.api import get_api_class
+from TM.api.google_api import GoogleAPI
+from TM.api.google_api_async import AsyncGoogleAPI
+from TM.api.google_requests import RequestExecutor, TokenBucket
+from TM.tournament import Fighter
+
+
+class FakeRequest:
+    def __init__(self, service, method, kwargs):
+        self.service = service
+        self.method = method
+        self.kwargs = kwargs
+
+    def execute(self, http=None):
+        self.service.calls.append((self.method, self.kwargs))
+        self.service.https.append(http)
+        return self.service.respond(self.method, self.kwargs)
+
+
+class FakeService:
+    """
+    Records the calls of the Google Sheets and Drive services instead of sending them
+    """
+    def __init__(self):
+        self.calls = []
+        self.https = []
+        self.cells = {}
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return FakeValues(self)
+
+    def permissions(self):
+        return self
+
+    def __getattr__(self, method):
+        if method in ('batchUpdate', 'batchGet', 'get', 'clear', 'create'):
+            return lambda **kwargs: FakeRequest(self, method, kwargs)
+        raise AttributeError(method)
+
+    def respond(self, method, kwargs):
+        if method == 'values.batchUpdate':
+            for d in kwargs['body']['data']:
+                self.cells[d['range']] = d['values']
+        if method == 'values.batchGet':
+            return {'valueRanges': [{'range': r, 'values': self.cells[r]} if r in self.cells else {'range': r}
+                                    for r in kwargs['ranges']]}
+        return {}
+
+
+class FakeValues:
+    def __init__(self, service):
+        self.service = service
+
+    def __getattr__(self, method):
+        return lambda **kwargs: FakeRequest(self.service, 'values.' + method, kwargs)
+
+
+def make_pairs(num):
+    fighters = [Fighter(name=str(i + 1), rating=10) for i in range(num * 2)]
+    return [(fighters[2 * i], fighters[2 * i + 1]) for i in range(num)]
+
+
+class TestGoogleAPI:
+
+    def test_import_is_lazy(self):
+        code = ('import sys; from TM.api import get_api_class; get_api_class("google"); get_api_class("csv"); '
+                'print(any(m in sys.modules for m in ("apiclient", "httplib2", "oauth2client")))')
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        assert out.stdout.strip() == 'False'
+        assert get_api_class('google') is GoogleAPI
+
+    def test_write_round_in_two_calls(self):
+        service = FakeService()
+        api = GoogleAPI('doc', num_areas=2, sheets_service=service)
+        api.write(make_pairs(7), 1)
+        assert [c[0] for c in service.calls] == ['batchUpdate', 'values.batchUpdate']
+
+    def test_read_round_in_one_call(self):
+        service = FakeService()
+        api = GoogleAPI('doc', num_areas=2, sheets_service=service)
+        api.write(make_pairs(7), 1)
+        service.calls = []
+        data = api.read(1)
+        assert [c[0] for c in service.calls] == ['values.batchGet']
+        assert service.calls[0][1]['ranges'] == ['Round_1!B3:G7', 'Round_1!I3:N6']
+        # the fights go to the areas one by one
+        order = [0, 2, 4, 6, 1, 3, 5]
+        assert [(d[0][0], d[1][0]) for d in data] == [(str(2 * i + 1), str(2 * i + 2)) for i in order]
+
+    def test_own_http_per_thread(self, monkeypatch):
+        import TM.api.google_api as google_api
+        service = FakeService()
+        monkeypatch.setattr(google_api, 'get_service', lambda *args: service)
+        monkeypatch.setattr(google_api, 'new_http', object)
+        api = GoogleAPI('doc', num_areas=1)
+        api.write(make_pairs(2), 1)
+        worker = threading.Thread(target=api.read, args=(1,))
+        worker.start()
+        worker.join()
+        main_http, worker_http = service.https[0], service.https[-1]
+        assert main_http is not None and worker_http is not None and main_http is not worker_http
+        assert service.https[:2] == [main_http, main_http]
+
+
+class SlowFakeService(FakeService):
+    """
+    Each call takes some time, and the maximum number of simultaneous calls is recorded
+    """
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def respond(self, method, kwargs):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        return super().respond(method, kwargs)
+
+
+class TestAsyncGoogleAPI:
+
+    def test_share_is_concurrent_and_bounded(self):
+        service = SlowFakeService()
+        api = AsyncGoogleAPI('doc', sheets_service=service, drive_service=service, max_concurrency=4)
+        api.share(['user{}@example.com'.format(i) for i in range(10)])
+        assert len(service.calls) == 10
+        assert service.max_running == 4
+
+    def test_same_contract(self):
+        service = FakeService()
+        api = AsyncGoogleAPI('doc', num_areas=2, sheets_service=service)
+        api.write(make_pairs(5), 1)
+        assert [c[0] for c in service.calls] == ['batchUpdate', 'values.batchUpdate']
+        assert len(api.read(1)) == 5
+
+    def test_blocking_calls_in_running_loop(self):
+        service = FakeService()
+        api = AsyncGoogleAPI('doc', num_areas=2, sheets_service=service)
+
+        async def handler():
+            # as a request handler of the server mode would call it
+            api.write(make_pairs(3), 1)
+            return api.read(1)
+
+        assert len(asyncio.run(handler())) == 3
+        api.close()
+
+
+class FakeResponse(dict):
+    def __init__(self, status, headers=None):
+        super().__init__(headers or {})
+        self.status = status
+
+
+class FakeHttpError(Exception):
+    def __init__(self, status, headers=None, message=''):
+        super().__init__('HTTP {} {}'.format(status, message))
+        self.resp = FakeResponse(status, headers)
+
+
+class FailingFakeService(FakeService):
+    """
+    Fails the given methods with the given errors, one error per call while they last
+    """
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def respond(self, method, kwargs):
+        if self.failures.get(method):
+            raise self.failures[method].pop(0)
+        return super().respond(method, kwargs)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_executor(clock, retries=5):
+    return RequestExecutor(TokenBucket(rate=1, capacity=2, clock=clock, sleep=clock.sleep),
+                           retries=retries, sleep=clock.sleep, jitter=lambda: 1.0)
+
+
+class TestRequestExecutor:
+
+    def test_token_bucket_waits(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock, sleep=clock.sleep)
+        waits = [bucket.acquire() for _ in range(4)]
+        assert waits == [0, 0, 0.5, 0.5]
+
+    def test_retry_429_with_backoff_and_retry_after(self):
+        clock = FakeClock()
+        service = FailingFakeService({'values.batchGet': [FakeHttpError(429), FakeHttpError(429),
+                                                          FakeHttpError(429, {'retry-after': '7'})]})
+        api = GoogleAPI('doc', num_areas=1, sheets_service=service, executor=make_executor(clock))
+        assert api.read(1) == []
+        backoff = [s for s in clock.sleeps if s >= 1]
+        assert backoff == [1.0, 2.0, 7.0]
+
+    def test_other_errors_not_retried(self):
+        clock = FakeClock()
+        service = FailingFakeService({'values.batchGet': [FakeHttpError(400)]})
+        api = GoogleAPI('doc', num_areas=1, sheets_service=service, executor=make_executor(clock))
+        with pytest.raises(FakeHttpError):
+            api.read(1)
+        assert len(service.calls) == 1
+
+    def test_failed_write_deletes_the_page(self):
+        clock = FakeClock()
+        service = FailingFakeService({'values.batchUpdate': [FakeHttpError(429) for _ in range(3)]})
+        api = GoogleAPI('doc', num_areas=2, sheets_service=service, executor=make_executor(clock, retries=2))
+        with pytest.raises(FakeHttpError):
+            api.write(make_pairs(4), 1)
+        assert [c[0] for c in service.calls] == ['batchUpdate'] + ['values.batchUpdate'] * 3 + ['batchUpdate']
+        assert service.calls[-1][1]['body']['requests'] == [{'deleteSheet': {'sheetId': 0}}]
+
+    def test_existing_page_kept_until_the_values_are_written(self):
+        clock = FakeClock()
+        exists = FakeHttpError(400, message='A sheet with the name "Round_1" already exists')
+        service = FailingFakeService({'batchUpdate': [exists], 'values.batchUpdate': [FakeHttpError(400)]})
+        api = GoogleAPI('doc', num_areas=1, sheets_service=service, executor=make_executor(clock))
+        with pytest.raises(FakeHttpError):
+            api.write(make_pairs(2), 1)
+        # the page is only formatted, and it is not deleted after the failed values request
+        assert [c[0] for c in service.calls] == ['batchUpdate', 'batchUpdate', 'values.batchUpdate']
+        kinds = [list(r.keys())[0] for r in service.calls[1][1]['body']['requests']]
+        assert 'addSheet' not in kinds and 'updateCells' not in kinds and 'deleteSheet' not in kinds
+        # the values request replaces the whole area
+        assert service.calls[2][1]['body']['data'][-1]['range'] == 'Round_1!B3:G1000'
+
+    def test_create_errors_not_hidden(self):
+        clock = FakeClock()
+        service = FailingFakeService({'batchUpdate': [FakeHttpError(429) for _ in range(3)]})
+        api = GoogleAPI('doc', num_areas=1, sheets_service=service, executor=make_executor(clock, retries=2))
+        with pytest.raises(FakeHttpError):
+            api.write(make_pairs(2), 1)
+        # no attempt to reuse a page which may not exist
+        assert [c[0] for c in service.calls] == ['batchUpdate'] * 3
+
+    def test_failed_doc_creation_raised(self):
+        clock = FakeClock()
+        service = FailingFakeService({'create': [FakeHttpError(403)]})
+        with pytest.raises(FakeHttpError):
+            GoogleAPI(None, num_areas=1, sheets_service=service, executor=make_executor(clock))
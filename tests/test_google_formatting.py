@@ -0,0 +1,38 @@
+from TM.api.google_formatting import get_round_request, get_round_data_request, get_read_ranges, get_pair_position
+
+
+class TestGoogleFormatting:
+
+    def test_round_request_is_one_batch(self):
+        request = get_round_request(2)
+        kinds = [list(r.keys())[0] for r in request]
+        assert kinds[0] == 'addSheet'
+        assert 'updateDimensionProperties' in kinds and 'mergeCells' in kinds
+        # the old values are replaced by the values request, not cleared before it
+        assert 'updateCells' not in kinds
+        assert all(list(r.values())[0].get('range', {'sheetId': 2})['sheetId'] == 2 for r in request[1:])
+        assert 'addSheet' not in [list(r.keys())[0] for r in get_round_request(2, create=False)]
+
+    def test_round_data_request_has_header_and_areas(self):
+        rows = [['A', '10', '', '', '10', 'B'], ['C', '9', '', '', '8', 'D']]
+        data = get_round_data_request(0, [rows[:1], rows[1:]])['data']
+        ranges = [d['range'] for d in data]
+        assert ranges[:3] == ['Round_1!B1:B1', 'Round_1!I1:I1', 'Round_1!B2:N2']
+        assert ranges[3].startswith('Round_1!B3:G') and ranges[4].startswith('Round_1!I3:N')
+        assert data[3]['values'] == rows[:1] and data[4]['values'] == rows[1:]
+
+    def test_round_data_request_clears_the_rest(self):
+        rows = [['A', '10', '', '', '10', 'B']]
+        data = get_round_data_request(0, [rows, []], clear=True)['data']
+        assert data[3]['range'] == 'Round_1!B3:G1000' and data[4]['range'] == 'Round_1!I3:N1000'
+        assert data[3]['values'][0] == rows[0] and data[3]['values'][1:] == [[''] * 6] * 996
+
+    def test_read_ranges_trimmed(self):
+        assert get_read_ranges(3, [7, None]) == ['Round_3!B3:G10', 'Round_3!I3:N1003']
+
+    def test_any_number_of_areas(self):
+        assert get_pair_position(1, 2, 4) == 'Round_1!P3:U7'
+        assert get_pair_position(1, 4, 4) == 'Round_1!AD3:AI7'
+        data = get_round_data_request(0, [[], [], []])['data']
+        assert [d['values'] for d in data[:3]] == [[['1 ристалище']], [['2 ристалище']], [['3 ристалище']]]
+        assert data[3]['range'] == 'Round_1!B2:U2' and len(data[3]['values'][0]) == 20
@@ -12,10 +12,14 @@ CAP = 5
 
 
 class ProxyApi:
-    def __init__(self, cap):
+    def __init__(self, cap, random=None):
+        """
+        :param random: random.Random to make the results with, the global generator by default
+        """
         self.all_fights = []
         self.cap = cap
         self.pairs = []
+        self.randint = randint if random is None else random.randint
 
     def write(self, pairs, round_num):
         self.pairs = [(p[0].name, p[1].name) for p in pairs]
@@ -29,8 +33,8 @@ class ProxyApi:
         """
         results = []
         for pair in self.pairs:
-            res = [-self.cap, randint(-self.cap, 0)]
-            if randint(0, 1) == 0:
+            res = [-self.cap, self.randint(-self.cap, 0)]
+            if self.randint(0, 1) == 0:
                 res = [res[1], res[0]]
             results.append(((pair[0], res[0]), (pair[1], res[1])))
         self.all_fights.append(results)
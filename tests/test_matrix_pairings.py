@@ -0,0 +1,43 @@
+from random import randint, seed
+from TM.pairings import swiss_pairings_matrix
+from TM.pairings.matrix_pairings import PairingMatrix
+from TM.tournament import Fighter
+
+MAX_FIGHTERS = 200
+MAX_HP = 20
+
+
+def random_tournament(fighters_num, fights_per_fighter=3):
+    fighters = [Fighter(name=str(i + 1), rating=randint(1, MAX_HP)) for i in range(fighters_num)]
+    for f in fighters:
+        for _ in range(fights_per_fighter):
+            other = fighters[randint(0, fighters_num - 1)]
+            if other is not f:
+                f.enemies[other.name] = 1
+    return fighters
+
+
+class TestMatrixPairings:
+
+    def test_matrix_matches_already_played(self):
+        seed(2)
+        fighters = random_tournament(30)
+        matrix = PairingMatrix(fighters)
+        for i, f1 in enumerate(matrix.standings):
+            for j, f2 in enumerate(matrix.standings):
+                assert matrix.played[i, j] == (f1.played(f2) > 0 or f2.played(f1) > 0)
+                assert matrix.cost[i, j] == abs(f1.rating - f2.rating)
+
+    def test_everyone_paired_without_rematch(self):
+        seed(3)
+        fighters = random_tournament(MAX_FIGHTERS)
+        pairings = swiss_pairings_matrix(fighters)
+        assert sorted(f.name for p in pairings for f in p) == sorted(f.name for f in fighters)
+        for p in pairings:
+            assert p[1].name not in p[0].enemies
+            assert p[0].name not in p[1].enemies
+
+    def test_max_diff_filter(self):
+        fighters = [Fighter(name=str(i + 1), rating=r) for i, r in enumerate([10, 9, 5, 4])]
+        pairings = swiss_pairings_matrix(fighters, max_diff=1)
+        assert max(abs(p[0].rating - p[1].rating) for p in pairings) <= 1
@@ -0,0 +1,78 @@
+import csv
+import pytest
+import config
+import mws
+from TM.pairings import swiss_pairings
+
+FIGHTERS = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J']
+
+
+@pytest.fixture
+def category(tmp_path, monkeypatch):
+    """
+    A server mode category on the csv api in tmp_path
+    """
+    for name, value in dict(csv_folder=str(tmp_path), snapshot_folder=None, main_api='csv', mirror_api=None,
+                            csv_encoding='utf-8', poll_interval=None, random_pairs=False, hp=10, cap=5,
+                            pairing_cache_size=16, pairing_cache_file=None).items():
+        monkeypatch.setattr(config, name, value)
+    monkeypatch.setattr(mws, '_pairing_cache', None)
+    fighters_file = tmp_path / 'sabre.txt'
+    fighters_file.write_text(''.join('{},10\n'.format(name) for name in FIGHTERS), encoding='utf-8')
+    return mws.Category('sabre', str(fighters_file), swiss_pairings)
+
+
+def fill_scores(filename, score):
+    """
+    Puts the same score into every fight of the round file, as the secretary does
+    """
+    with open(filename, newline='', encoding='utf-8') as src:
+        rows = list(csv.reader(src))
+    for row in rows[1:]:
+        row[2], row[3] = str(score[0]), str(score[1])
+    with open(filename, 'w', newline='', encoding='utf-8') as dst:
+        csv.writer(dst).writerows(rows)
+
+
+class TestCategory:
+
+    def test_submitted_results(self, category, tmp_path):
+        status = category.next_round()
+        assert status['round'] == 1 and status['file'] == str(tmp_path / 'sabre_mws1.csv')
+        pairs = status['pairs']
+        assert sorted(name for pair in pairs for name in pair) == FIGHTERS
+        with pytest.raises(ValueError):
+            category.submit(2, [])
+        assert category.submit(1, [((n1, -3), (n2, 0)) for n1, n2 in pairs])['submitted'] == 5
+
+        assert category.next_round()['round'] == 2
+        # the results were sent to the server, the csv file of round 1 has no scores
+        ratings = {f['name']: f['rating'] for f in category.standings()}
+        assert [ratings[n1] for n1, _ in pairs] == [7] * 5
+        assert (tmp_path / 'sabre' / 'snapshot_1.json').exists()
+
+    def test_results_from_api_and_restart(self, category, tmp_path):
+        category.next_round()
+        fill_scores(tmp_path / 'sabre_mws1.csv', (0, -2))
+        second = category.next_round()['pairs']
+
+        # the restart takes the snapshot of round 1, and the pairs of round 2 come from the shared cache
+        cache = mws.get_pairing_cache()
+        stored = len(cache)
+        status = category.restart(1)
+        assert status['round'] == 2 and status['pairs'] == second
+        assert len(cache) == stored
+        assert sorted(f['rating'] for f in category.standings()) == [8] * 5 + [10] * 5
+
+    def test_category_doc_required(self, monkeypatch):
+        monkeypatch.setattr(config, 'category_docs', {})
+        with pytest.raises(ValueError, match='category_docs'):
+            mws.make_api('google', 'sabre')
+
+
+class TestPairingFunction:
+
+    def test_matrix_beam_width_from_config(self, monkeypatch):
+        monkeypatch.setattr(config, 'pairing_function', 'matrix')
+        monkeypatch.setattr(config, 'candidates_to_keep', 7)
+        assert mws.make_pairing_function().keywords == {'candidates_to_keep': 7}
@@ -0,0 +1,74 @@
+from functools import partial
+from unittest import mock
+from TM.pairings import swiss_pairings, swiss_pairings_exact
+from TM.tournament import Tournament, Fighter, PairingCache
+
+
+def make_fighters(num=8):
+    return [Fighter(name=str(i), rating=10 + i % 3) for i in range(num)]
+
+
+class TestPairingCache:
+
+    def test_fingerprint(self):
+        fighters = make_fighters()
+        key = PairingCache.fingerprint(fighters, swiss_pairings)
+        assert key == PairingCache.fingerprint(make_fighters(), swiss_pairings)
+        assert key != PairingCache.fingerprint(fighters, swiss_pairings_exact)
+        assert key != PairingCache.fingerprint(fighters, partial(swiss_pairings, candidates_to_keep=3))
+        assert key != PairingCache.fingerprint(fighters[::-1], swiss_pairings)
+        fighters[0].enemies['1'] = 1
+        played = PairingCache.fingerprint(fighters, swiss_pairings)
+        assert played != key
+        # the fight is the same from either side
+        other = make_fighters()
+        other[1].enemies['0'] = 1
+        assert PairingCache.fingerprint(other, swiss_pairings) == played
+        # the enemies out of the tournament do not matter
+        fighters[2].enemies['Gone'] = 1
+        assert PairingCache.fingerprint(fighters, swiss_pairings) == played
+
+    def test_lru(self):
+        cache = PairingCache(maxsize=2)
+        a, b = Fighter('A'), Fighter('B')
+        cache.put('1', [(a, b)])
+        cache.put('2', [(b, a)])
+        assert cache.get('1') == [('A', 'B')]
+        cache.put('3', [(a, b)])
+        # '2' is the least recently used
+        assert '2' not in cache and '1' in cache and len(cache) == 2
+        assert cache.get('2') is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_tournament_pairs_once(self, tmp_path):
+        pairing_function = mock.Mock(side_effect=swiss_pairings)
+        cache = PairingCache(filename=tmp_path / 'cache.json')
+        t = Tournament(pairing_function, fighters=make_fighters(), fight_cap=5, pairing_cache=cache)
+        t.make_pairs()
+        first = [(a.name, b.name) for a, b in t.pairings]
+        t.make_pairs()
+        assert pairing_function.call_count == 1
+        assert [(a.name, b.name) for a, b in t.pairings] == first
+        # the pairs are the fighters of this tournament
+        assert all(a is t.index[a.name] for a, _ in t.pairings)
+
+        # a restart with the cache from the disk
+        restarted = Tournament(pairing_function, fighters=make_fighters(), fight_cap=5,
+                               pairing_cache=PairingCache(filename=tmp_path / 'cache.json'))
+        restarted.make_pairs()
+        assert pairing_function.call_count == 1
+        assert [(a.name, b.name) for a, b in restarted.pairings] == first
+
+        # a new state is paired again
+        t.update_fighters(first[0][0], first[0][1], (1, 0))
+        t.make_pairs()
+        assert pairing_function.call_count == 2
+
+    def test_cache_hit_stats(self):
+        t = Tournament(swiss_pairings, fighters=make_fighters(), fight_cap=5, pairing_cache=PairingCache())
+        t.make_pairs()
+        t.make_pairs()
+        assert sorted(t.pairing_stats) == [1, 2]
+        assert not t.pairing_stats[1].cache_hit and t.pairing_stats[2].cache_hit
+        assert t.pairing_stats[2].max_diff == t.pairing_stats[1].max_diff
+        assert 'cache' in str(t.pairing_stats[2])
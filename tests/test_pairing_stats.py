@@ -0,0 +1,57 @@
+import warnings
+from functools import partial
+from TM.pairings import swiss_pairings, swiss_pairings_matrix, swiss_pairings_exact, round_pairings, PairingStats
+from TM.tournament import Tournament, Fighter
+
+
+def all_played(num):
+    # everybody has fought everybody, so any pairing is a rematch
+    fighters = [Fighter(name=str(i), rating=10) for i in range(num)]
+    for f in fighters:
+        for o in fighters:
+            if o is not f:
+                f.enemies[o.name] = 1
+    return fighters
+
+
+class TestPairingStats:
+
+    def test_beam_levels(self):
+        fighters = [Fighter(name=str(i), rating=i) for i in range(10)]
+        for pairing_function in (swiss_pairings, swiss_pairings_matrix):
+            stats = PairingStats()
+            pairs = pairing_function(fighters, candidates_to_keep=3, stats=stats)
+            assert len(stats.levels) == 5
+            assert all(generated >= kept and kept <= 3 for _, generated, kept in stats.levels)
+            assert stats.pruned == stats.generated - sum(level[2] for level in stats.levels)
+            assert stats.max_diff == max(abs(a.rating - b.rating) for a, b in pairs) == 1
+            assert stats.tot_diff == 5 and stats.rematches == 0
+            assert not stats.fallback and stats.time >= 0
+
+    def test_fallback(self):
+        for pairing_function in (swiss_pairings, swiss_pairings_matrix):
+            stats = PairingStats()
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                pairing_function(all_played(6), stats=stats)
+            assert stats.fallback
+            assert stats.rematches == 3
+            assert 'FALLBACK' in str(stats)
+
+    def test_exact(self):
+        stats = PairingStats()
+        swiss_pairings_exact([Fighter(name=str(i), rating=i) for i in range(6)], stats=stats)
+        assert stats.engine == 'swiss_pairings_exact' and stats.max_diff == 1 and stats.levels == []
+
+    def test_tournament_keeps_stats_by_round(self):
+        fighters = [Fighter(name=str(i), rating=10) for i in range(8)]
+        t = Tournament(partial(swiss_pairings, candidates_to_keep=5), fighters=fighters, fight_cap=5)
+        t.make_pairs(1)
+        t.make_pairs()
+        assert sorted(t.pairing_stats) == [1, 2]
+        assert t.pairing_stats[2].engine == 'swiss_pairings'
+
+        # the pairing functions without stats still work
+        t = Tournament(round_pairings, fighters=fighters, fight_cap=5)
+        t.make_pairs(1)
+        assert t.pairing_stats == {} and len(t.pairings) == 28
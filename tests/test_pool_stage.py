@@ -0,0 +1,31 @@
+from random import randint, seed
+from TM.pairings import pool_stage_pairings, snake_pools
+from TM.pairings.pool_stage import pool_stage_schedule
+from TM.pairings.scheduler import rest_gaps
+from TM.tournament import Fighter
+
+MAX_HP = 20
+
+
+class TestPoolStage:
+
+    def test_snake_seeding(self):
+        fighters = [Fighter(name=str(i), rating=10 - i) for i in range(10)]
+        pools = snake_pools(fighters, 3)
+        assert [[f.name for f in pool] for pool in pools] == [['0', '5', '6'], ['1', '4', '7'], ['2', '3', '8', '9']]
+
+    def test_all_pool_fights(self):
+        seed(7)
+        fighters = [Fighter(name=str(i), rating=randint(1, MAX_HP)) for i in range(23)]
+        pools = snake_pools(fighters, 4)
+        pool_of = {f.name: k for k, pool in enumerate(pools) for f in pool}
+        pairs = pool_stage_pairings(fighters, 4)
+        assert len(pairs) == sum(len(p) * (len(p) - 1) // 2 for p in pools)
+        assert all(pool_of[a.name] == pool_of[b.name] for a, b in pairs)
+        assert len(set(frozenset((a.name, b.name)) for a, b in pairs)) == len(pairs)
+
+    def test_schedule_on_areas(self):
+        fighters = [Fighter(name=str(i), rating=MAX_HP) for i in range(24)]
+        areas = pool_stage_schedule(fighters, num_pools=4, num_areas=3, min_gap=1)
+        assert sum(p is not None for a in areas for p in a) == 4 * 15
+        assert rest_gaps(areas) >= 1
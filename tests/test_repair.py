@@ -0,0 +1,69 @@
+from random import randint, seed, sample
+from TM.pairings import swiss_pairings, repair_pairings, PairingStats
+from TM.tournament import Fighter
+
+
+def names(pairs):
+    return [frozenset(f.name for f in p) for p in pairs]
+
+
+def make_round(num, played=3):
+    seed(num)
+    fighters = [Fighter(name=str(i), rating=randint(0, 20)) for i in range(num)]
+    for f in fighters:
+        for o in sample(fighters, played):
+            if o is not f:
+                f.enemies[o.name] = o.enemies[f.name] = 1
+    return fighters, swiss_pairings(fighters, candidates_to_keep=3)
+
+
+class TestRepairPairings:
+
+    def test_withdrawn_fighter(self):
+        fighters, pairs = make_round(40)
+        gone = fighters[7]
+        repaired, bye = repair_pairings(pairs, [gone], window=2)
+        paired = [f.name for p in repaired for f in p]
+        assert gone.name not in paired
+        # 39 fighters left, one of them gets the bye
+        assert bye is not None and bye.name not in paired
+        assert sorted(paired + [bye.name]) == sorted(f.name for f in fighters if f is not gone)
+        # only the neighbourhood is changed: at most (2 * window + 1) pairs around the freed fighter
+        assert len(set(names(repaired)) - set(names(pairs))) <= 5
+        # the untouched pairs keep their order
+        old = names(pairs)
+        kept = [old.index(p) for p in names(repaired) if p in old]
+        assert kept == sorted(kept) and len(kept) >= len(pairs) - 6
+
+    def test_even_repair_without_rematches(self):
+        fighters, pairs = make_round(40)
+        gone = [pairs[3][0], pairs[10][1]]
+        stats = PairingStats()
+        repaired, bye = repair_pairings(pairs, gone, stats=stats)
+        assert bye is None and len(repaired) == 19
+        assert stats.rematches == 0 and stats.engine == 'repair_pairings'
+        assert sorted(f.name for p in repaired for f in p) == sorted(f.name for f in fighters if f not in gone)
+
+    def test_pair_withdrawn_together(self):
+        fighters, pairs = make_round(10, played=1)
+        repaired, bye = repair_pairings(pairs, list(pairs[2]))
+        assert names(repaired) == names(pairs[:2] + pairs[3:]) and bye is None
+
+    def test_added_fighter(self):
+        fighters, pairs = make_round(10, played=1)
+        late = Fighter('late', 12)
+        repaired, bye = repair_pairings(pairs, added=[late, Fighter('later', 11)])
+        assert len(repaired) == 6 and bye is None
+        assert any('late' in p for p in names(repaired))
+
+    def test_previous_bye_is_free(self):
+        fighters, pairs = make_round(40)
+        repaired, bye = repair_pairings(pairs, [fighters[7]])
+        assert bye is not None
+        # one more fighter leaves: the bye gets a pair instead of a second bye
+        gone = [f for p in repaired for f in p if f is not bye][5]
+        repaired, second = repair_pairings(repaired, [gone], bye=bye)
+        assert second is None and len(repaired) == 19
+        paired = [f.name for p in repaired for f in p]
+        assert bye.name in paired and sorted(paired) == sorted(f.name for f in fighters
+                                                                 if f is not fighters[7] and f is not gone)
@@ -0,0 +1,63 @@
+from functools import partial
+from TM.api.result_poller import ResultPoller
+from TM.tournament import Tournament, Fighter
+from TM.pairings import swiss_pairings
+
+CAP = 5
+
+
+class SheetApi:
+    """
+    The rows of the round as the secretaries fill them in
+    """
+    def __init__(self, rows):
+        self.rows = rows
+        self.reads = 0
+
+    def read_rows(self, round_num):
+        self.reads += 1
+        return [list(row) for row in self.rows]
+
+
+class TestResultPoller:
+
+    def test_staged_as_fights_finish(self):
+        api = SheetApi([['A', '10', '', '', '10', 'B'], ['C', '10', '', '', '10', 'D']])
+        t = Tournament(swiss_pairings, fighters=[Fighter(n, 10) for n in 'ABCD'], fight_cap=CAP)
+        poller = ResultPoller(api, 1, t.parse_result)
+        assert poller.poll() == 2
+        assert poller.status() == (0, 2, {})
+
+        api.rows[0] = ['A', '10', '3', '5', '10', 'B']
+        assert poller.poll() == 1
+        assert poller.results() is None
+
+        api.rows[1] = ['C', '10', '9', '0', '10', 'D']
+        poller.poll()
+        staged, total, errors = poller.status()
+        assert (staged, total, list(errors)) == (1, 2, [1])
+
+        # the score is corrected in the sheet, only this row is parsed again
+        api.rows[1] = ['C', '10', '1', '0', '10', 'D']
+        assert poller.poll() == 1
+        results = poller.results()
+        assert results == [('A', 'B', (3, 5)), ('C', 'D', (1, 0))]
+
+        t.apply_results(results)
+        assert [f.rating for f in t.fighters] == [7, 5, 9, 10]
+
+    def test_unchanged_rows_not_parsed(self):
+        parsed = []
+        api = SheetApi([['A', '10', '1', '2', '10', 'B']])
+        poller = ResultPoller(api, 1, lambda r: parsed.append(r) or r)
+        poller.poll()
+        poller.poll()
+        assert len(parsed) == 1 and api.reads == 2
+
+    def test_wrong_rows_not_printed(self, capsys):
+        api = SheetApi([['A', '10', 'x', '2', '10', 'B']])
+        t = Tournament(swiss_pairings, fighters=[Fighter(n, 10) for n in 'AB'], fight_cap=CAP)
+        poller = ResultPoller(api, 1, partial(t.parse_result, verbose=False))
+        poller.poll()
+        assert list(poller.status()[2]) == [0]
+        assert capsys.readouterr().out == ''
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from TM.pairings import RoundRobin
+from TM.pairings.round_robin import fight_rest_gaps, check_rest
+
+MAX_FIGHTERS = 50
+
+
+class TestRoundRobin:
+
+    def test_every_fight_once(self):
+        for n in range(0, MAX_FIGHTERS):
+            schedule = RoundRobin(range(n))
+            fights = [frozenset(f) for f in schedule]
+            assert len(fights) == len(schedule) == n * (n - 1) // 2
+            assert len(set(fights)) == len(fights)
+            assert all(len(f) == 2 for f in fights)
+
+    def test_no_two_fights_in_row(self):
+        for n in range(5, MAX_FIGHTERS):
+            assert check_rest(np.array(list(RoundRobin(range(n)))), min_gap=1)
+
+    def test_random_access_and_resume(self):
+        schedule = RoundRobin(['f{}'.format(i) for i in range(11)])
+        fights = list(schedule)
+        assert [schedule[k] for k in range(len(fights))] == fights
+        assert schedule[-1] == fights[-1]
+        assert list(schedule.fights(start=20)) == fights[20:]
+        with pytest.raises(IndexError):
+            schedule[len(fights)]
+
+    def test_large_schedule_is_lazy(self):
+        schedule = RoundRobin(range(100001))
+        assert len(schedule) == 100001 * 50000
+        assert schedule[len(schedule) // 2] != schedule[len(schedule) // 2 + 1]
+
+    def test_rest_gaps(self):
+        gaps = fight_rest_gaps(np.array([[0, 1], [2, 3], [0, 2], [1, 3]]))
+        assert sorted(gaps.tolist()) == [0, 1, 1, 2]
+        assert not check_rest(np.array([[0, 1], [1, 2]]))
@@ -0,0 +1,32 @@
+import pytest
+from TM.pairings.round_pairings import round_pairings
+from TM.pairings.scheduler import schedule, rest_gaps
+
+
+class TestScheduler:
+
+    def test_balanced_swiss_round(self):
+        pairs = [(2 * i, 2 * i + 1) for i in range(15)]
+        for num_areas in range(1, 8):
+            areas = schedule(pairs, num_areas)
+            sizes = [len(a) for a in areas]
+            assert max(sizes) - min(sizes) <= 1
+            assert max(sizes) == -(-15 // num_areas)
+            assert sorted(p for a in areas for p in a) == pairs
+
+    def test_rest_between_bouts(self):
+        fighters = list(range(9))
+        pairs = round_pairings(fighters)
+        for num_areas in (1, 2, 3):
+            for min_gap in (0, 1):
+                areas = schedule(pairs, num_areas, min_gap)
+                assert sorted(p for a in areas for p in a if p is not None) == sorted(pairs)
+                assert rest_gaps(areas) >= min_gap
+                # nobody fights on two areas at once
+                for slot in range(max(len(a) for a in areas)):
+                    busy = [f for a in areas if slot < len(a) and a[slot] is not None for f in a[slot]]
+                    assert len(busy) == len(set(busy))
+
+    def test_no_areas(self):
+        with pytest.raises(ValueError):
+            schedule([(1, 2)], 0)
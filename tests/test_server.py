@@ -0,0 +1,112 @@
+import asyncio
+import json
+import threading
+from TM.pairings import swiss_pairings
+from TM.server import TournamentServer
+from TM.tournament import Tournament, Fighter
+
+
+class FakeCategory:
+    """
+    Pairs the fighters of a Tournament; next_round of the blocked category waits for .release
+    """
+    def __init__(self, num, blocked=False):
+        self.t = Tournament(swiss_pairings, fighters=[Fighter(str(i), 10) for i in range(num)], fight_cap=5)
+        self.round_num = 0
+        self.release = threading.Event()
+        if not blocked:
+            self.release.set()
+        self.submitted = []
+
+    def next_round(self):
+        self.release.wait(5)
+        self.t.make_pairs()
+        self.round_num += 1
+        return {'round': self.round_num, 'pairs': [[a.name, b.name] for a, b in self.t.pairings]}
+
+    def restart(self, rounds, trusted_rounds=None):
+        self.round_num = rounds
+        return {'round': rounds, 'trusted_rounds': trusted_rounds}
+
+    def standings(self):
+        return [{'name': f.name, 'rating': f.rating} for f in self.t.list_fighters()]
+
+    def submit(self, round_num, results):
+        self.submitted += [self.t.parse_result(r) for r in results]
+        return {'submitted': len(self.submitted)}
+
+    def status(self):
+        return {'round': self.round_num}
+
+
+async def request(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    data = b'' if body is None else json.dumps(body).encode('utf-8')
+    writer.write('{} {} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {}\r\n\r\n'.format(method, path, len(data))
+                 .encode('latin-1') + data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(payload.decode('utf-8'))
+
+
+def run_server(categories, scenario):
+    async def main():
+        server = TournamentServer(categories)
+        await server.start('127.0.0.1', 0)
+        try:
+            return await scenario(server.port)
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+class TestServer:
+
+    def test_routes(self):
+        categories = {'sabre': FakeCategory(4), 'long sword': FakeCategory(6)}
+
+        async def scenario(port):
+            assert await request(port, 'GET', '/categories') == (200, {'categories': ['long sword', 'sabre']})
+            status, answer = await request(port, 'POST', '/sabre/round')
+            assert status == 200 and answer['round'] == 1 and len(answer['pairs']) == 2
+            assert await request(port, 'GET', '/long%20sword') == (200, {'round': 0})
+            status, answer = await request(port, 'GET', '/sabre/list')
+            assert len(answer) == 4
+            assert await request(port, 'POST', '/sabre/restart', {'rounds': 3}) == \
+                (200, {'round': 3, 'trusted_rounds': None})
+            status, answer = await request(port, 'POST', '/sabre/results',
+                                           {'round': 1, 'results': [['0', -3, '1', 0]]})
+            assert (status, answer) == (200, {'submitted': 1})
+            assert categories['sabre'].submitted == [('0', '1', (3, 0))]
+
+            # errors
+            assert (await request(port, 'POST', '/sabre/results', {'round': 1, 'results': [['0', 'x', '1', 0]]}))[0] \
+                == 400
+            assert (await request(port, 'POST', '/sabre/results', {'results': []}))[0] == 400
+            assert (await request(port, 'POST', '/sabre/restart', {'rounds': 'many'}))[0] == 400
+            assert (await request(port, 'GET', '/foil/list'))[0] == 404
+            assert (await request(port, 'GET', '/sabre/round'))[0] == 405
+            assert (await request(port, 'POST', '/sabre/dance'))[0] == 404
+
+        run_server(categories, scenario)
+
+    def test_slow_category_does_not_block_others(self):
+        slow, fast = FakeCategory(4, blocked=True), FakeCategory(4)
+
+        async def scenario(port):
+            slow_round = asyncio.ensure_future(request(port, 'POST', '/slow/round'))
+            await asyncio.sleep(0.05)
+            # the fast category is served while the slow one is pairing
+            assert (await asyncio.wait_for(request(port, 'POST', '/fast/round'), 2))[1]['round'] == 1
+            assert not slow_round.done()
+            # the calls to the busy category wait for it
+            status_request = asyncio.ensure_future(request(port, 'GET', '/slow'))
+            await asyncio.sleep(0.05)
+            assert not status_request.done()
+            slow.release.set()
+            assert (await slow_round)[1]['round'] == 1
+            assert await status_request == (200, {'round': 1})
+
+        run_server({'slow': slow, 'fast': fast}, scenario)
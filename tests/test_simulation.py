@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from TM.pairings.matrix_pairings import matrix_beam
+from TM.simulation import batch_beam, simulate, simulate_batch
+
+
+class TestSimulation:
+
+    def test_batch_beam_as_matrix_beam(self):
+        rng = np.random.default_rng(3)
+        num_t, num = 6, 10
+        ratings = -np.sort(-rng.integers(0, 20, (num_t, num)), axis=1)
+        cost = np.abs(ratings[:, :, None] - ratings[:, None, :])
+        played = rng.random((num_t, num, num)) < 0.3
+        played |= played.transpose(0, 2, 1)
+        allowed = ~played & ~np.eye(num, dtype=bool)
+        mate, ok = batch_beam(cost, allowed, np.ones((num_t, num), dtype=bool), 5)
+        for t in range(num_t):
+            pairs = matrix_beam(cost[t], played[t], -1, 5)
+            assert ok[t] == (pairs is not None)
+            if pairs is not None:
+                assert all(mate[t, i] == j and mate[t, j] == i for i, j in pairs)
+
+    def test_inactive_fighters_skipped(self):
+        cost = np.zeros((1, 6, 6))
+        allowed = ~np.eye(6, dtype=bool)[None]
+        active = np.array([[True, True, True, True, False, False]])
+        mate, ok = batch_beam(cost, allowed, active)
+        assert ok[0]
+        assert (mate[0, 4:] == -1).all() and (mate[0, :4] >= 0).all() and (mate[0, :4] < 4).all()
+
+    def test_small_tournament_has_finals_at_once(self):
+        rounds, fallbacks, paired, spread = simulate_batch(5, 6, hp=20, cap=6)
+        assert (rounds == 0).all() and (paired == 0).all() and (spread == 0).all()
+
+    def test_same_result_with_workers(self):
+        first = simulate(40, 12, hp=10, cap=5, seed=1, batch_size=10)
+        second = simulate(40, 12, hp=10, cap=5, seed=1, batch_size=10, workers=2)
+        assert (first.rounds == second.rounds).all()
+        assert (first.spread == second.spread).all()
+        assert len(first) == 40 and (first.rounds > 0).all()
+        assert 0 <= first.fallback_rate <= 1
+        assert (first.paired == first.rounds).all()
+        assert 'Rounds to the finals' in str(first)
+
+    def test_exact(self):
+        report = simulate(5, 10, hp=10, cap=5, pairing='exact')
+        assert (report.rounds > 0).all()
+
+    def test_wrong_input(self):
+        with pytest.raises(ValueError):
+            simulate_batch(2, 7, hp=10, cap=5)
+        with pytest.raises(ValueError):
+            simulate_batch(2, 8, hp=10, cap=5, pairing='round')
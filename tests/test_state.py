@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from TM.pairings import swiss_pairings
+from TM.tournament import Tournament, Fighter, FighterTable, save_state, load_table, load_fighters
+from TM.tournament.files import atomic_write
+
+
+def make_fighters():
+    fighters = [Fighter(name, rating) for name, rating in (('Ivanov, Ivan', 12), ('B', 7), ('C', 9), ('D', 3))]
+    fighters[0].enemies = {'B': 1, 'Gone': 2}
+    fighters[1].enemies = {'Ivanov, Ivan': 1}
+    fighters[3].enemies = {'C': 1}
+    return fighters
+
+
+class TestState:
+
+    def test_objects_round_trip(self, tmp_path):
+        fighters = make_fighters()
+        filename = save_state(tmp_path / 'state.npz', fighters[:3], fighters[3:], round_num=4)
+        loaded, outs, round_num = load_fighters(filename)
+        assert round_num == 4
+        assert [f.to_str() for f in loaded] == [f.to_str() for f in fighters[:3]]
+        assert [f.to_str() for f in outs] == [f.to_str() for f in fighters[3:]]
+
+    def test_table_round_trip(self, tmp_path):
+        table = FighterTable.from_fighters(make_fighters())
+        fighters = table.fighters()
+        save_state(tmp_path / 'state.npz', fighters[::-1], round_num=2)
+        loaded, ids, outs, round_num = load_table(tmp_path / 'state.npz')
+        # the order of the fighters is kept
+        assert [loaded.names[i] for i in ids] == [f.name for f in fighters[::-1]]
+        assert len(outs) == 0 and round_num == 2
+        # the enemies out of the state are kept by name, not alive
+        assert not loaded.alive[loaded.ids['Gone']]
+        assert loaded.fighter(loaded.ids['Ivanov, Ivan']).played(Fighter('Gone')) == 2
+        assert dict(loaded.fighter(0).enemies.items()) == {'B': 1, 'Gone': 2}
+
+    def test_loaded_table_changes(self, tmp_path):
+        save_state(tmp_path / 'state.npz', make_fighters())
+        table = load_table(tmp_path / 'state.npz')[0]
+        a, b = table.fighter(table.ids['C']), table.fighter(table.ids['B'])
+        a.fight(b, 2)
+        table.add('New', 5).fight(a, 1)
+        assert a.played(b) == 1 and a.rating == 7
+        names, ratings, alive, rows, cols, counts = table.to_arrays()
+        copy = FighterTable.from_arrays(names, ratings, alive, rows, cols, counts)
+        assert copy.fighter(copy.ids['New']).played(a) == 1
+        assert copy.played_matrix([table.ids['C'], table.ids['B']]).tolist() == [[False, True], [True, False]]
+
+    def test_tournament(self, tmp_path):
+        t = Tournament(swiss_pairings, fighters=make_fighters(), fight_cap=5)
+        t.outs = [t.fighters.pop()]
+        t.index_fighters()
+        t.save_state(tmp_path / 'state.npz', 3)
+        for storage in ('objects', 'table'):
+            restored = Tournament(swiss_pairings, fight_cap=5, storage=storage)
+            assert restored.load_state(tmp_path / 'state.npz') == 3
+            assert [f.to_str() for f in restored.fighters] == [f.to_str() for f in t.fighters]
+            assert [f.name for f in restored.outs] == ['D']
+            restored.read_fighters(str(tmp_path / 'state.npz'))
+            assert sorted(restored.index) == sorted(f.name for f in t.fighters)
+
+    def test_wrong_version(self, tmp_path):
+        save_state(tmp_path / 'state.npz', make_fighters())
+        data = dict(np.load(tmp_path / 'state.npz'))
+        data['version'] = np.array(99)
+        np.savez(tmp_path / 'other.npz', **data)
+        with pytest.raises(ValueError):
+            load_table(tmp_path / 'other.npz')
+
+    def test_atomic_write(self, tmp_path):
+        (tmp_path / 'x.json').write_text('old', encoding='utf-8')
+        with pytest.raises(RuntimeError):
+            with atomic_write(tmp_path / 'x.json', encoding='utf-8') as dst:
+                dst.write('half')
+                raise RuntimeError('interrupted')
+        # the old file is kept and the temporary one is removed
+        assert (tmp_path / 'x.json').read_text(encoding='utf-8') == 'old'
+        # the files with the same stem have their own temporary files
+        with atomic_write(tmp_path / 'x.json', encoding='utf-8') as dst:
+            save_state(tmp_path / 'x.npz', make_fighters())
+            dst.write('new')
+        assert (tmp_path / 'x.json').read_text(encoding='utf-8') == 'new'
+        assert len(load_fighters(tmp_path / 'x.npz')[0]) == 4
+        assert sorted(p.name for p in tmp_path.iterdir()) == ['x.json', 'x.npz']
@@ -1,6 +1,8 @@
 import pytest
+from concurrent.futures import ProcessPoolExecutor
 from random import randint
 from TM.pairings import swiss_pairings
+from TM.pairings.swiss_pairings import Candidate, get_pool
 from TM.tournament import Fighter
 
 MAX_FIGHTERS = 100
@@ -113,3 +115,56 @@ class TestSwissPairings:
         with pytest.raises(ValueError):
             swiss_pairings(fighters)
 
+    def test_lexicographic_objective(self):
+        # With 6 fighters the beam of 15 keeps all of the 15 possible pairings,
+        # so the result must be the best by max difference, then by total difference
+        def all_pairings(fs):
+            if not fs:
+                yield []
+            for i in range(1, len(fs)):
+                for rest in all_pairings(fs[1:i] + fs[i + 1:]):
+                    yield [(fs[0], fs[i])] + rest
+
+        def objective(pairings):
+            diff = [abs(p[0].rating - p[1].rating) for p in pairings]
+            return max(diff), sum(diff)
+
+        for run in range(50):
+            fighters = [Fighter(name=str(i + 1), rating=randint(1, MAX_HP)) for i in range(6)]
+            best = min(objective(p) for p in all_pairings(fighters))
+            assert objective(swiss_pairings(fighters)) == best
+
+
+class TestCandidate:
+
+    def test_shares_parent(self):
+        root = Candidate()
+        c1 = root.add_pair((0, 2), 3)
+        c2 = c1.add_pair((1, 3), 1)
+        assert c2.parent is c1
+        assert c2.pairs == [(0, 2), (1, 3)]
+        assert c2.max_diff == 3 and c2.tot_diff == 4
+        assert c1.first_free() == 1
+        assert c2.first_free() == 4
+
+    def test_parallel_same_as_sequential(self):
+        fighters = [Fighter(name=str(i + 1), rating=randint(1, MAX_HP)) for i in range(40)]
+        for f in fighters:
+            for _ in range(3):
+                other = fighters[randint(0, len(fighters) - 1)]
+                if other is not f:
+                    f.enemies[other.name] = 1
+        sequential = swiss_pairings(fighters, candidates_to_keep=50)
+        parallel = swiss_pairings(fighters, candidates_to_keep=50, workers=2)
+        assert [(p[0].name, p[1].name) for p in sequential] == [(p[0].name, p[1].name) for p in parallel]
+
+    def test_parallel_pool_reused(self):
+        fighters = [Fighter(name=str(i + 1), rating=randint(1, MAX_HP)) for i in range(20)]
+        first = swiss_pairings(fighters, candidates_to_keep=10, workers=2)
+        pool = get_pool(2)
+        second = swiss_pairings(fighters, candidates_to_keep=10, workers=2)
+        assert get_pool(2) is pool
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            third = swiss_pairings(fighters, candidates_to_keep=10, workers=2, executor=executor)
+        names = [[(p[0].name, p[1].name) for p in pairs] for pairs in (first, second, third)]
+        assert names[0] == names[1] == names[2]
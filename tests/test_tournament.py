@@ -0,0 +1,96 @@
+import pytest
+from TM.tournament import Tournament, Fighter, save_snapshot, find_snapshot, load_snapshot, read_snapshot, \
+    roster_fingerprint
+from TM.pairings import swiss_pairings
+
+CAP = 5
+
+
+class ListApi:
+    """
+    Returns the given results for any round
+    """
+    def __init__(self, results):
+        self.results = results
+
+    def read(self, round_num):
+        return self.results
+
+
+class TestTournament:
+
+    def test_duplicate_names_rejected(self, tmp_path):
+        filename = tmp_path / 'fighters.txt'
+        filename.write_text('A\nB\nA\n', encoding='utf-8')
+        t = Tournament(swiss_pairings, start_rating=10, fight_cap=CAP)
+        with pytest.raises(ValueError):
+            t.read_fighters(str(filename))
+
+    def test_results_applied_by_name(self):
+        fighters = [Fighter(name=str(i + 1), rating=10) for i in range(4)]
+        t = Tournament(swiss_pairings, fighters=fighters, fight_cap=CAP)
+        t.read_results(ListApi([(('1', 3), ('2', 0)), (('3', 1), ('4', 2))]), 1)
+        assert [f.rating for f in fighters] == [7, 10, 9, 8]
+        assert fighters[0].played(fighters[1]) == 1
+
+    def test_unknown_fighter(self):
+        t = Tournament(swiss_pairings, fighters=[Fighter('A'), Fighter('B')], fight_cap=CAP)
+        with pytest.raises(ValueError):
+            t.update_fighters('A', 'C', (1, 1))
+
+    def test_removed_fighters_leave_index(self):
+        fighters = [Fighter(name=str(i + 1), rating=10) for i in range(10)]
+        fighters[0].rating = 0
+        fighters[1].rating = -1
+        t = Tournament(swiss_pairings, fighters=fighters, fight_cap=CAP)
+        assert t.remove(v=False) is None
+        assert len(t.fighters) == 8
+        assert sorted(f.name for f in t.outs) == ['1', '2']
+        assert '1' not in t.index and '3' in t.index
+        with pytest.raises(ValueError):
+            t.update_fighters('1', '3', (1, 1))
+
+    def test_snapshot_roundtrip(self, tmp_path):
+        fighters = [Fighter(name=str(i + 1), rating=10) for i in range(10)]
+        t = Tournament(swiss_pairings, fighters=fighters, fight_cap=CAP)
+        t.read_results(ListApi([(('1', 3), ('2', 0)), (('3', 5), ('4', 2))]), 1)
+        save_snapshot(t, tmp_path, 1)
+        t.fighters[0].rating = 0
+        t.fighters[2].rating = 0
+        t.remove(v=False)
+        save_snapshot(t, tmp_path, 2)
+
+        assert find_snapshot(tmp_path, 5).name == 'snapshot_2.json'
+        assert find_snapshot(tmp_path, 1).name == 'snapshot_1.json'
+        assert find_snapshot(tmp_path, 0) is None
+
+        restored = Tournament(swiss_pairings, fight_cap=CAP)
+        assert load_snapshot(restored, find_snapshot(tmp_path, 2)) == 2
+        assert [f.to_str() for f in restored.fighters] == [f.to_str() for f in t.fighters]
+        assert sorted(f.name for f in restored.outs) == ['1', '3']
+        restored.update_fighters('2', '4', (1, 1))
+
+    def test_snapshot_keeps_any_name(self, tmp_path):
+        fighters = [Fighter(name='Smith, John', rating=10), Fighter(name='O"Neil', rating=10),
+                    Fighter(name='a:b', rating=10), Fighter(name='D', rating=10)]
+        t = Tournament(swiss_pairings, fighters=fighters, fight_cap=CAP)
+        results = [('Smith, John', 'O"Neil', (3, 0)), ('a:b', 'D', (1, 2))]
+        t.apply_results(results)
+        save_snapshot(t, tmp_path, 1, results)
+        assert read_snapshot(find_snapshot(tmp_path, 1))['results'] == \
+            [['D', 'a:b', 2, 1], ['O"Neil', 'Smith, John', 0, 3]]
+
+        restored = Tournament(swiss_pairings, fight_cap=CAP)
+        load_snapshot(restored, find_snapshot(tmp_path, 1))
+        assert [f.to_dict() for f in restored.fighters] == [f.to_dict() for f in t.fighters]
+        assert restored.index['Smith, John'].played(restored.index['O"Neil']) == 1
+
+    def test_roster_fingerprint(self):
+        fighters = [Fighter(name=str(i + 1), rating=10) for i in range(4)]
+        key = roster_fingerprint(fighters)
+        assert roster_fingerprint(fighters[::-1]) == key
+        fighters[0].rating = 9
+        assert roster_fingerprint(fighters) != key
+        fighters[0].rating = 10
+        fighters[0].enemies['2'] = 1
+        assert roster_fingerprint(fighters) != key
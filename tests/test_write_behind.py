@@ -0,0 +1,73 @@
+import threading
+from TM.api.write_behind import WriteBehindApi
+from TM.tournament import Fighter
+
+
+class MemoryApi:
+    """
+    Keeps the written rounds in memory. Can be blocked or made failing to simulate the network problems
+    """
+    def __init__(self):
+        self.rounds = {}
+        self.fail = False
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def write(self, pairs, round_num):
+        self.gate.wait()
+        if self.fail:
+            raise ConnectionError('offline')
+        self.rounds[round_num] = [(p[0].name, p[0].rating, p[1].name, p[1].rating) for p in pairs]
+        return 'memory'
+
+    def read(self, round_num):
+        return self.rounds[round_num]
+
+
+def make_pairs():
+    return [(Fighter('A', 10), Fighter('B', 9)), (Fighter('C', 8), Fighter('D', 7))]
+
+
+class TestWriteBehindApi:
+
+    def test_local_at_once_remote_later(self, tmp_path):
+        local, remote = MemoryApi(), MemoryApi()
+        remote.gate.clear()
+        api = WriteBehindApi(local, remote, tmp_path / 'queue.json')
+        api.write(make_pairs(), 1)
+        assert 1 in local.rounds
+        assert api.status()[0] == [1]
+        remote.gate.set()
+        assert api.flush(timeout=5)
+        assert remote.rounds[1] == local.rounds[1]
+        api.close()
+
+    def test_queue_survives_restart(self, tmp_path):
+        local, remote = MemoryApi(), MemoryApi()
+        remote.fail = True
+        api = WriteBehindApi(local, remote, tmp_path / 'queue.json', retry_delay=0.01)
+        api.write(make_pairs(), 1)
+        assert not api.flush(timeout=0.1)
+        assert api.status()[1] is not None
+        api.close()
+
+        remote.fail = False
+        api = WriteBehindApi(local, remote, tmp_path / 'queue.json')
+        assert api.flush(timeout=5)
+        assert remote.rounds[1] == [('A', 10, 'B', 9), ('C', 8, 'D', 7)]
+        assert api.status() == ([], None)
+        api.close()
+
+    def test_other_document_dropped(self, tmp_path):
+        local, remote = MemoryApi(), MemoryApi()
+        remote.fail = True
+        api = WriteBehindApi(local, remote, tmp_path / 'queue.json', retry_delay=0.01, key='doc1')
+        api.write(make_pairs(), 1)
+        api.close()
+
+        remote.fail = False
+        api = WriteBehindApi(local, remote, tmp_path / 'queue.json', key='doc2')
+        assert api.status() == ([], None)
+        assert api.flush(timeout=5)
+        assert remote.rounds == {}
+        api.close()